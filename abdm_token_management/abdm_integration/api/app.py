@@ -5,11 +5,11 @@ from fastapi.responses import JSONResponse
 from fastapi.exceptions import RequestValidationError
 
 # Import routes directly
-from .routes import token_routes, health_routes, encryption_routes, verification_routes
+from .routes import token_routes, health_routes, encryption_routes, verification_routes, gateway_callback_routes, admin_routes, metrics_routes, debug_routes
 from .middlewares import setup_middlewares
 from config.settings import settings
 from config.logging_config import setup_logger
-from utils.exceptions import TokenNotFoundError, TokenRefreshError, TokenCreationError, ABDMApiError, PublicKeyError
+from utils.exceptions import TokenNotFoundError, TokenRefreshError, TokenCreationError, ABDMApiError, PublicKeyError, GatewayCallbackTimeoutError, UserTokenError, ProfileVersionConflictError
 
 # Configure logging
 logger = setup_logger('api')
@@ -52,6 +52,14 @@ def create_app() -> FastAPI:
             content={"detail": str(exc), "error_type": "token_creation_failed"}
         )
     
+    @app.exception_handler(UserTokenError)
+    async def user_token_exception_handler(request, exc):
+        logger.warning(f"UserTokenError: {str(exc)}")
+        return JSONResponse(
+            status_code=401,
+            content={"detail": str(exc), "error_type": "user_token_unavailable"}
+        )
+    
     @app.exception_handler(ABDMApiError)
     async def abdm_api_exception_handler(request, exc):
         status_code = exc.status_code if hasattr(exc, 'status_code') and exc.status_code else 500
@@ -69,6 +77,22 @@ def create_app() -> FastAPI:
             content={"detail": str(exc), "error_type": "public_key_error"}
         )
 
+    @app.exception_handler(GatewayCallbackTimeoutError)
+    async def gateway_callback_timeout_exception_handler(request, exc):
+        logger.warning(f"GatewayCallbackTimeoutError: {str(exc)}")
+        return JSONResponse(
+            status_code=504,
+            content={"detail": str(exc), "error_type": "gateway_callback_timeout"}
+        )
+
+    @app.exception_handler(ProfileVersionConflictError)
+    async def profile_version_conflict_exception_handler(request, exc):
+        logger.warning(f"ProfileVersionConflictError: {str(exc)}")
+        return JSONResponse(
+            status_code=409,
+            content={"detail": str(exc), "error_type": "profile_version_conflict"}
+        )
+
     # Validation error handler
     @app.exception_handler(RequestValidationError)
     async def validation_exception_handler(request, exc):
@@ -83,5 +107,9 @@ def create_app() -> FastAPI:
     app.include_router(health_routes)
     app.include_router(encryption_routes)
     app.include_router(verification_routes)  # Add verification routes
+    app.include_router(gateway_callback_routes)  # ABDM gateway v0.5 callbacks
+    app.include_router(admin_routes)  # Runtime controls, requires ADMIN_API_KEY
+    app.include_router(metrics_routes)  # Prometheus /metrics
+    app.include_router(debug_routes)  # Profiling, requires ADMIN_API_KEY
     
     return app
\ No newline at end of file
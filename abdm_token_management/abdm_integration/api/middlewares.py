@@ -1,13 +1,30 @@
 # middlewares.py - API middlewares for the ABDM integration
 
-from fastapi import Request
 from fastapi.middleware.cors import CORSMiddleware
-from starlette.middleware.base import BaseHTTPMiddleware
+from starlette.datastructures import MutableHeaders
+import json
 import time
-from config.logging_config import setup_logger
+import uuid
+import asyncio
+import logging
+from config.logging_config import setup_logger, bind_request_context, reset_request_context
+from services.metrics import metrics_registry
+from services.request_timing import start_request_timing, snapshot_request_timing, finish_request_timing, format_server_timing, format_phase_summary
+from services.loop_monitor import event_loop_monitor
+from services.admission_control import admission_controller
+from services.deadline import (
+    request_timeout, start_request_deadline, reset_request_deadline, track_blocking_calls, stop_tracking_blocking_calls
+)
+from utils.exceptions import AdmissionRejectedError
+from config.settings import settings
 
 logger = setup_logger('middlewares')
 
+request_duration = metrics_registry.histogram(
+    "http_request_duration_seconds", "HTTP request latency by route template", ("method", "route", "status")
+)
+requests_in_flight = metrics_registry.gauge("http_requests_in_flight", "HTTP requests currently being handled")
+
 # CORS middleware configuration
 def setup_cors(app):
     app.add_middleware(
@@ -19,26 +36,281 @@ def setup_cors(app):
     )
     return app
 
-# Request logging middleware
-class RequestLoggingMiddleware(BaseHTTPMiddleware):
-    async def dispatch(self, request: Request, call_next):
-        start_time = time.time()
-        
-        # Log the request
-        logger.info(f"Request started: {request.method} {request.url.path}")
-        
-        # Process the request
-        response = await call_next(request)
-        
-        # Log the response time
-        process_time = time.time() - start_time
-        logger.info(f"Request completed: {request.method} {request.url.path} - Status: {response.status_code} - Time: {process_time:.3f}s")
-        
-        return response
+# Request logging middleware - pure ASGI, so responses are passed through untouched
+class RequestLoggingMiddleware:
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        start_time = time.monotonic()
+        method = scope["method"]
+        path = scope["path"]
+        request_id = None
+        for name, value in scope["headers"]:
+            if name == b"x-request-id":
+                request_id = value.decode("latin-1")[:128]
+                break
+        request_id = request_id or str(uuid.uuid4())
+
+        context = bind_request_context(request_id, path)
+        requests_in_flight.inc()
+        timing = start_request_timing()
+        status_code = 500  # if the app fails before responding
+        replaced = False
+
+        async def send_with_headers(message):
+            nonlocal status_code, replaced
+            if replaced:
+                return  # drop the rest of a response failed by the loop monitor
+            if message["type"] == "http.response.start":
+                violation = event_loop_monitor.blocking_violation(request_id)
+                if violation is not None:
+                    # Test mode: fail requests that blocked the event loop
+                    replaced = True
+                    status_code = 500
+                    await send_blocking_failure(send, request_id, violation)
+                    return
+                status_code = message["status"]
+                headers = MutableHeaders(scope=message)
+                headers.append("X-Request-ID", request_id)
+                if settings.SERVER_TIMING_ENABLED:
+                    # Phases recorded before the response starts; app is the time to first byte
+                    phases = snapshot_request_timing()
+                    phases["app"] = (time.monotonic() - start_time, 1)
+                    headers.append("Server-Timing", format_server_timing(phases))
+            await send(message)
+
+        try:
+            # Log the request
+            logger.info(f"Request started: {method} {path}")
+
+            # Process the request
+            await self.app(scope, receive, send_with_headers)
+        finally:
+            process_time = time.monotonic() - start_time
+            phases = finish_request_timing(timing)
+            phases["app"] = (process_time, 1)
+
+            # Log the response time; errors are logged at a higher level so sampling keeps them
+            level = logging.ERROR if status_code >= 500 else logging.WARNING if status_code >= 400 else logging.INFO
+            message = f"Request completed: {method} {path} - Status: {status_code} - Time: {process_time:.3f}s"
+            extra = {
+                "method": method,
+                "path": path,
+                "status": status_code,
+                "latency_ms": round(process_time * 1000, 1)
+            }
+            if settings.SERVER_TIMING_LOG:
+                message += f" - Phases: {format_phase_summary(phases)}"
+                extra["phases_ms"] = {name: round(seconds * 1000, 1) for name, (seconds, count) in phases.items()}
+            logger.log(level, message, extra=extra)
+
+            # Label by route template rather than raw path to bound cardinality
+            route = scope.get("route")
+            request_duration.labels(
+                method, route.path if route is not None else "unmatched", str(status_code)
+            ).observe(process_time)
+
+            requests_in_flight.dec()
+            reset_request_context(context)
+
+async def send_blocking_failure(send, request_id, violation):
+    """Send a 500 response describing an event loop stall caused by the request"""
+    body = json.dumps({
+        "detail": f"Request blocked the event loop for {violation['blocked_ms']:.0f}ms "
+                  f"(limit {event_loop_monitor.fail_threshold * 1000:.0f}ms)",
+        "error_type": "event_loop_blocked",
+        "stack": violation["stack"]
+    }).encode("utf-8")
+    await send({
+        "type": "http.response.start",
+        "status": 500,
+        "headers": [
+            (b"content-type", b"application/json"),
+            (b"content-length", str(len(body)).encode("latin-1")),
+            (b"x-request-id", request_id.encode("latin-1"))
+        ]
+    })
+    await send({"type": "http.response.body", "body": body})
+
+# Deadline middleware - bounds each request by its deadline and stops work for clients that went away
+class DeadlineMiddleware:
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        timeout = request_timeout(scope["path"], scope["headers"])
+        deadline = start_request_deadline(timeout)
+        watcher = DisconnectWatcher(receive, body_expected=request_has_body(scope))
+        response_started = False
+        response_complete = False
+
+        async def tracking_send(message):
+            nonlocal response_started, response_complete
+            if message["type"] == "http.response.start":
+                response_started = True
+            elif message["type"] == "http.response.body" and not message.get("more_body", False):
+                response_complete = True
+            await send(message)
+
+        try:
+            async with asyncio.timeout(timeout) as budget:
+                def cancel_on_disconnect():
+                    # Expire the budget at once, cancelling whatever the request awaits
+                    if not response_complete and not budget.expired():
+                        budget.reschedule(asyncio.get_running_loop().time())
+
+                watcher.on_disconnect = cancel_on_disconnect
+                try:
+                    await self.app(scope, watcher.receive, tracking_send)
+                finally:
+                    watcher.on_disconnect = None
+        except TimeoutError:
+            if watcher.disconnected:
+                logger.warning(f"Client disconnected, cancelled {scope['method']} {scope['path']}")
+                if not response_started:
+                    # Nobody reads this; 499 (client closed request) is what the access log records
+                    await send_status(send, 499, {"detail": "Client closed request", "error_type": "client_disconnected"})
+            else:
+                logger.warning(f"Deadline of {timeout:.1f}s exceeded, cancelled {scope['method']} {scope['path']}")
+                if not response_started:
+                    await send_status(send, 504, {"detail": f"Request deadline of {timeout:.1f}s exceeded", "error_type": "deadline_exceeded"})
+        finally:
+            watcher.stop()
+            reset_request_deadline(deadline)
+
+def request_has_body(scope):
+    for name, value in scope["headers"]:
+        if name == b"transfer-encoding" or (name == b"content-length" and value.strip() != b"0"):
+            return True
+    return False
+
+class DisconnectWatcher:
+    """
+    Passes request messages to the app and notices when the client disconnects
+
+    The app reads the body through receive(). Once the body is complete the
+    watcher becomes the only reader of the connection and forwards what it
+    reads, so a disconnect is seen even while the app is waiting on upstream.
+    """
+
+    def __init__(self, receive, body_expected=True):
+        self._receive = receive
+        self.messages = asyncio.Queue()
+        self.task = None
+        self.disconnected = False
+        self.on_disconnect = None
+        if not body_expected:
+            self.start()
+
+    async def receive(self):
+        if self.task is not None:
+            return await self.messages.get()
+        message = await self._receive()
+        if message["type"] == "http.disconnect":
+            self.disconnected = True
+        elif not message.get("more_body", False):
+            self.start()
+        return message
+
+    def start(self):
+        self.task = asyncio.ensure_future(self._watch())
+
+    async def _watch(self):
+        while True:
+            message = await self._receive()
+            self.messages.put_nowait(message)
+            if message["type"] == "http.disconnect":
+                self.disconnected = True
+                if self.on_disconnect is not None:
+                    self.on_disconnect()
+                return
+
+    def stop(self):
+        if self.task is not None:
+            self.task.cancel()
+
+# Admission control middleware - runs inside request logging so shed requests are logged and counted
+class AdmissionControlMiddleware:
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        limiter = None
+        if scope["type"] == "http" and scope["method"] != "OPTIONS" and settings.ADMISSION_CONTROL_ENABLED:
+            limiter = admission_controller.limiter_for(scope["path"])
+        if limiter is None:
+            await self.app(scope, receive, send)
+            return
+
+        try:
+            await limiter.acquire()
+        except AdmissionRejectedError as e:
+            await send_overloaded(send, e)
+            return
+
+        start_time = time.monotonic()
+        calls, calls_token = track_blocking_calls()
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            stop_tracking_blocking_calls(calls_token)
+            running = [call for call in calls if not call.done()]
+            if running:
+                # Cancelled while its threadpool calls run on; they still use the worker, so keep the slot
+                asyncio.ensure_future(release_after(limiter, running, start_time))
+            else:
+                # Adapt on the upstream wait when the request called ABDM, otherwise on the whole request
+                upstream = snapshot_request_timing().get("upstream")
+                limiter.release(upstream[0] if upstream is not None else time.monotonic() - start_time)
+
+async def release_after(limiter, calls, start_time):
+    """Release an admission slot once the abandoned threadpool calls of its request have returned"""
+    try:
+        await asyncio.wait(calls)
+    finally:
+        limiter.release(time.monotonic() - start_time)
+
+async def send_overloaded(send, error):
+    """Send a 503 response telling the client when to retry"""
+    await send_status(
+        send, 503, {"detail": error.message, "error_type": "overloaded"},
+        headers=[(b"retry-after", str(error.retry_after).encode("latin-1"))]
+    )
+
+async def send_status(send, status, content, headers=()):
+    """Send a complete JSON response from a middleware"""
+    body = json.dumps(content).encode("utf-8")
+    await send({
+        "type": "http.response.start",
+        "status": status,
+        "headers": [
+            (b"content-type", b"application/json"),
+            (b"content-length", str(len(body)).encode("latin-1"))
+        ] + list(headers)
+    })
+    await send({"type": "http.response.body", "body": body})
+
+# Lets the loop monitor attribute stalls to the request being handled
+event_loop_monitor.request_frame_codes.add(RequestLoggingMiddleware.__call__.__code__)
 
 def setup_middlewares(app):
     # Setup CORS
     app = setup_cors(app)
+
+    # Shed load per route group; added before request logging so it runs inside it
+    app.add_middleware(AdmissionControlMiddleware)
+
+    # Deadlines and disconnects cancel queued and running work alike, so this wraps admission control
+    app.add_middleware(DeadlineMiddleware)
     
     # Add request logging
     app.add_middleware(RequestLoggingMiddleware)
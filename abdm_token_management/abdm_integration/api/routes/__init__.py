@@ -4,5 +4,9 @@ from api.routes.token_routes import router as token_routes
 from api.routes.health_routes import router as health_routes
 from api.routes.encryption_routes import router as encryption_routes
 from api.routes.verification_routes import router as verification_routes
+from api.routes.gateway_callback_routes import router as gateway_callback_routes
+from api.routes.admin_routes import router as admin_routes
+from api.routes.metrics_routes import router as metrics_routes
+from api.routes.debug_routes import router as debug_routes
 
 # No need for any other code here
\ No newline at end of file
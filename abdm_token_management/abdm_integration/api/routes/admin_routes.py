@@ -0,0 +1,202 @@
+# api/routes/admin_routes.py
+import hmac
+import asyncio
+from fastapi import APIRouter, HTTPException, Body, Depends, Header, Query
+from pydantic import BaseModel
+from typing import Optional, Dict
+
+from config.settings import settings
+from services.loop_monitor import event_loop_monitor
+from services.memory_profiler import memory_profiler
+from services.admission_control import admission_controller
+from config.logging_config import (
+    setup_logger, get_log_levels, set_log_level, get_sample_rates, set_sample_rates, get_log_queue_stats
+)
+
+# Configure logging
+logger = setup_logger('admin_routes')
+
+def require_admin_key(x_admin_key: Optional[str] = Header(None, alias="X-Admin-Key")):
+    """Reject requests without the configured admin key; admin endpoints are off without one"""
+    if not settings.ADMIN_API_KEY:
+        raise HTTPException(status_code=403, detail="Admin API is disabled. Set ADMIN_API_KEY to enable it.")
+    if not x_admin_key or not hmac.compare_digest(x_admin_key, settings.ADMIN_API_KEY):
+        raise HTTPException(status_code=401, detail="Invalid or missing X-Admin-Key header")
+
+# Create router
+router = APIRouter(
+    prefix="/admin",
+    tags=["Admin"],
+    dependencies=[Depends(require_admin_key)],
+)
+
+class LogLevelRequest(BaseModel):
+    level: str
+    logger: Optional[str] = None
+
+class LogSamplingRequest(BaseModel):
+    rates: Dict[str, Dict[str, float]]
+
+def logging_state():
+    return {
+        "levels": get_log_levels(),
+        "sample_rates": get_sample_rates(),
+        "queue": get_log_queue_stats()
+    }
+
+@router.get("/logging",
+         summary="Get logging configuration",
+         description="Get logger levels, sampling rates and logging queue statistics")
+async def get_logging_config():
+    """
+    Get the current logging configuration of this process
+
+    Returns logger levels, sampling rates and the logging queue depth and drop count
+    """
+    return logging_state()
+
+@router.put("/logging/level",
+         summary="Change log level",
+         description="Change the level of one logger, or of all loggers, without a restart")
+async def update_log_level(request: LogLevelRequest = Body(...)):
+    """
+    Change log levels at runtime
+
+    Parameters:
+    - **level**: DEBUG, INFO, WARNING, ERROR or CRITICAL
+    - **logger**: Optional logger name, e.g. token_manager; all loggers when omitted
+
+    Returns the updated logging configuration
+    """
+    try:
+        set_log_level(request.level, request.logger)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    logger.warning(f"Log level of {request.logger or 'all loggers'} set to {request.level.upper()}")
+    return logging_state()
+
+@router.put("/logging/sampling",
+         summary="Change log sampling rates",
+         description="Replace the per-route, per-level log sampling rates without a restart")
+async def update_log_sampling(request: LogSamplingRequest = Body(...)):
+    """
+    Replace log sampling rates at runtime
+
+    Parameters:
+    - **rates**: Mapping of route -> level -> rate between 0 and 1, e.g.
+      {"/headers": {"INFO": 0.01}}. "*" applies to routes without their own
+      rule. Levels without a rate are always logged; an empty mapping disables sampling.
+
+    Returns the updated logging configuration
+    """
+    try:
+        set_sample_rates(request.rates)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    logger.warning(f"Log sampling rates set to {request.rates}")
+    return logging_state()
+
+@router.get("/event-loop",
+         summary="Get event loop monitor state",
+         description="Get event loop stall thresholds and the most recent stalls with their stacks")
+async def get_event_loop_state():
+    """
+    Get recent event loop stalls
+
+    Each stall lists how long the loop was blocked, the route and request ID
+    being handled, and the stack captured while the loop was blocked.
+    """
+    return event_loop_monitor.stats()
+
+@router.get("/admission",
+         summary="Get admission control state",
+         description="Get the adaptive concurrency limit, in-flight and queued requests of each route group")
+async def get_admission_state():
+    """
+    Get admission control state of this worker
+
+    Returns per route group the current and configured limits, in-flight and
+    queued requests, smoothed latency against its target, and admitted and shed counts
+    """
+    return {
+        "enabled": settings.ADMISSION_CONTROL_ENABLED,
+        "groups": admission_controller.stats()
+    }
+
+def check_group_by(group_by):
+    if group_by not in ("lineno", "filename", "traceback"):
+        raise HTTPException(status_code=400, detail="group_by must be 'lineno', 'filename' or 'traceback'")
+
+@router.get("/memory",
+         summary="Get memory report",
+         description="Get process RSS, tracemalloc totals, per-cache entry counts and sizes, and manager instance counts")
+async def get_memory_report():
+    """
+    Report memory use of this worker
+
+    Cache sizes are deep sizes, extrapolated from a sample of entries for large caches.
+    """
+    # Walking caches and gc objects is CPU-bound, keep it off the event loop
+    return await asyncio.get_running_loop().run_in_executor(None, memory_profiler.report)
+
+@router.post("/memory/tracemalloc",
+         summary="Start tracemalloc",
+         description="Start tracing Python allocations so snapshots can be taken")
+async def start_tracemalloc(
+    frames: int = Query(1, ge=1, le=50, description="Stack frames recorded per allocation; more frames cost more memory and CPU"),
+):
+    """
+    Start tracemalloc
+
+    Tracing slows allocation-heavy code noticeably; stop it when done.
+    """
+    started = memory_profiler.start_tracing(frames)
+    return {"status": "started" if started else "already_running"}
+
+@router.delete("/memory/tracemalloc",
+         summary="Stop tracemalloc",
+         description="Stop tracing allocations and drop stored snapshots")
+async def stop_tracemalloc():
+    """Stop tracemalloc"""
+    stopped = memory_profiler.stop_tracing()
+    return {"status": "stopped" if stopped else "not_running"}
+
+@router.post("/memory/snapshots",
+         summary="Take a memory snapshot",
+         description="Take a tracemalloc snapshot and return the top allocation sites")
+async def take_memory_snapshot(
+    top: int = Query(20, ge=1, le=200, description="Number of allocation sites to return"),
+    group_by: str = Query("lineno", description="'lineno', 'filename' or 'traceback'"),
+):
+    """
+    Take a tracemalloc snapshot
+
+    Returns the snapshot id (for diffs), traced totals and the top allocation sites
+    """
+    check_group_by(group_by)
+    try:
+        return await asyncio.get_running_loop().run_in_executor(None, memory_profiler.take_snapshot, top, group_by)
+    except RuntimeError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+
+@router.get("/memory/snapshots/{old_id}/diff/{new_id}",
+         summary="Diff two memory snapshots",
+         description="Compare two tracemalloc snapshots and return the allocation sites that grew most")
+async def diff_memory_snapshots(
+    old_id: int,
+    new_id: int,
+    top: int = Query(20, ge=1, le=200, description="Number of allocation sites to return"),
+    group_by: str = Query("lineno", description="'lineno', 'filename' or 'traceback'"),
+):
+    """
+    Diff two stored snapshots
+
+    Returns the total growth and the allocation sites ordered by growth
+    """
+    check_group_by(group_by)
+    try:
+        return await asyncio.get_running_loop().run_in_executor(None, memory_profiler.diff, old_id, new_id, top, group_by)
+    except KeyError:
+        raise HTTPException(status_code=404, detail="Snapshot not found; snapshots are dropped when tracemalloc stops or more are taken")
\ No newline at end of file
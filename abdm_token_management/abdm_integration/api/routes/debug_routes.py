@@ -0,0 +1,75 @@
+# api/routes/debug_routes.py
+import re
+import asyncio
+from fastapi import APIRouter, HTTPException, Query, Depends
+from fastapi.responses import PlainTextResponse
+from typing import Optional
+
+from config.logging_config import setup_logger
+from services.loop_monitor import event_loop_monitor
+from services.sampling_profiler import SamplingProfiler, format_collapsed, summarize_stacks, profiler_lock
+from .admin_routes import require_admin_key
+
+# Configure logging
+logger = setup_logger('debug_routes')
+
+# Create router
+router = APIRouter(
+    prefix="/debug",
+    tags=["Admin"],
+    dependencies=[Depends(require_admin_key)],
+)
+
+@router.get("/profile",
+         summary="Profile this worker",
+         description="Sample the stacks of all threads of this worker for N seconds")
+async def profile_worker(
+    seconds: float = Query(10, gt=0, le=120, description="How long to sample"),
+    interval_ms: float = Query(5, ge=1, le=100, description="Milliseconds between samples"),
+    route: Optional[str] = Query(None, description="Only sample stacks handling requests whose 'METHOD /path' matches this regex"),
+    format: str = Query("collapsed", description="'collapsed' for flamegraph.pl/speedscope input, 'json' for the hottest functions"),
+):
+    """
+    Run a sampling profiler across the event loop, executor and scheduler threads
+
+    Parameters:
+    - **seconds**: Sampling duration
+    - **interval_ms**: Sampling interval
+    - **route**: Optional route regex, e.g. enroll-by-aadhaar. Routes are found from the
+      request middleware frame, so only async handlers running on the event loop thread match
+    - **format**: collapsed (download as abdm.folded) or json
+
+    Returns collapsed stacks or a summary of the hottest functions
+    """
+    if format not in ("collapsed", "json"):
+        raise HTTPException(status_code=400, detail="format must be 'collapsed' or 'json'")
+    if route:
+        try:
+            re.compile(route)
+        except re.error as e:
+            raise HTTPException(status_code=400, detail=f"Invalid route pattern: {str(e)}")
+
+    if not profiler_lock.acquire(blocking=False):
+        raise HTTPException(status_code=409, detail="A profile is already running in this worker")
+
+    try:
+        logger.warning(f"Profiling worker for {seconds}s (interval {interval_ms}ms, route {route or 'any'})")
+        profiler = SamplingProfiler(
+            interval=interval_ms / 1000,
+            route_pattern=route,
+            request_frame_codes=event_loop_monitor.request_frame_codes
+        )
+        # Sample from an executor thread so the event loop keeps serving the traffic being profiled
+        stacks = await asyncio.get_running_loop().run_in_executor(None, profiler.run, seconds)
+    finally:
+        profiler_lock.release()
+
+    if format == "json":
+        summary = summarize_stacks(stacks)
+        summary["ticks"] = profiler.samples
+        return summary
+
+    return PlainTextResponse(
+        format_collapsed(stacks),
+        headers={"Content-Disposition": 'attachment; filename="abdm.folded"'}
+    )
\ No newline at end of file
@@ -0,0 +1,88 @@
+# gateway_callback_routes.py - Receivers for asynchronous ABDM gateway v0.5 callbacks
+
+import json
+from fastapi import APIRouter, HTTPException, Depends, Request
+from starlette.concurrency import run_in_threadpool
+
+from config.settings import settings
+from services.gateway_callback_service import gateway_callback_store
+from services.gateway_auth import gateway_token_verifier
+from config.logging_config import setup_logger
+from utils.exceptions import GatewayCallbackAuthError
+
+# Configure logging
+logger = setup_logger('gateway_callback_routes')
+
+async def require_gateway_auth(request: Request):
+    """Reject callbacks that are not signed by the ABDM gateway or come from a disallowed source"""
+    try:
+        # A key fetch may block; signature checks with cached keys are quick either way
+        await run_in_threadpool(
+            gateway_token_verifier.verify,
+            request.headers.get("Authorization"),
+            request.client.host if request.client else None
+        )
+    except GatewayCallbackAuthError as e:
+        raise HTTPException(status_code=e.status_code, detail=e.message)
+
+async def read_limited_body(request: Request, limit):
+    """Read the request body, refusing bodies over limit bytes without buffering them"""
+    content_length = request.headers.get("Content-Length")
+    if content_length and content_length.isdigit() and int(content_length) > limit:
+        raise HTTPException(status_code=413, detail=f"Callback body exceeds {limit} bytes")
+    body = bytearray()
+    async for chunk in request.stream():
+        body.extend(chunk)
+        if len(body) > limit:
+            raise HTTPException(status_code=413, detail=f"Callback body exceeds {limit} bytes")
+    return bytes(body)
+
+# Create router
+router = APIRouter(
+    prefix="/v0.5",
+    tags=["Gateway Callbacks"],
+    dependencies=[Depends(require_gateway_auth)],
+)
+
+@router.post("/{callback_path:path}",
+          status_code=202,
+          summary="Receive gateway callback",
+          description="Receives /v0.5/.../on-* callbacks from the ABDM gateway and hands them to the waiting request")
+async def receive_gateway_callback(
+    callback_path: str,
+    request: Request,
+):
+    """
+    Receive an asynchronous callback from the ABDM gateway
+
+    The callback is correlated using resp.requestId, the requestId of the
+    original gateway request. Only callbacks whose bearer token is signed by
+    the gateway are accepted, and bodies are capped at GATEWAY_CALLBACK_MAX_BODY_BYTES.
+
+    Returns 202 once the callback has been accepted
+    """
+    if not callback_path.rsplit("/", 1)[-1].startswith("on-"):
+        raise HTTPException(status_code=404, detail=f"Unknown gateway callback: /v0.5/{callback_path}")
+
+    body = await read_limited_body(request, settings.GATEWAY_CALLBACK_MAX_BODY_BYTES)
+    try:
+        payload = json.loads(body)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Callback body must be JSON")
+    if not isinstance(payload, dict):
+        raise HTTPException(status_code=400, detail="Callback body must be a JSON object")
+
+    resp = payload.get("resp")
+    request_id = resp.get("requestId") if isinstance(resp, dict) else None
+    if not request_id:
+        logger.warning(f"Gateway callback /v0.5/{callback_path} without resp.requestId")
+        raise HTTPException(status_code=400, detail="resp.requestId is required")
+
+    logger.info(f"Gateway callback received: /v0.5/{callback_path} for {request_id}")
+    matched = await gateway_callback_store.deliver(request_id, payload)
+
+    return {
+        "status": "accepted",
+        "requestId": request_id,
+        "matched": matched
+    }
\ No newline at end of file
@@ -1,7 +1,9 @@
 # health_routes.py - Health check endpoints
 
 from fastapi import APIRouter
+from fastapi.responses import JSONResponse
 from services.token_manager import ABDMTokenManager
+from services.health_prober import health_prober
 from config.logging_config import setup_logger
 
 # Configure logging
@@ -25,4 +27,32 @@ async def health_check():
     
     Returns information about the service status
     """
-    return token_manager.health_check()
\ No newline at end of file
+    return token_manager.health_check()
+
+@router.get("/livez",
+         summary="Liveness check",
+         description="Report that the worker process and its event loop are running; does no I/O")
+async def liveness_check():
+    """
+    Liveness endpoint for orchestrators
+
+    Answering at all proves the event loop is running; nothing else is checked,
+    so a failing dependency never gets the worker restarted.
+    """
+    return {"status": "alive"}
+
+@router.get("/readyz",
+         summary="Readiness check",
+         description="Report whether this worker should receive traffic, from the latest background health probe")
+async def readiness_check():
+    """
+    Readiness endpoint for load balancers and orchestrators
+
+    Served from the result of the background prober, so it does no I/O.
+    Returns 503 until the startup warm-up has finished, and while the token
+    or public key is unusable or the worker is saturated. Unreachable ABDM
+    hosts mark the worker "degraded" without failing the check; upstream
+    latency and the public key age are included in the report.
+    """
+    ready, report = health_prober.readiness_report()
+    return JSONResponse(status_code=200 if ready else 503, content=report)
@@ -0,0 +1,49 @@
+# api/routes/metrics_routes.py
+import anyio
+from fastapi import APIRouter
+from fastapi.responses import PlainTextResponse
+
+from config.logging_config import setup_logger, get_log_queue_stats
+from services.metrics import metrics_registry
+
+# Configure logging
+logger = setup_logger('metrics_routes')
+
+# Create router
+router = APIRouter(
+    prefix="",
+    tags=["Monitoring"],
+)
+
+def _threadpool_stats():
+    # Only valid inside the event loop, which is where /metrics renders
+    limiter = anyio.to_thread.current_default_thread_limiter()
+    return {("in_use",): limiter.borrowed_tokens, ("capacity",): limiter.total_tokens}
+
+metrics_registry.gauge(
+    "log_queue_records", "Log records waiting for the logging listener, and queue capacity", ("state",),
+    callback=lambda: {(key,): value for key, value in get_log_queue_stats().items() if key != "dropped"}
+)
+metrics_registry.gauge(
+    "log_records_dropped", "Log records dropped because the logging queue was full",
+    callback=lambda: get_log_queue_stats()["dropped"]
+)
+metrics_registry.gauge(
+    "threadpool_workers", "Worker threads used by sync handlers and run_in_threadpool, and the pool limit", ("state",),
+    callback=_threadpool_stats
+)
+
+@router.get("/metrics",
+         summary="Prometheus metrics",
+         description="Request, upstream, token, encryption and queue metrics in the Prometheus text format",
+         response_class=PlainTextResponse)
+async def get_metrics():
+    """
+    Export the in-process metrics registry
+
+    Values are per process; with several workers each one must be scraped.
+    """
+    return PlainTextResponse(
+        metrics_registry.render(),
+        media_type="text/plain; version=0.0.4; charset=utf-8"
+    )
\ No newline at end of file
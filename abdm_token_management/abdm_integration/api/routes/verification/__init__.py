@@ -3,6 +3,7 @@ from .aadhaar_routes import router as aadhaar_router
 from .mobile_routes import router as mobile_router
 from .email_routes import router as email_router
 from .enrol_suggestion_routes import router as enrol_suggestion_router
+from .profile_routes import router as profile_router
 
 # Create a main verification router to combine all sub-routes
 router = APIRouter(
@@ -15,4 +16,5 @@ router.include_router(aadhaar_router)
 router.include_router(mobile_router)
 router.include_router(email_router)
 router.include_router(enrol_suggestion_router)
+router.include_router(profile_router)
 # Export the main router
\ No newline at end of file
@@ -7,6 +7,7 @@ from config.settings import settings
 from .models import AadhaarOtpRequest, AadhaarOtpResponse, AbhaEnrollmentRequest, AbhaEnrollmentResponse
 from .utils import encrypt_data, call_abdm_api
 from services.abha_profile_service import ABHAProfileManager
+from services.user_token_service import user_token_cache
 # Configure logging
 logger = setup_logger('aadhaar_routes')
 abha_profile_manager = ABHAProfileManager()
@@ -57,7 +58,7 @@ async def initiate_aadhaar_otp(request: AadhaarOtpRequest = Body(...)):
         }
         
         # 4. Call ABDM API and handle the response
-        response_data = call_abdm_api(
+        response_data = await call_abdm_api(
             settings.ABDM_INITIATE_OTP_API, 
             payload, 
             "Aadhaar OTP initiation"
@@ -146,7 +147,7 @@ async def enroll_by_aadhaar(request: AbhaEnrollmentRequest = Body(...)):
         }
         
         # 4. Call ABDM API
-        response_data = call_abdm_api(
+        response_data = await call_abdm_api(
             settings.ABDM_ENROLL_API, 
             payload, 
             "ABHA enrollment"
@@ -160,6 +161,9 @@ async def enroll_by_aadhaar(request: AbhaEnrollmentRequest = Body(...)):
             abha_profile_manager.save_profile(response_data)
             logger.info(f"ABHA profile saved for {response_data.get('ABHAProfile', {}).get('ABHANumber', 'unknown')}")
 
+            # Cache the user's X-token so profile routes don't need it from the client
+            user_token_cache.store_from_enrollment(response_data)
+
         # Return the FULL response as-is
         return response_data
             
@@ -171,35 +175,4 @@ async def enroll_by_aadhaar(request: AbhaEnrollmentRequest = Body(...)):
         raise HTTPException(
             status_code=500,
             detail=f"Unexpected error occurred: {str(e)}"
-        )
-        
-@router.get("/abha-profile",
-         summary="Get stored ABHA profile",
-         description="Get the complete ABHA profile from storage")
-async def get_abha_profile():
-    """
-    Get the stored ABHA profile information
-    
-    Returns the complete ABHA profile details previously received from ABDM
-    """
-    try:
-        profile = abha_profile_manager.get_profile()
-        
-        if not profile:
-            raise HTTPException(
-                status_code=404,
-                detail="No ABHA profile found. Please complete enrollment first."
-            )
-            
-        return {
-            "status": "success",
-            "profile": profile
-        }
-    except HTTPException:
-        raise
-    except Exception as e:
-        logger.error(f"Error retrieving ABHA profile: {str(e)}")
-        raise HTTPException(
-            status_code=500,
-            detail=f"Failed to retrieve ABHA profile: {str(e)}"
         )
\ No newline at end of file
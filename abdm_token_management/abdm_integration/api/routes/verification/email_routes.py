@@ -1,7 +1,9 @@
 from fastapi import APIRouter, HTTPException, Body
 from .models import EmailVerificationRequest, EmailVerificationResponse
-from .utils import encrypt_data, call_abdm_api
+from .utils import encrypt_data, call_abdm_api, get_x_token_header
+from config.settings import settings
 from config.logging_config import setup_logger
+from services.user_token_service import user_token_cache
 
 logger = setup_logger('email_routes')
 router = APIRouter()
@@ -19,8 +21,8 @@ async def request_email_verification_link(
         logger.info("Requesting email verification link")
         if not req.email or "@" not in req.email:
             raise HTTPException(status_code=400, detail="Valid email address is required")
-        if not req.x_token:
-            raise HTTPException(status_code=400, detail="X-Token header is required")
+        if not req.x_token and not req.abhaNumber:
+            raise HTTPException(status_code=400, detail="Either x_token or abhaNumber is required")
 
         encrypted_email = encrypt_data(req.email, "Email")
         payload = {
@@ -29,21 +31,31 @@ async def request_email_verification_link(
             "loginId": encrypted_email,
             "otpSystem": "abdm"
         }
-        abdm_url = "https://abhasbx.abdm.gov.in/abha/api/v3/profile/account/request/emailVerificationLink"
+        abdm_url = settings.ABDM_EMAIL_VERIFICATION_API
 
-        # Ensure the X-token header includes 'Bearer ' prefix
-        x_token_value = req.x_token.strip()
-        if not x_token_value.lower().startswith("bearer "):
-            x_token_value = f"Bearer {x_token_value}"
+        if req.x_token:
+            # Ensure the X-token header includes 'Bearer ' prefix
+            x_token_value = req.x_token.strip()
+            if not x_token_value.lower().startswith("bearer "):
+                x_token_value = f"Bearer {x_token_value}"
 
-        # Pass x_token as an extra header
-        extra_headers = {"X-token": x_token_value}
-        response_data = call_abdm_api(
-            abdm_url,
-            payload,
-            operation_name="Email Verification Link",
-            extra_headers=extra_headers
-        )
+            # Pass x_token as an extra header
+            extra_headers = {"X-token": x_token_value}
+        else:
+            # Inject the cached (and refreshed if needed) X-token for this ABHA number
+            extra_headers = await get_x_token_header(req.abhaNumber)
+        try:
+            response_data = await call_abdm_api(
+                abdm_url,
+                payload,
+                operation_name="Email Verification Link",
+                extra_headers=extra_headers
+            )
+        except HTTPException as e:
+            # A rejected cached X-token must be refreshed before its next use
+            if e.status_code == 401 and not req.x_token:
+                user_token_cache.invalidate(req.abhaNumber)
+            raise
 
         return {
             "txnId": response_data.get("txnId", ""),
@@ -1,6 +1,7 @@
 from fastapi import APIRouter, HTTPException, Query
 from .models import EnrolSuggestionResponse
 from .utils import call_abdm_api
+from config.settings import settings
 from config.logging_config import setup_logger
 
 logger = setup_logger('enrol_suggestion_routes')
@@ -17,7 +18,7 @@ async def get_enrol_suggestion(
 ):
     try:
         logger.info(f"Fetching ABHA address suggestions for txnId: {txnId}")
-        abdm_url = "https://abhasbx.abdm.gov.in/abha/api/v3/enrollment/enrol/suggestion"
+        abdm_url = settings.ABDM_ENROL_SUGGESTION_API
 
         # Prepare headers (add Transaction_Id)
         extra_headers = {
@@ -25,12 +26,13 @@ async def get_enrol_suggestion(
         }
 
         # No payload for GET; use call_abdm_api with method="GET"
-        response_data = call_abdm_api(
+        response_data = await call_abdm_api(
             abdm_url,
             payload=None,
             operation_name="Enrol Suggestion",
             extra_headers=extra_headers,
-            method="GET"
+            method="GET",
+            hedge=True  # Read-only lookup, safe to repeat
         )
 
         return {
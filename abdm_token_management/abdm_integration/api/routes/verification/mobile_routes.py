@@ -3,6 +3,7 @@ from pydantic import BaseModel, Field
 from typing import List, Optional
 from datetime import datetime
 from .utils import encrypt_data, call_abdm_api
+from config.settings import settings
 from config.logging_config import setup_logger
 
 logger = setup_logger('mobile_routes')
@@ -54,8 +55,8 @@ async def initiate_mobile_otp(request: MobileOtpRequest = Body(...)):
             "loginId": encrypted_mobile,
             "otpSystem": "abdm"
         }
-        abdm_url = "https://abhasbx.abdm.gov.in/abha/api/v3/enrollment/request/otp"
-        response_data = call_abdm_api(
+        abdm_url = settings.ABDM_INITIATE_OTP_API
+        response_data = await call_abdm_api(
             abdm_url,
             payload,
             operation_name="Mobile Update OTP"
@@ -101,8 +102,8 @@ async def auth_by_mobile_otp(request: MobileUpdateAuthRequest = Body(...)):
                 }
             }
         }
-        abdm_url = "https://abhasbx.abdm.gov.in/abha/api/v3/enrollment/auth/byAbdm"
-        response_data = call_abdm_api(
+        abdm_url = settings.ABDM_AUTH_BY_ABDM_API
+        response_data = await call_abdm_api(
             abdm_url,
             payload,
             operation_name="Mobile Update Auth By OTP"
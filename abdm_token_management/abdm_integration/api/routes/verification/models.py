@@ -1,6 +1,6 @@
 # api/routes/verification/models.py
 from pydantic import BaseModel, Field
-from typing import Optional, List, Dict
+from typing import Optional, List, Dict, Any
 
 class AadhaarOtpRequest(BaseModel):
     aadhaar: str = Field(..., description="Aadhaar number to send OTP to")
@@ -28,6 +28,10 @@ class ABHAProfile(BaseModel):
     status: str
     profile: Dict
 
+class ABHAProfileUpdateRequest(BaseModel):
+    ABHAProfile: Dict[str, Any] = Field(..., description="ABHAProfile fields to update")
+    expectedVersion: Optional[int] = Field(default=None, description="Reject the update unless the profile is still at this version")
+
 class ABHAProfileDetails(BaseModel):
     firstName: Optional[str] = None
     middleName: Optional[str] = None
@@ -52,7 +56,8 @@ class MobileOtpResponse(BaseModel):
 
 class EmailVerificationRequest(BaseModel):
     email: str = Field(..., description="User's email address to verify")
-    x_token: str = Field(..., description="X-token for ABDM API header")
+    x_token: Optional[str] = Field(default=None, description="X-token for ABDM API header (looked up from abhaNumber if omitted)")
+    abhaNumber: Optional[str] = Field(default=None, description="ABHA number whose cached X-token should be used")
 
 class EmailVerificationResponse(BaseModel):
     txnId: str
@@ -0,0 +1,320 @@
+# api/routes/verification/profile_routes.py
+from fastapi import APIRouter, HTTPException, Query, Request, Response, Body, Depends
+from fastapi.responses import FileResponse, StreamingResponse
+from starlette.concurrency import run_in_threadpool
+from typing import Optional
+
+from config.logging_config import setup_logger
+from services.abha_profile_service import ABHAProfileManager
+from services.profile_export import iter_profile_ndjson, gzip_chunks, normalize_updated_since
+from services.profile_search_index import check_prefix_lengths
+from utils.exceptions import ProfileVersionConflictError, SearchIndexBuildingError
+from .models import ABHAProfileUpdateRequest
+from ..admin_routes import require_admin_key
+
+# Configure logging
+logger = setup_logger('profile_routes')
+abha_profile_manager = ABHAProfileManager()
+
+# Create router - we'll combine this into the main verification router
+router = APIRouter()
+
+def resolve_abha_number(abhaNumber=None, mobile=None, phrAddress=None, txnId=None):
+    """
+    Resolve the ABHA number addressed by a profile request
+
+    A mobile number can be shared by several profiles; the most recently
+    updated one is used. Returns None to mean the latest profile.
+    """
+    if abhaNumber or not (mobile or phrAddress or txnId):
+        return abhaNumber
+
+    matches = abha_profile_manager.find_abha_numbers(mobile=mobile, phr_address=phrAddress, txn_id=txnId)
+    if not matches:
+        raise HTTPException(
+            status_code=404,
+            detail="No ABHA profile found for the given lookup."
+        )
+    return matches[0]
+
+def etag_matches(if_none_match, etag):
+    """Check an If-None-Match header against an ETag, ignoring weak and encoding variants"""
+    if not if_none_match:
+        return False
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if candidate == "*":
+            return True
+        if candidate.startswith("W/"):
+            candidate = candidate[2:]
+        candidate = candidate.strip('"')
+        if candidate.endswith("-gz"):
+            candidate = candidate[:-3]
+        if candidate == etag:
+            return True
+    return False
+
+def serve_profile_body(request, entry):
+    """Serve a pre-serialized profile body as-is, honouring If-None-Match and Accept-Encoding"""
+    etag, body, body_gzip, version = entry
+    # The version is stored with the body, so the two always describe the same record
+    headers = {"ETag": f'"{etag}"', "Vary": "Accept-Encoding", "X-Profile-Version": str(version)}
+
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=headers)
+
+    if body_gzip is not None and "gzip" in request.headers.get("accept-encoding", "").lower():
+        headers["ETag"] = f'"{etag}-gz"'
+        headers["Content-Encoding"] = "gzip"
+        return Response(content=body_gzip, media_type="application/json", headers=headers)
+
+    return Response(content=body, media_type="application/json", headers=headers)
+
+@router.get("/abha-profile",
+         summary="Get stored ABHA profile",
+         description="Get a complete ABHA profile from storage by ABHA number, mobile, PHR address or txnId")
+async def get_abha_profile(
+    request: Request,
+    abhaNumber: Optional[str] = Query(None, description="ABHA number of the profile"),
+    mobile: Optional[str] = Query(None, description="Mobile number linked to the profile"),
+    phrAddress: Optional[str] = Query(None, description="PHR (ABHA) address of the profile"),
+    txnId: Optional[str] = Query(None, description="Transaction ID the profile was enrolled with"),
+    include_photo: bool = Query(True, description="Include the base64 photo (use /abha-profile/photo to fetch it separately)"),
+    fields: Optional[str] = Query(None, description="Comma-separated list of fields to return, e.g. firstName,lastName,mobile"),
+):
+    """
+    Get stored ABHA profile information
+
+    Without any lookup parameters the most recently updated profile is returned.
+    Unless fields are selected, the response is served from the body
+    pre-serialized at save time, with ETag/304 and gzip support.
+
+    Returns the complete ABHA profile details previously received from ABDM
+    """
+    try:
+        abha_number = resolve_abha_number(abhaNumber, mobile, phrAddress, txnId)
+
+        if not fields:
+            entry = abha_profile_manager.get_profile_body(abha_number, include_photo=include_photo)
+            if entry is None:
+                raise HTTPException(
+                    status_code=404,
+                    detail="No ABHA profile found. Please complete enrollment first."
+                )
+            return serve_profile_body(request, entry)
+
+        field_list = [field.strip() for field in fields.split(",") if field.strip()]
+
+        profile = abha_profile_manager.get_profile(abha_number, include_photo=include_photo, fields=field_list)
+
+        if not profile:
+            raise HTTPException(
+                status_code=404,
+                detail="No ABHA profile found. Please complete enrollment first."
+            )
+
+        return {
+            "status": "success",
+            "profile": profile
+        }
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error retrieving ABHA profile: {str(e)}")
+        raise HTTPException(
+            status_code=500,
+            detail=f"Failed to retrieve ABHA profile: {str(e)}"
+        )
+
+@router.get("/abha-profile/search",
+         summary="Search stored ABHA profiles",
+         description="Search profiles by partial name, mobile, PHR address, district or state code")
+async def search_abha_profiles(
+    name: Optional[str] = Query(None, description="Name or name prefixes, e.g. 'jay wank'"),
+    mobile: Optional[str] = Query(None, description="Mobile number or its leading digits"),
+    phrAddress: Optional[str] = Query(None, description="PHR address or its prefix"),
+    districtCode: Optional[str] = Query(None, description="District code"),
+    stateCode: Optional[str] = Query(None, description="State code"),
+    offset: int = Query(0, ge=0, description="Number of results to skip"),
+    limit: int = Query(20, ge=1, le=100, description="Maximum number of results"),
+):
+    """
+    Search stored ABHA profiles
+
+    All given criteria must match. Results are ordered by ABHA number and
+    served from in-memory indexes; until the index is built this returns 503.
+    Prefixes must have at least 2 (name), 4 (mobile) or 3 (PHR address) characters.
+
+    Returns the total number of matches and one page of profile summaries
+    """
+    try:
+        if not any((name, mobile, phrAddress, districtCode, stateCode)):
+            raise HTTPException(status_code=400, detail="At least one search criterion is required")
+        try:
+            check_prefix_lengths(name, mobile, phrAddress)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+
+        # Matching takes time proportional to the candidates, so keep it off the event loop
+        total, results = await run_in_threadpool(
+            abha_profile_manager.search_profiles,
+            name=name,
+            mobile=mobile,
+            phr_address=phrAddress,
+            district_code=districtCode,
+            state_code=stateCode,
+            offset=offset,
+            limit=limit
+        )
+
+        return {
+            "status": "success",
+            "total": total,
+            "offset": offset,
+            "limit": limit,
+            "results": results
+        }
+    except SearchIndexBuildingError as e:
+        raise HTTPException(status_code=503, detail=e.message, headers={"Retry-After": "5"})
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error searching ABHA profiles: {str(e)}")
+        raise HTTPException(
+            status_code=500,
+            detail=f"Failed to search ABHA profiles: {str(e)}"
+        )
+
+@router.get("/abha-profile/export",
+         summary="Export stored ABHA profiles",
+         description="Stream all stored ABHA profiles as NDJSON, optionally only those updated since a timestamp",
+         dependencies=[Depends(require_admin_key)])
+async def export_abha_profiles(
+    updated_since: Optional[str] = Query(None, description="Only export profiles updated at or after this ISO 8601 timestamp"),
+    include_photo: bool = Query(False, description="Include the base64 photo of each profile"),
+    gzip: bool = Query(False, description="Gzip the export on the fly (served as abha_profiles.ndjson.gz)"),
+):
+    """
+    Stream stored ABHA profiles as NDJSON for bulk syncs
+
+    Each line holds ABHANumber, savedAt, updatedAt, version and profile; the
+    profile's tokens block is never exported. Requires the X-Admin-Key header.
+    Profiles are read and written incrementally, so memory use stays constant
+    however many profiles are exported. Use the largest updatedAt seen as the
+    next updated_since for incremental syncs.
+    """
+    try:
+        normalize_updated_since(updated_since)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="updated_since must be an ISO 8601 timestamp")
+
+    logger.info(f"Exporting ABHA profiles (updated_since={updated_since}, include_photo={include_photo}, gzip={gzip})")
+    chunks = iter_profile_ndjson(abha_profile_manager, updated_since=updated_since, include_photo=include_photo)
+
+    if gzip:
+        return StreamingResponse(
+            gzip_chunks(chunks),
+            media_type="application/gzip",
+            headers={"Content-Disposition": 'attachment; filename="abha_profiles.ndjson.gz"'}
+        )
+    return StreamingResponse(
+        chunks,
+        media_type="application/x-ndjson",
+        headers={"Content-Disposition": 'attachment; filename="abha_profiles.ndjson"'}
+    )
+
+@router.patch("/abha-profile",
+         summary="Update stored ABHA profile",
+         description="Apply a field-level update to a stored ABHA profile with optimistic concurrency")
+async def update_abha_profile(
+    request: ABHAProfileUpdateRequest = Body(...),
+    abhaNumber: Optional[str] = Query(None, description="ABHA number of the profile"),
+    mobile: Optional[str] = Query(None, description="Mobile number linked to the profile"),
+    phrAddress: Optional[str] = Query(None, description="PHR (ABHA) address of the profile"),
+    txnId: Optional[str] = Query(None, description="Transaction ID the profile was enrolled with"),
+):
+    """
+    Update fields of a stored ABHA profile
+
+    Parameters:
+    - **ABHAProfile**: The ABHAProfile fields to change
+    - **expectedVersion**: Optional version the update is based on (see the X-Profile-Version
+      header of /abha-profile); the update fails with 409 if the profile has changed since
+
+    Returns the new profile version
+    """
+    try:
+        abha_number = resolve_abha_number(abhaNumber, mobile, phrAddress, txnId)
+        if abha_number is None:
+            abha_number = request.ABHAProfile.get("ABHANumber")
+        if not abha_number:
+            raise HTTPException(status_code=400, detail="ABHA number or a profile lookup is required")
+        if request.ABHAProfile.get("ABHANumber", abha_number) != abha_number:
+            raise HTTPException(status_code=400, detail="ABHANumber cannot be changed")
+
+        version = abha_profile_manager.update_profile(
+            {"ABHAProfile": request.ABHAProfile},
+            abha_number=abha_number,
+            expected_version=request.expectedVersion
+        )
+        if not version:
+            raise HTTPException(
+                status_code=404,
+                detail="No ABHA profile found to update."
+            )
+
+        return {
+            "status": "success",
+            "abhaNumber": abha_number,
+            "version": version
+        }
+    except HTTPException:
+        raise
+    except ProfileVersionConflictError:
+        raise
+    except Exception as e:
+        logger.error(f"Error updating ABHA profile: {str(e)}")
+        raise HTTPException(
+            status_code=500,
+            detail=f"Failed to update ABHA profile: {str(e)}"
+        )
+
+@router.get("/abha-profile/photo",
+         summary="Get ABHA profile photo",
+         description="Stream the stored ABHA profile photo as an image")
+async def get_abha_profile_photo(
+    request: Request,
+    abhaNumber: Optional[str] = Query(None, description="ABHA number of the profile"),
+    mobile: Optional[str] = Query(None, description="Mobile number linked to the profile"),
+    phrAddress: Optional[str] = Query(None, description="PHR (ABHA) address of the profile"),
+    txnId: Optional[str] = Query(None, description="Transaction ID the profile was enrolled with"),
+):
+    """
+    Stream the photo of a stored ABHA profile
+
+    The ETag is the photo's content hash, so clients can revalidate cheaply.
+    """
+    try:
+        abha_number = resolve_abha_number(abhaNumber, mobile, phrAddress, txnId)
+        photo = abha_profile_manager.get_photo(abha_number)
+
+        if not photo:
+            raise HTTPException(
+                status_code=404,
+                detail="No photo found for this ABHA profile."
+            )
+
+        digest, path, media_type = photo
+        etag = f'"{digest}"'
+        if etag_matches(request.headers.get("if-none-match"), digest):
+            return Response(status_code=304, headers={"ETag": etag})
+
+        return FileResponse(path, media_type=media_type, headers={"ETag": etag})
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error retrieving ABHA profile photo: {str(e)}")
+        raise HTTPException(
+            status_code=500,
+            detail=f"Failed to retrieve ABHA profile photo: {str(e)}"
+        )
\ No newline at end of file
@@ -1,4 +1,4 @@
-import uuid
+import time
 from datetime import datetime
 from fastapi import HTTPException
 import requests
@@ -6,28 +6,38 @@ from typing import Dict, Any, Optional
 from datetime import datetime, timezone
 
 
-from config.logging_config import setup_logger
+from config.logging_config import setup_logger, outbound_request_id
 from config.settings import settings
 from services.token_manager import ABDMTokenManager
 from services.public_key_service import ABDMPublicKeyManager
-from utils.exceptions import PublicKeyError
+from services.user_token_service import user_token_cache
+from services.metrics import metrics_registry
+from services.http_client import abdm_session, hedged_get
+from services.request_timing import request_phase
+from services.deadline import remaining_budget, outbound_timeout, run_blocking
+from utils.exceptions import PublicKeyError, UserTokenError
 
 # Configure logging and initialize managers
 logger = setup_logger('verification_utils')
 token_manager = ABDMTokenManager()
 public_key_manager = ABDMPublicKeyManager()
 
+upstream_duration = metrics_registry.histogram(
+    "abdm_upstream_request_duration_seconds", "ABDM API call latency by operation and HTTP status", ("operation", "status")
+)
+
 def prepare_abdm_headers() -> Dict[str, str]:
     """Prepare headers for ABDM API calls with valid token and ISO 8601 timestamp with milliseconds and Z."""
     try:
-        headers = token_manager.get_headers()
-        headers["Content-Type"] = "application/json"
-        headers["REQUEST-ID"] = str(uuid.uuid4())
-        # ISO 8601 with milliseconds and Z (e.g. 2025-06-15T21:31:46.123Z)
-        headers["TIMESTAMP"] = datetime.utcnow().isoformat(timespec='milliseconds') + 'Z'
-        headers["Accept"] = "*/*"
-        headers["Connection"] = "keep-alive"
-        return headers
+        with request_phase("headers"):
+            headers = token_manager.get_headers()
+            headers["Content-Type"] = "application/json"
+            headers["REQUEST-ID"] = outbound_request_id()
+            # ISO 8601 with milliseconds and Z (e.g. 2025-06-15T21:31:46.123Z)
+            headers["TIMESTAMP"] = datetime.utcnow().isoformat(timespec='milliseconds') + 'Z'
+            headers["Accept"] = "*/*"
+            headers["Connection"] = "keep-alive"
+            return headers
     except Exception as e:
         logger.error(f"Failed to prepare headers: {str(e)}")
         raise HTTPException(
@@ -48,29 +58,67 @@ def encrypt_data(data: str, purpose: str) -> str:
             detail=f"Failed to encrypt {purpose}: {str(e)}"
         )
 
-def call_abdm_api(
+async def get_x_token_header(abha_number: str) -> Dict[str, str]:
+    """Get the X-token header for a user from the per-ABHA token cache, refreshing if needed"""
+    try:
+        x_token = await user_token_cache.get_x_token(abha_number)
+        return {"X-token": f"Bearer {x_token}"}
+    except UserTokenError as e:
+        logger.warning(f"No usable X-token for {abha_number}: {str(e)}")
+        raise HTTPException(
+            status_code=401,
+            detail=f"X-token unavailable: {str(e)}"
+        )
+
+async def call_abdm_api(
     endpoint: str,
     payload: Optional[Dict[str, Any]],
     operation_name: str,
     extra_headers: Optional[Dict[str, str]] = None,
-    method: str = "POST"   # <-- Add this line
+    method: str = "POST",   # <-- Add this line
+    hedge: bool = False
 ) -> Dict[str, Any]:
     """
     Make a call to ABDM API with error handling.
     Allows injecting extra headers (e.g., 'X-token').
     Supports both POST and GET methods.
+    GETs that are safe to repeat can set hedge to send a second request when the first is slow.
+    The blocking request runs in the threadpool so the event loop keeps serving other routes.
     """
+    return await run_blocking(_call_abdm_api, endpoint, payload, operation_name, extra_headers, method, hedge)
+
+def _call_abdm_api(
+    endpoint: str,
+    payload: Optional[Dict[str, Any]],
+    operation_name: str,
+    extra_headers: Optional[Dict[str, str]],
+    method: str,
+    hedge: bool
+) -> Dict[str, Any]:
     headers = prepare_abdm_headers()
     if extra_headers:
         headers.update(extra_headers)
-    logger.info(f"Sending {operation_name} request to {endpoint}")
+
+    # Don't start a call the caller will not wait for
+    remaining = remaining_budget()
+    if remaining is not None and remaining <= 0:
+        logger.warning(f"Skipping {operation_name} request, request deadline already passed")
+        raise HTTPException(status_code=504, detail="Request deadline exceeded before calling ABDM API")
+    timeout = outbound_timeout(settings.ABDM_API_TIMEOUT_SECONDS)
+
+    logger.info(f"Sending {operation_name} request to {endpoint} (REQUEST-ID {headers['REQUEST-ID']}, timeout {timeout:.1f}s)")
+    started = time.monotonic()
     
     try:
-        if method.upper() == "GET":
-            response = requests.get(endpoint, headers=headers, timeout=30)
-        else:
-            response = requests.post(endpoint, headers=headers, json=payload, timeout=30)
+        with request_phase("upstream"):
+            if method.upper() == "GET" and hedge:
+                response = hedged_get(endpoint, operation_name, headers=headers, timeout=timeout)
+            elif method.upper() == "GET":
+                response = abdm_session.get(endpoint, headers=headers, timeout=timeout)
+            else:
+                response = abdm_session.post(endpoint, headers=headers, json=payload, timeout=timeout)
         
+        upstream_duration.labels(operation_name, str(response.status_code)).observe(time.monotonic() - started)
         logger.debug(f"ABDM API response status: {response.status_code}")
         
         if response.status_code != 200:
@@ -91,6 +139,7 @@ def call_abdm_api(
         return response.json()
         
     except requests.RequestException as e:
+        upstream_duration.labels(operation_name, "error").observe(time.monotonic() - started)
         logger.error(f"Request to ABDM API failed: {str(e)}")
         raise HTTPException(
             status_code=502,
@@ -1,36 +1,373 @@
 # logging_config.py - Logging configuration for the application
 
-import logging
-import sys
-from datetime import datetime
 import os
+import sys
+import glob
+import json
+import gzip
+import queue
+import atexit
+import random
+import shutil
+import uuid
+import logging
+import threading
+import contextvars
+import logging.handlers
+from datetime import datetime, timedelta, timezone
+from config.settings import settings
 
 # Ensure logs directory exists
-os.makedirs("logs", exist_ok=True)
+os.makedirs(settings.LOG_DIR, exist_ok=True)
+
+LOG_FORMAT = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+
+# Per-request logging context, set by the request logging middleware
+request_id_var = contextvars.ContextVar("request_id", default=None)
+route_var = contextvars.ContextVar("route", default=None)
+sample_draw_var = contextvars.ContextVar("sample_draw", default=None)
+_request_id_claimed = contextvars.ContextVar("request_id_claimed", default=None)
+
+# LogRecord attributes that are not user-supplied extra fields
+_RECORD_ATTRIBUTES = set(vars(logging.LogRecord("", 0, "", 0, "", None, None))) | {"message", "asctime", "request_id", "route", "sample_rate"}
+
+def bind_request_context(request_id, route):
+    """
+    Bind the request ID and route to log records emitted while handling a request
+
+    Also draws the request's sampling number, so a request's records are
+    either all kept or all dropped for a given rate.
+
+    Returns:
+        Tokens to pass to reset_request_context
+    """
+    return (
+        request_id_var.set(request_id),
+        route_var.set(route),
+        sample_draw_var.set(random.random()),
+        _request_id_claimed.set([False])
+    )
+
+def reset_request_context(tokens):
+    """Restore the logging context saved by bind_request_context"""
+    request_id_token, route_token, sample_token, claimed_token = tokens
+    request_id_var.reset(request_id_token)
+    route_var.reset(route_token)
+    sample_draw_var.reset(sample_token)
+    _request_id_claimed.reset(claimed_token)
+
+def outbound_request_id():
+    """
+    REQUEST-ID header value for an outbound ABDM call
+
+    The first call made while handling a request reuses the inbound request
+    ID (when it is a UUID) so gateway-side and local logs correlate; later
+    calls get fresh UUIDs, as ABDM expects a unique REQUEST-ID per call.
+    """
+    claimed = _request_id_claimed.get()
+    request_id = request_id_var.get()
+    if claimed is not None and not claimed[0] and request_id:
+        claimed[0] = True
+        try:
+            return str(uuid.UUID(request_id))
+        except ValueError:
+            pass
+    return str(uuid.uuid4())
+
+class JsonFormatter(logging.Formatter):
+    """Format records as one JSON object per line, with extra fields as keys"""
+
+    def format(self, record):
+        entry = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage()
+        }
+        for key in ("request_id", "route"):
+            value = getattr(record, key, None)
+            if value is not None:
+                entry[key] = value
+        sample_rate = getattr(record, "sample_rate", 1.0)
+        if sample_rate < 1.0:
+            entry["sample_rate"] = sample_rate
+        for key, value in record.__dict__.items():
+            if key not in _RECORD_ATTRIBUTES and not key.startswith("_"):
+                entry[key] = value
+        if record.exc_text:
+            entry["exception"] = record.exc_text
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+def parse_sample_rates(value):
+    """
+    Parse sampling rates from a JSON mapping of route -> level -> rate
+
+    e.g. {"/headers": {"INFO": 0.01}, "*": {"DEBUG": 0.1}}; "*" applies to
+    routes without their own rule and to records outside any request.
+    """
+    if not value:
+        return {}
+    rates = json.loads(value) if isinstance(value, str) else value
+    parsed = {}
+    for route, levels in rates.items():
+        parsed[route] = {}
+        for level, rate in levels.items():
+            levelno = logging.getLevelName(level.upper()) if isinstance(level, str) else int(level)
+            if not isinstance(levelno, int):
+                raise ValueError(f"Unknown log level: {level}")
+            rate = float(rate)
+            if not 0.0 <= rate <= 1.0:
+                raise ValueError(f"Sample rate must be between 0 and 1: {rate}")
+            parsed[route][levelno] = rate
+    return parsed
+
+class SamplingFilter(logging.Filter):
+    """
+    Keep a fraction of records per route and level
+
+    Levels without a rate are always kept. The decision uses the request's
+    sampling draw, so the kept requests keep all their lines. Runs before
+    records are queued, so dropped records cost almost nothing.
+    """
+
+    def __init__(self, rates=None):
+        super().__init__()
+        self.rates = rates or {}
+
+    def rate_for(self, route, levelno):
+        rates = self.rates.get(route) if route is not None else None
+        if rates is None or levelno not in rates:
+            rates = self.rates.get("*", {})
+        return rates.get(levelno, 1.0)
+
+    def filter(self, record):
+        if not self.rates:
+            return True
+        rate = self.rate_for(route_var.get(), record.levelno)
+        if rate >= 1.0:
+            return True
+        draw = sample_draw_var.get()
+        if draw is None:
+            draw = random.random()
+        if draw < rate:
+            record.sample_rate = rate
+            return True
+        return False
+
+class DailySizeRotatingFileHandler(logging.handlers.BaseRotatingHandler):
+    """
+    Writes to <log_dir>/<prefix>_YYYYMMDD.log, starting a new file at midnight
+    and whenever the current file grows past max_bytes
+
+    Finished files are gzip-compressed (<prefix>_YYYYMMDD.log.gz, or
+    <prefix>_YYYYMMDD.N.log.gz for size rollovers) and only the newest
+    backup_count compressed files matching <prune_prefix>_* are kept.
+    """
+
+    def __init__(self, log_dir, prefix="abdm", max_bytes=0, backup_count=0, compress=True, prune_prefix=None):
+        self.log_dir = log_dir
+        self.prefix = prefix
+        self.prune_prefix = prune_prefix or prefix
+        self.max_bytes = max_bytes
+        self.backup_count = backup_count
+        self.compress = compress
+        self.current_date = datetime.now().strftime('%Y%m%d')
+        self.next_rollover_at = self._next_midnight()
+        # Opened on the first write, by the listener thread rather than whoever imports first
+        super().__init__(self._path_for(self.current_date), mode='a', encoding='utf-8', delay=True)
+
+    def _path_for(self, date):
+        return os.path.join(self.log_dir, f"{self.prefix}_{date}.log")
+
+    def _next_midnight(self):
+        tomorrow = datetime.now().date() + timedelta(days=1)
+        return datetime(tomorrow.year, tomorrow.month, tomorrow.day).timestamp()
+
+    def shouldRollover(self, record):
+        if record.created >= self.next_rollover_at:
+            return True
+        if self.max_bytes > 0:
+            if self.stream is None:
+                self.stream = self._open()
+            return self.stream.tell() >= self.max_bytes
+        return False
+
+    def doRollover(self):
+        if self.stream:
+            self.stream.close()
+            self.stream = None
+
+        finished = self.baseFilename
+        today = datetime.now().strftime('%Y%m%d')
+        if today != self.current_date:
+            # New day: the finished file keeps its date, the new one gets today's
+            self.current_date = today
+            self.next_rollover_at = self._next_midnight()
+            self.baseFilename = os.path.abspath(self._path_for(today))
+        else:
+            # Size rollover within the day: move the current file aside
+            index = 1
+            while glob.glob(os.path.join(self.log_dir, f"{self.prefix}_{today}.{index}.log*")):
+                index += 1
+            rotated = os.path.join(self.log_dir, f"{self.prefix}_{today}.{index}.log")
+            os.replace(finished, rotated)
+            finished = rotated
+
+        if self.compress and os.path.exists(finished):
+            self._compress(finished)
+        self._prune()
+        self.stream = self._open()
+
+    def _compress(self, path):
+        try:
+            with open(path, 'rb') as source, gzip.open(path + '.gz', 'wb') as target:
+                shutil.copyfileobj(source, target)
+            os.remove(path)
+        except OSError as e:
+            sys.stderr.write(f"Failed to compress log file {path}: {e}\n")
+
+    def _prune(self):
+        if self.backup_count <= 0:
+            return
+        backups = sorted(glob.glob(os.path.join(self.log_dir, f"{self.prune_prefix}_*.log.gz")), key=os.path.getmtime)
+        for path in backups[:-self.backup_count]:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+class NonBlockingQueueHandler(logging.handlers.QueueHandler):
+    """
+    Queue handler that never blocks the caller
+
+    Only the message is merged here (arguments may change after the call);
+    formatting and I/O happen on the listener thread. When the queue is full
+    the record is dropped and counted.
+    """
+
+    def __init__(self, log_queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record):
+        if record.exc_info and not record.exc_text:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+        record.request_id = request_id_var.get()
+        record.route = route_var.get()
+        record.message = record.getMessage()
+        record.msg = record.message
+        record.args = None
+        record.exc_info = None
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+# The single logging pipeline shared by every named logger
+_queue_handler = None
+_listener = None
+_pipeline_lock = threading.Lock()
+_sampling_filter = SamplingFilter(parse_sample_rates(settings.LOG_SAMPLE_RATES))
+_configured_loggers = set()
+
+def _get_queue_handler():
+    """Start the logging pipeline on first use and return its queue handler"""
+    global _queue_handler, _listener
+    with _pipeline_lock:
+        if _queue_handler is None:
+            formatter = JsonFormatter() if settings.LOG_FORMAT == "json" else logging.Formatter(LOG_FORMAT)
+
+            # Console handler
+            console_handler = logging.StreamHandler(sys.stderr if settings.LOG_CONSOLE_STREAM == "stderr" else sys.stdout)
+            console_handler.setFormatter(formatter)
+
+            # File handler - rotated daily and by size, compressed. Worker processes
+            # each write their own file, since rotating a shared file would race
+            workers = settings.WORKERS if settings.MULTI_WORKER else 1
+            file_handler = DailySizeRotatingFileHandler(
+                settings.LOG_DIR,
+                prefix=f"abdm_w{os.getpid()}" if settings.MULTI_WORKER else "abdm",
+                max_bytes=settings.LOG_MAX_BYTES,
+                backup_count=settings.LOG_BACKUP_COUNT * workers,
+                compress=settings.LOG_COMPRESS,
+                prune_prefix="abdm"
+            )
+            file_handler.setFormatter(formatter)
+
+            log_queue = queue.Queue(settings.LOG_QUEUE_SIZE)
+            _queue_handler = NonBlockingQueueHandler(log_queue)
+            _queue_handler.addFilter(_sampling_filter)
+            _listener = logging.handlers.QueueListener(
+                log_queue, console_handler, file_handler, respect_handler_level=True
+            )
+            _listener.start()
+            atexit.register(stop_logging)
+        return _queue_handler
+
+def stop_logging():
+    """Flush queued records and stop the listener thread"""
+    global _listener
+    with _pipeline_lock:
+        if _listener is not None:
+            _listener.stop()
+            _listener = None
+
+def get_log_queue_stats():
+    """Get the depth of the logging queue and the number of records dropped"""
+    if _queue_handler is None:
+        return {"queued": 0, "capacity": settings.LOG_QUEUE_SIZE, "dropped": 0}
+    return {
+        "queued": _queue_handler.queue.qsize(),
+        "capacity": settings.LOG_QUEUE_SIZE,
+        "dropped": _queue_handler.dropped
+    }
+
+def get_sample_rates():
+    """Get the current sampling rates as route -> level name -> rate"""
+    return {
+        route: {logging.getLevelName(levelno): rate for levelno, rate in levels.items()}
+        for route, levels in _sampling_filter.rates.items()
+    }
+
+def set_sample_rates(rates):
+    """
+    Replace the sampling rates at runtime
+
+    Raises:
+        ValueError: if a level or rate is invalid
+    """
+    _sampling_filter.rates = parse_sample_rates(rates)
+
+def get_log_levels():
+    """Get the level of every logger created through setup_logger"""
+    return {name: logging.getLevelName(logging.getLogger(name).level) for name in sorted(_configured_loggers)}
+
+def set_log_level(level, name=None):
+    """
+    Change the level of one logger, or of all of them when name is None
+
+    Raises:
+        ValueError: if the level or logger name is unknown
+    """
+    levelno = logging.getLevelName(level.upper())
+    if not isinstance(levelno, int):
+        raise ValueError(f"Unknown log level: {level}")
+    if name is not None and name not in _configured_loggers:
+        raise ValueError(f"Unknown logger: {name}")
+    for logger_name in ([name] if name is not None else _configured_loggers):
+        logging.getLogger(logger_name).setLevel(levelno)
 
 def setup_logger(name='abdm_integration'):
-    """Set up a logger with consistent formatting and handlers"""
+    """Set up a logger that feeds the shared non-blocking logging pipeline"""
     logger = logging.getLogger(name)
-    
+
     # Only configure if not already set up
     if not logger.handlers:
-        logger.setLevel(logging.INFO)
-        
-        # Console handler
-        console_handler = logging.StreamHandler(sys.stdout)
-        console_handler.setLevel(logging.INFO)
-        console_format = logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s')
-        console_handler.setFormatter(console_format)
-        
-        # File handler - rotated daily
-        log_filename = f"logs/abdm_{datetime.now().strftime('%Y%m%d')}.log"
-        file_handler = logging.FileHandler(log_filename)
-        file_handler.setLevel(logging.INFO)
-        file_format = logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s')
-        file_handler.setFormatter(file_format)
-        
-        # Add handlers
-        logger.addHandler(console_handler)
-        logger.addHandler(file_handler)
-    
+        logger.setLevel(settings.LOG_LEVEL)
+        logger.addHandler(_get_queue_handler())
+        _configured_loggers.add(name)
+
     return logger
\ No newline at end of file
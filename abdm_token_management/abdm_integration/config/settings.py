@@ -6,41 +6,179 @@ class Settings:
     def __init__(self):
         # File paths
         self.TOKEN_FILE_PATH = os.environ.get("ABDM_TOKEN_FILE", "abdm_token.json")
+        self.TOKEN_REFRESH_LOCK_FILE = os.environ.get("ABDM_TOKEN_REFRESH_LOCK_FILE", f"{self.TOKEN_FILE_PATH}.lock")  # Held by the worker refreshing the token
         
         # Token renewal settings
         self.TOKEN_REFRESH_BUFFER_SECONDS = 120  # Refresh 2 minutes before expiry
         self.TOKEN_REFRESH_INTERVAL = timedelta(minutes=15)  # Proactively check every 15 minutes
-        self.ABHA_PROFILE_FILE_PATH = os.environ.get("ABHA_PROFILE_FILE", "abha_profile.json")
+        self.ABHA_PROFILE_FILE_PATH = os.environ.get("ABHA_PROFILE_FILE", "abha_profile.json")  # Legacy single profile, imported once
+        self.ABHA_PROFILE_DB_PATH = os.environ.get("ABHA_PROFILE_DB", "abha_profiles.db")
+        self.ABHA_PROFILE_CACHE_SIZE = int(os.environ.get("ABHA_PROFILE_CACHE_SIZE", "1024"))  # Profiles kept in the LRU read cache
+        self.ABHA_PHOTO_DIR = os.environ.get("ABHA_PHOTO_DIR", "profile_photos")  # Content-addressed photo blobs
+        self.ABHA_PROFILE_PRECOMPRESS = os.environ.get("ABHA_PROFILE_PRECOMPRESS", "True").lower() in ('true', '1', 't')  # Keep gzip bodies next to profiles
+        self.ABHA_PROFILE_COMPACT_INTERVAL_SECONDS = int(os.environ.get("ABHA_PROFILE_COMPACT_INTERVAL_SECONDS", "60"))  # Fold patch logs this often
+        self.ABHA_PROFILE_COMPACT_THRESHOLD = int(os.environ.get("ABHA_PROFILE_COMPACT_THRESHOLD", "20"))  # ...or once a profile has this many patches
+        self.SEARCH_INDEX_SYNC_INTERVAL_SECONDS = float(os.environ.get("SEARCH_INDEX_SYNC_INTERVAL_SECONDS", "1"))  # With several workers, index profiles the others saved this often
         
         # API endpoints
-        # Use environment variable if provided, otherwise use the default URL
+        # Use environment variable if provided, otherwise use the default URL.
+        # The base URLs move every endpoint at once, e.g. to tools/fake_abdm_gateway.py
+        self.ABDM_GATEWAY_BASE_URL = os.environ.get("ABDM_GATEWAY_BASE_URL", "https://dev.abdm.gov.in/gateway").rstrip("/")
+        self.ABDM_ABHA_BASE_URL = os.environ.get("ABDM_ABHA_BASE_URL", "https://abhasbx.abdm.gov.in/abha/api/v3").rstrip("/")
+
         self.ABDM_SESSION_API = os.environ.get(
             "ABDM_SESSION_API", 
-            "https://dev.abdm.gov.in/gateway/v0.5/sessions"
+            f"{self.ABDM_GATEWAY_BASE_URL}/v0.5/sessions"
         )
         
         # Public key API endpoint
         self.ABDM_PUBLIC_KEY_API = os.environ.get(
             "ABDM_PUBLIC_KEY_API",
-            "https://abhasbx.abdm.gov.in/abha/api/v3/profile/public/certificate"
+            f"{self.ABDM_ABHA_BASE_URL}/profile/public/certificate"
         )
         
-        # Aadhaar OTP API endpoint
+        # Aadhaar OTP API endpoint (also sends the mobile update OTP)
         self.ABDM_INITIATE_OTP_API = os.environ.get(
             "ABDM_INITIATE_OTP_API",
-            "https://abhasbx.abdm.gov.in/abha/api/v3/enrollment/request/otp"
+            f"{self.ABDM_ABHA_BASE_URL}/enrollment/request/otp"
         )
         
         # Aadhaar enrollment API endpoint
         self.ABDM_ENROLL_API = os.environ.get(
             "ABDM_ENROLL_API",
-            "https://abhasbx.abdm.gov.in/abha/api/v3/enrollment/enrol/byAadhaar"
+            f"{self.ABDM_ABHA_BASE_URL}/enrollment/enrol/byAadhaar"
         )
-        
+
+        # ABHA address suggestion API endpoint
+        self.ABDM_ENROL_SUGGESTION_API = os.environ.get(
+            "ABDM_ENROL_SUGGESTION_API",
+            f"{self.ABDM_ABHA_BASE_URL}/enrollment/enrol/suggestion"
+        )
+
+        # Mobile update OTP verification API endpoint
+        self.ABDM_AUTH_BY_ABDM_API = os.environ.get(
+            "ABDM_AUTH_BY_ABDM_API",
+            f"{self.ABDM_ABHA_BASE_URL}/enrollment/auth/byAbdm"
+        )
+
+        # Email verification link API endpoint
+        self.ABDM_EMAIL_VERIFICATION_API = os.environ.get(
+            "ABDM_EMAIL_VERIFICATION_API",
+            f"{self.ABDM_ABHA_BASE_URL}/profile/account/request/emailVerificationLink"
+        )
+
+        # User (X-token) refresh API endpoint
+        self.ABDM_USER_TOKEN_REFRESH_API = os.environ.get(
+            "ABDM_USER_TOKEN_REFRESH_API",
+            f"{self.ABDM_ABHA_BASE_URL}/profile/account/request/token"
+        )
+        self.USER_TOKEN_REFRESH_BUFFER_SECONDS = 60  # Refresh X-tokens 1 minute before expiry
+
+        # Gateway v0.5 callback settings
+        self.GATEWAY_CALLBACK_TIMEOUT_SECONDS = float(os.environ.get("GATEWAY_CALLBACK_TIMEOUT_SECONDS", "30"))
+        self.GATEWAY_CALLBACK_ORPHAN_TTL_SECONDS = float(os.environ.get("GATEWAY_CALLBACK_ORPHAN_TTL_SECONDS", "60"))  # Keep early callbacks this long
+        self.GATEWAY_CALLBACK_MAX_ORPHANS = int(os.environ.get("GATEWAY_CALLBACK_MAX_ORPHANS", "10000"))
+        self.GATEWAY_CALLBACK_MAX_BODY_BYTES = int(os.environ.get("GATEWAY_CALLBACK_MAX_BODY_BYTES", "262144"))  # Larger callbacks are rejected
+        self.GATEWAY_CALLBACK_ALLOWED_SOURCES = os.environ.get("GATEWAY_CALLBACK_ALLOWED_SOURCES", "")  # Comma-separated IPs/CIDRs (empty = any)
+        self.GATEWAY_CALLBACK_SECRET = os.environ.get("GATEWAY_CALLBACK_SECRET", "")  # Bearer token accepted instead of a gateway JWT (empty = JWT only)
+        self.GATEWAY_CALLBACK_DB_PATH = os.environ.get("GATEWAY_CALLBACK_DB", "gateway_callbacks.db")  # Hands callbacks to the waiting worker with several workers
+        self.GATEWAY_CALLBACK_POLL_INTERVAL_SECONDS = float(os.environ.get("GATEWAY_CALLBACK_POLL_INTERVAL_SECONDS", "0.05"))  # Waiting workers check the mailbox this often
+        self.ABDM_GATEWAY_CERTS_API = os.environ.get(
+            "ABDM_GATEWAY_CERTS_API",
+            f"{self.ABDM_GATEWAY_BASE_URL}/v0.5/certs"
+        )  # Keys that sign the gateway's callback tokens
+
+        # Cache snapshot settings - warm restarts
+        self.CACHE_SNAPSHOT_FILE = os.environ.get("CACHE_SNAPSHOT_FILE", "cache_snapshot.json.gz")  # Empty disables snapshots
+        self.CACHE_SNAPSHOT_INTERVAL_SECONDS = int(os.environ.get("CACHE_SNAPSHOT_INTERVAL_SECONDS", "300"))  # Also written on shutdown (0 = only then)
+        self.CACHE_SNAPSHOT_MAX_AGE_SECONDS = int(os.environ.get("CACHE_SNAPSHOT_MAX_AGE_SECONDS", "86400"))  # Older snapshots are not restored
+
+        # Request deadline settings
+        self.REQUEST_TIMEOUT_SECONDS = float(os.environ.get("REQUEST_TIMEOUT_SECONDS", "30"))  # Default deadline per request (0 = none)
+        self.REQUEST_ROUTE_TIMEOUTS = os.environ.get(
+            "REQUEST_ROUTE_TIMEOUTS",
+            '{"/admin": 0, "/debug": 0, "/metrics": 0, "/verification/abha-profile/export": 0}'
+        )  # Path prefix -> seconds, overrides the default; clients can shorten it with X-Request-Timeout
+        self.ABDM_API_TIMEOUT_SECONDS = float(os.environ.get("ABDM_API_TIMEOUT_SECONDS", "30"))  # Upper bound for ABDM API calls
+        self.ABDM_TOKEN_TIMEOUT_SECONDS = float(os.environ.get("ABDM_TOKEN_TIMEOUT_SECONDS", "15"))  # Upper bound for token and key calls
+
+        # Outbound HTTP settings
+        self.HTTP_POOL_HOSTS = int(os.environ.get("HTTP_POOL_HOSTS", "4"))  # Hosts with their own connection pool
+        self.HTTP_POOL_SIZE = int(os.environ.get("HTTP_POOL_SIZE", "32"))  # Keep-alive connections kept per host
+        self.HEDGING_ENABLED = os.environ.get("HEDGING_ENABLED", "True").lower() in ('true', '1', 't')  # Hedge slow idempotent GETs that opt in
+        self.HEDGE_QUANTILE = float(os.environ.get("HEDGE_QUANTILE", "0.95"))  # Hedge GETs slower than this latency quantile
+        self.HEDGE_BUDGET_RATIO = float(os.environ.get("HEDGE_BUDGET_RATIO", "0.05"))  # At most this share of GETs is hedged
+        self.HEDGE_MIN_SAMPLES = int(os.environ.get("HEDGE_MIN_SAMPLES", "20"))  # Latencies needed before an operation is hedged
+        self.HEDGE_MIN_DELAY_MS = float(os.environ.get("HEDGE_MIN_DELAY_MS", "50"))
+
+        # Startup warm-up settings
+        self.WARMUP_CONNECTIONS_PER_HOST = int(os.environ.get("WARMUP_CONNECTIONS_PER_HOST", "2"))  # TLS connections opened to each ABDM host (0 = off)
+        self.WARMUP_TIMEOUT_SECONDS = float(os.environ.get("WARMUP_TIMEOUT_SECONDS", "15"))  # Report ready without a step still running after this
+
+        # Health probe settings
+        self.HEALTH_PROBE_INTERVAL_SECONDS = float(os.environ.get("HEALTH_PROBE_INTERVAL_SECONDS", "10"))  # /readyz serves the latest result
+        self.HEALTH_PROBE_TIMEOUT_SECONDS = float(os.environ.get("HEALTH_PROBE_TIMEOUT_SECONDS", "3"))  # Per upstream reachability probe
+        self.HEALTH_KEY_MAX_AGE_DAYS = float(os.environ.get("HEALTH_KEY_MAX_AGE_DAYS", "180"))  # Older public keys are reported stale
+        self.HEALTH_SATURATION_THRESHOLD = float(os.environ.get("HEALTH_SATURATION_THRESHOLD", "0.9"))  # Queue/pool fill that marks the worker not ready
+
         # Server settings
         self.HOST = "0.0.0.0"
         self.PORT = 8002
         self.DEBUG = os.environ.get("DEBUG", "False").lower() in ('true', '1', 't')
+        self.WORKERS = int(os.environ.get("WORKERS", "1"))  # Worker processes; ignored with DEBUG (reload needs one)
+        self.MULTI_WORKER = self.WORKERS > 1 and not self.DEBUG  # Per-process caches, logs and callback waiters then coordinate through files
+        self.UVICORN_LOOP = os.environ.get("UVICORN_LOOP", "auto")  # "auto", "asyncio" or "uvloop"
+        self.UVICORN_HTTP = os.environ.get("UVICORN_HTTP", "auto")  # "auto", "h11" or "httptools"
+        self.BACKLOG = int(os.environ.get("BACKLOG", "2048"))  # Pending connections the listen socket queues
+        self.KEEPALIVE_TIMEOUT_SECONDS = int(os.environ.get("KEEPALIVE_TIMEOUT_SECONDS", "5"))  # Close idle keep-alive connections after this
+        self.LEADER_LOCK_FILE = os.environ.get("LEADER_LOCK_FILE", "abdm_leader.lock")  # Worker holding its lock runs background refresh jobs
+        self.LEADER_RETRY_SECONDS = float(os.environ.get("LEADER_RETRY_SECONDS", "5"))  # Followers retry the lock this often
+        
+        # Logging settings
+        self.LOG_DIR = os.environ.get("LOG_DIR", "logs")
+        self.LOG_LEVEL = os.environ.get("LOG_LEVEL", "INFO").upper()
+        self.LOG_CONSOLE_STREAM = os.environ.get("LOG_CONSOLE_STREAM", "stdout")  # "stderr" keeps stdout clean for CLI output
+        self.LOG_MAX_BYTES = int(os.environ.get("LOG_MAX_BYTES", str(50 * 1024 * 1024)))  # Start a new file past this size (0 = daily only)
+        self.LOG_BACKUP_COUNT = int(os.environ.get("LOG_BACKUP_COUNT", "30"))  # Compressed log files to keep per worker (0 = all)
+        self.LOG_COMPRESS = os.environ.get("LOG_COMPRESS", "True").lower() in ('true', '1', 't')
+        self.LOG_QUEUE_SIZE = int(os.environ.get("LOG_QUEUE_SIZE", "10000"))  # Records buffered before new ones are dropped
+        self.LOG_FORMAT = os.environ.get("LOG_FORMAT", "text").lower()  # "text" or "json"
+        self.LOG_SAMPLE_RATES = os.environ.get("LOG_SAMPLE_RATES", "")  # e.g. {"/headers": {"INFO": 0.01}}; unlisted levels are always kept
+
+        # Request timing settings
+        self.SERVER_TIMING_ENABLED = os.environ.get("SERVER_TIMING_ENABLED", "True").lower() in ('true', '1', 't')  # Per-phase Server-Timing response header
+        self.SERVER_TIMING_LOG = os.environ.get("SERVER_TIMING_LOG", "False").lower() in ('true', '1', 't')  # Also add phase timings to the access log
+
+        # Event loop monitor settings
+        self.LOOP_MONITOR_ENABLED = os.environ.get("LOOP_MONITOR_ENABLED", "True").lower() in ('true', '1', 't')
+        self.LOOP_MONITOR_INTERVAL_SECONDS = float(os.environ.get("LOOP_MONITOR_INTERVAL_SECONDS", "0.1"))  # Lag probe interval
+        self.LOOP_STALL_THRESHOLD_MS = float(os.environ.get("LOOP_STALL_THRESHOLD_MS", "100"))  # Log the blocking stack past this
+        self.LOOP_BLOCK_FAIL_MS = float(os.environ.get("LOOP_BLOCK_FAIL_MS", "0"))  # Test mode: fail requests blocking the loop longer (0 = off)
+
+        # Memory profiling settings
+        self.MEMORY_MAX_SNAPSHOTS = int(os.environ.get("MEMORY_MAX_SNAPSHOTS", "4"))  # tracemalloc snapshots kept for diffing
+        self.MEMORY_TREND_INTERVAL_SECONDS = int(os.environ.get("MEMORY_TREND_INTERVAL_SECONDS", "0"))  # Log memory growth this often (0 = off)
+
+        # Admission control settings - per worker; LIMIT is the starting and highest concurrency of a route group
+        self.ADMISSION_CONTROL_ENABLED = os.environ.get("ADMISSION_CONTROL_ENABLED", "True").lower() in ('true', '1', 't')
+        self.ADMISSION_MIN_LIMIT = int(os.environ.get("ADMISSION_MIN_LIMIT", "2"))  # Adaptive limits never drop below this
+        self.ADMISSION_QUEUE_TIMEOUT_SECONDS = float(os.environ.get("ADMISSION_QUEUE_TIMEOUT_SECONDS", "2"))  # Shed queued requests after this
+        self.ADMISSION_ADJUST_INTERVAL_SECONDS = float(os.environ.get("ADMISSION_ADJUST_INTERVAL_SECONDS", "1"))
+        self.ADMISSION_TOKEN_LIMIT = int(os.environ.get("ADMISSION_TOKEN_LIMIT", "8"))
+        self.ADMISSION_TOKEN_QUEUE = int(os.environ.get("ADMISSION_TOKEN_QUEUE", "16"))
+        self.ADMISSION_TOKEN_TARGET_MS = float(os.environ.get("ADMISSION_TOKEN_TARGET_MS", "1000"))
+        self.ADMISSION_ENCRYPTION_LIMIT = int(os.environ.get("ADMISSION_ENCRYPTION_LIMIT", "32"))
+        self.ADMISSION_ENCRYPTION_QUEUE = int(os.environ.get("ADMISSION_ENCRYPTION_QUEUE", "64"))
+        self.ADMISSION_ENCRYPTION_TARGET_MS = float(os.environ.get("ADMISSION_ENCRYPTION_TARGET_MS", "100"))
+        self.ADMISSION_VERIFICATION_LIMIT = int(os.environ.get("ADMISSION_VERIFICATION_LIMIT", "16"))  # Keep below the threadpool size (40)
+        self.ADMISSION_VERIFICATION_QUEUE = int(os.environ.get("ADMISSION_VERIFICATION_QUEUE", "32"))
+        self.ADMISSION_VERIFICATION_TARGET_MS = float(os.environ.get("ADMISSION_VERIFICATION_TARGET_MS", "3000"))  # Upstream ABDM latency
+        self.ADMISSION_PROFILE_LIMIT = int(os.environ.get("ADMISSION_PROFILE_LIMIT", "32"))
+        self.ADMISSION_PROFILE_QUEUE = int(os.environ.get("ADMISSION_PROFILE_QUEUE", "64"))
+        self.ADMISSION_PROFILE_TARGET_MS = float(os.environ.get("ADMISSION_PROFILE_TARGET_MS", "250"))
+
+        # Admin API settings
+        self.ADMIN_API_KEY = os.environ.get("ADMIN_API_KEY", "")  # Admin endpoints are disabled when empty
         
         # API Documentation
         self.API_TITLE = "ABDM Integration API"
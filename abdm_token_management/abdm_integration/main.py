@@ -4,9 +4,17 @@ import uvicorn
 import sys
 from api.app import create_app
 from services.token_manager import ABDMTokenManager
-from services.public_key_service import ABDMPublicKeyManager  # Import the key manager
+from services.public_key_service import ABDMPublicKeyManager, preload_public_keys  # Import the key manager
+from services.abha_profile_service import build_search_index
+from services.loop_monitor import event_loop_monitor
+from services.memory_profiler import memory_profiler
+from services.leader_election import leader_election
+from services.warmup import start_warm_up
+from services.cache_snapshot import cache_snapshotter
+from services.health_prober import health_prober
+from services.gateway_callback_service import gateway_callback_store
 from config.settings import settings
-from config.logging_config import setup_logger
+from config.logging_config import setup_logger, stop_logging
 
 # Configure logging
 logger = setup_logger('main')
@@ -18,31 +26,96 @@ app = create_app()
 token_manager = ABDMTokenManager()
 public_key_manager = ABDMPublicKeyManager()  # Initialize public key manager
 
+# Tasks started at startup, cancelled on shutdown
+background_tasks = set()
+
+def track_task(task):
+    background_tasks.add(task)
+    task.add_done_callback(background_tasks.discard)
+    return task
+
+def start_background_jobs():
+    """Start the upstream refresh jobs; called in the worker elected leader"""
+    track_task(asyncio.create_task(token_manager.start_periodic_refresh()))
+    logger.info("Periodic token refresh task started")
+
+    public_key_manager.start_key_refresh_scheduler()
+
 @app.on_event("startup")
 async def startup_event():
     """Start background tasks when the API server starts"""
     logger.info("Starting ABDM Integration API")
     try:
-        # Start the periodic token refresh task
-        asyncio.create_task(token_manager.start_periodic_refresh())
-        logger.info("Periodic token refresh task started")
-        
-        # Fetch public key and start key refresh scheduler
-        public_key_manager.get_public_key()
-        public_key_manager.start_key_refresh_scheduler()
-        logger.info("Public key manager initialized")
+        # Watch for handlers that block the event loop
+        if settings.LOOP_MONITOR_ENABLED:
+            event_loop_monitor.start()
+
+        # Periodically log memory growth
+        memory_profiler.start_trend_logging(settings.MEMORY_TREND_INTERVAL_SECONDS)
+
+        # Load the token, public key, search index and cache snapshot and pre-warm ABDM
+        # connections in the background; /readyz reports not ready until this finishes
+        track_task(start_warm_up(
+            token_manager, preload_public_keys, build_search_index,
+            cache_loader=cache_snapshotter.restore if settings.CACHE_SNAPSHOT_FILE else None
+        ))
+
+        # Check dependencies in the background for /readyz
+        track_task(health_prober.start())
+
+        # Collect gateway callbacks that reached another worker
+        if gateway_callback_store.mailbox is not None:
+            track_task(asyncio.create_task(
+                gateway_callback_store.poll_mailbox(settings.GATEWAY_CALLBACK_POLL_INTERVAL_SECONDS)
+            ))
+
+        # Refresh jobs run in one elected worker; another takes over if it dies
+        track_task(leader_election.start(start_background_jobs))
+
+        # Snapshot caches periodically so a crashed worker still restarts warm
+        if settings.CACHE_SNAPSHOT_FILE and settings.CACHE_SNAPSHOT_INTERVAL_SECONDS > 0:
+            track_task(asyncio.create_task(cache_snapshotter.run_periodic(settings.CACHE_SNAPSHOT_INTERVAL_SECONDS)))
     except Exception as e:
         logger.critical(f"Failed to start background tasks: {str(e)}")
         # Consider raising an exception here depending on how critical these tasks are
 
+@app.on_event("shutdown")
+async def shutdown_event():
+    """Stop background work and save the cache snapshot when the API server stops"""
+    logger.info("Stopping ABDM Integration API")
+    for task in list(background_tasks):
+        task.cancel()
+    await asyncio.gather(*background_tasks, return_exceptions=True)
+
+    public_key_manager.stop_key_refresh_scheduler()
+    leader_election.release()
+    await event_loop_monitor.stop()
+    memory_profiler.stop_trend_logging()
+
+    if settings.CACHE_SNAPSHOT_FILE:
+        try:
+            await asyncio.get_running_loop().run_in_executor(None, cache_snapshotter.write)
+        except Exception as e:
+            logger.error(f"Failed to write cache snapshot: {str(e)}")
+
+    logger.info("ABDM Integration API stopped")
+    stop_logging()
+
 if __name__ == "__main__":
     try:
-        logger.info(f"Starting ABDM Integration API server on {settings.HOST}:{settings.PORT}")
+        # Auto-reload only works with a single process
+        workers = 1 if settings.DEBUG else max(1, settings.WORKERS)
+        logger.info(f"Starting ABDM Integration API server on {settings.HOST}:{settings.PORT} with {workers} worker(s)")
         uvicorn.run(
             "main:app", 
             host=settings.HOST, 
             port=settings.PORT,
-            reload=settings.DEBUG
+            reload=settings.DEBUG,
+            workers=workers,
+            loop=settings.UVICORN_LOOP,
+            http=settings.UVICORN_HTTP,
+            backlog=settings.BACKLOG,
+            timeout_keep_alive=settings.KEEPALIVE_TIMEOUT_SECONDS
         )
     except Exception as e:
         logger.critical(f"Failed to start server: {str(e)}")
@@ -1,101 +1,482 @@
 # services/abha_profile_service.py
 import os
 import json
-from datetime import datetime
+import time
+import threading
+from datetime import datetime, timedelta
 from config.logging_config import setup_logger
 from config.settings import settings
+from services.metrics import metrics_registry
+from services.memory_profiler import register_cache
+from services.request_timing import request_phase
+from services.abha_profile_store import ABHAProfileStore
+from services.photo_blob_store import PhotoBlobStore
+from services.profile_search_index import ProfileSearchIndex
+from utils.exceptions import ProfileVersionConflictError, SearchIndexBuildingError
 
 # Configure logging
 logger = setup_logger('abha_profile_service')
 
+# One store per process, shared by every ABHAProfileManager so the read cache stays coherent
+_store = None
+_photo_store = None
+_search_index = None  # Published only once fully built
+_store_lock = threading.RLock()
+
+# The index build takes seconds on a large store; it has its own lock so requests never wait on it
+_search_index_build_lock = threading.Lock()
+_search_index_lock = threading.Lock()  # Guards publication and the updates saved during a build
+_search_index_building = False
+_search_index_pending = {}  # ABHA number -> profile saved while the index was building
+_search_index_synced = None  # (store data_version, updatedAt watermark) the index has caught up to
+_search_index_sync_thread = None
+
+# A profile is stamped before its transaction commits, so other workers' syncs look back this far
+SEARCH_INDEX_SYNC_MARGIN = timedelta(seconds=30)
+
+metrics_registry.gauge(
+    "abha_profile_cache_entries", "Entries in the profile store read caches", ("cache",),
+    callback=lambda: {("records",): len(_store.cache), ("bodies",): len(_store.body_cache)} if _store is not None else None
+)
+register_cache(
+    "profile_store.records", lambda: _store.cache if _store is not None else None,
+    lock=lambda: _store.lock if _store is not None else None
+)
+register_cache(
+    "profile_store.bodies", lambda: _store.body_cache if _store is not None else None,
+    lock=lambda: _store.lock if _store is not None else None
+)
+register_cache(
+    "search_index.documents", lambda: _search_index.documents if _search_index is not None else None,
+    lock=lambda: _search_index.lock if _search_index is not None else None
+)
+register_cache(
+    "search_index.postings", lambda: _search_index.postings if _search_index is not None else None,
+    lock=lambda: _search_index.lock if _search_index is not None else None
+)
+
+def get_profile_store():
+    """Get the shared profile store, creating it (and importing the legacy profile file) on first use"""
+    global _store
+    with _store_lock:
+        if _store is None:
+            base_dir = os.path.dirname(os.path.dirname(__file__))
+            _store = ABHAProfileStore(
+                os.path.join(base_dir, settings.ABHA_PROFILE_DB_PATH),
+                cache_size=settings.ABHA_PROFILE_CACHE_SIZE,
+                compress_bodies=settings.ABHA_PROFILE_PRECOMPRESS
+            )
+            _import_legacy_profile(_store, os.path.join(base_dir, settings.ABHA_PROFILE_FILE_PATH))
+            _store.start_compaction_worker(
+                settings.ABHA_PROFILE_COMPACT_INTERVAL_SECONDS,
+                settings.ABHA_PROFILE_COMPACT_THRESHOLD
+            )
+        return _store
+
+def get_photo_store():
+    """Get the shared profile photo blob store"""
+    global _photo_store
+    with _store_lock:
+        if _photo_store is None:
+            base_dir = os.path.dirname(os.path.dirname(__file__))
+            _photo_store = PhotoBlobStore(os.path.join(base_dir, settings.ABHA_PHOTO_DIR))
+        return _photo_store
+
+def get_search_index():
+    """Get the shared profile search index, or None until it has been built"""
+    return _search_index
+
+def build_search_index():
+    """
+    Build the shared profile search index from the store and publish it; blocks
+
+    Runs in warm-up or a background thread, never on the event loop. Profiles
+    saved during the build are applied before the index is published.
+    """
+    global _search_index, _search_index_building, _search_index_synced
+    with _search_index_build_lock:
+        if _search_index is not None:
+            return _search_index
+        with _search_index_lock:
+            _search_index_building = True
+
+        index = ProfileSearchIndex()
+        store = get_profile_store()
+        synced = (store.data_version(), _search_index_watermark())
+        try:
+            index.build(store.iter_records())
+        except Exception:
+            # Saves during the failed build are in the store; the next build reads them
+            with _search_index_lock:
+                _search_index_pending.clear()
+                _search_index_building = False
+            raise
+
+        with _search_index_lock:
+            for abha_number, profile in _search_index_pending.items():
+                index.index(abha_number, profile)
+            _search_index_pending.clear()
+            _search_index_building = False
+            _search_index_synced = synced
+            _search_index = index
+        if settings.MULTI_WORKER:
+            _start_search_index_sync()
+        return index
+
+def _search_index_watermark():
+    return (datetime.now() - SEARCH_INDEX_SYNC_MARGIN).isoformat()
+
+def sync_search_index():
+    """
+    Index the profiles other worker processes saved since the last sync; blocks
+
+    Nothing is read unless another process has committed to the store. Profiles
+    are then found through the store's updated_at index.
+
+    Returns:
+        The number of profiles re-indexed
+    """
+    global _search_index_synced
+    index = _search_index
+    if index is None:
+        return 0
+    store = get_profile_store()
+    data_version, watermark = _search_index_synced
+    current_version = store.data_version()
+    if current_version == data_version:
+        return 0
+
+    next_watermark = _search_index_watermark()
+    abha_numbers = store.updated_since(watermark)
+    for abha_number in abha_numbers:
+        # Read and index under the lock, so a concurrent local save is never overwritten by an older read
+        with _search_index_lock:
+            record = store.get(abha_number)
+            if record is not None:
+                index.index(abha_number, record["profile"])
+    _search_index_synced = (current_version, next_watermark)
+    return len(abha_numbers)
+
+def _start_search_index_sync():
+    """Keep the search index in step with the other workers' saves in a background thread"""
+    global _search_index_sync_thread
+    with _search_index_lock:
+        if _search_index_sync_thread is not None:
+            return
+        _search_index_sync_thread = threading.Thread(target=_run_search_index_sync, name="search-index-sync", daemon=True)
+    _search_index_sync_thread.start()
+
+def _run_search_index_sync():
+    while True:
+        time.sleep(settings.SEARCH_INDEX_SYNC_INTERVAL_SECONDS)
+        try:
+            synced = sync_search_index()
+            if synced:
+                logger.debug(f"Search index caught up on {synced} profile(s) saved by other workers")
+        except Exception as e:
+            logger.error(f"Search index sync failed: {str(e)}")
+
+def start_search_index_build():
+    """Build the search index in a background thread unless it exists or is being built"""
+    with _search_index_lock:
+        if _search_index is not None or _search_index_building:
+            return
+    threading.Thread(target=build_search_index, name="search-index-build", daemon=True).start()
+
+def _index_profile(abha_number, profile):
+    """Apply a saved profile to the search index, or queue it while the index is building"""
+    with _search_index_lock:
+        index = _search_index
+        if index is None:
+            # Without a build in progress the next build reads the profile from the store
+            if _search_index_building:
+                _search_index_pending[abha_number] = profile
+            return
+        index.index(abha_number, profile)
+
+def externalize_photo(profile_data, photo_store):
+    """
+    Move an inline base64 ABHAProfile.photo into the blob store
+
+    Returns:
+        A shallow copy of profile_data whose ABHAProfile carries photoHash instead of photo
+    """
+    abha_profile = profile_data.get("ABHAProfile")
+    if not isinstance(abha_profile, dict) or not abha_profile.get("photo"):
+        return profile_data
+
+    abha_profile = dict(abha_profile)
+    abha_profile["photoHash"] = photo_store.put_base64(abha_profile.pop("photo"))
+    return {**profile_data, "ABHAProfile": abha_profile}
+
+def serialize_profile_response(profile):
+    """Serialize a profile exactly as the /abha-profile route returns it"""
+    return json.dumps(
+        {"status": "success", "profile": profile},
+        ensure_ascii=False,
+        separators=(",", ":")
+    ).encode("utf-8")
+
+def _import_legacy_profile(store, legacy_file):
+    """Import the single-profile abha_profile.json into an empty store"""
+    if not os.path.exists(legacy_file) or store.count() > 0:
+        return
+    try:
+        with open(legacy_file, 'r') as f:
+            record = json.load(f)
+        abha_number = record.get("profile", {}).get("ABHAProfile", {}).get("ABHANumber")
+        if abha_number:
+            record["profile"] = externalize_photo(record["profile"], get_photo_store())
+            store.put(abha_number, record)
+            logger.info(f"Imported legacy ABHA profile {abha_number} from {legacy_file}")
+    except Exception as e:
+        logger.error(f"Error importing legacy ABHA profile: {str(e)}")
+
 class ABHAProfileManager:
     """
     Manages storage and retrieval of ABHA profile information
     """
-    
+
     def __init__(self):
         """Initialize the ABHA profile manager"""
         self.logger = logger
-        self.profile_file = os.path.join(os.path.dirname(os.path.dirname(__file__)), settings.ABHA_PROFILE_FILE_PATH)
-        
+        self.store = get_profile_store()
+        self.photo_store = get_photo_store()
+
     def save_profile(self, profile_data):
         """
         Save ABHA profile data to persistent storage
-        
+
         Args:
             profile_data: The complete profile data from ABDM API
         """
+        with request_phase("persist"):
+            return self._save_profile(profile_data)
+
+    def _save_profile(self, profile_data):
         try:
-            # Add timestamp for record keeping
+            abha_number = profile_data.get('ABHAProfile', {}).get('ABHANumber')
+            if not abha_number:
+                self.logger.warning("Cannot save ABHA profile without an ABHANumber")
+                return False
+
+            # Add timestamps for record keeping; the store keeps the original save time
+            # on re-enrollment and assigns the version atomically with the write
+            now = datetime.now().isoformat()
             profile_data_with_meta = {
-                "profile": profile_data,
-                "savedAt": datetime.now().isoformat(),
-                "updatedAt": datetime.now().isoformat()
+                "profile": externalize_photo(profile_data, self.photo_store),
+                "savedAt": now,
+                "updatedAt": now
             }
-            
-            # Save to file
-            with open(self.profile_file, 'w') as f:
-                json.dump(profile_data_with_meta, f, indent=2)
-                
-            self.logger.info(f"ABHA profile saved successfully for {profile_data.get('ABHAProfile', {}).get('ABHANumber', 'unknown')}")
+
+            self.store.put(
+                abha_number,
+                profile_data_with_meta,
+                bodies=self._build_response_bodies(profile_data_with_meta["profile"])
+            )
+
+            _index_profile(abha_number, profile_data_with_meta["profile"])
+
+            self.logger.info(f"ABHA profile saved successfully for {abha_number}")
             return True
         except Exception as e:
             self.logger.error(f"Error saving ABHA profile: {str(e)}")
             return False
-        
-    def get_profile(self):
+
+    def get_profile(self, abha_number=None, include_photo=True, fields=None):
         """
-        Get the stored ABHA profile
-        
+        Get a stored ABHA profile
+
+        Args:
+            abha_number: ABHA number of the profile, defaults to the most recently updated profile
+            include_photo: Inline the base64 photo from the blob store
+            fields: Optional list of field names to return; ABHAProfile fields are
+                returned under ABHAProfile, other names are taken from the top level
+
         Returns:
             The ABHA profile data or None if not available
         """
         try:
-            if os.path.exists(self.profile_file):
-                with open(self.profile_file, 'r') as f:
-                    return json.load(f).get("profile", {})
-            else:
-                self.logger.warning("No ABHA profile file found")
+            if abha_number is None:
+                abha_number = self.store.latest_abha_number()
+                if abha_number is None:
+                    self.logger.warning("No ABHA profiles stored")
+                    return None
+
+            record = self.store.get(abha_number)
+            if record is None:
+                self.logger.warning(f"No ABHA profile found for {abha_number}")
                 return None
+            return self.shape_profile(record.get("profile", {}), include_photo, fields)
         except Exception as e:
             self.logger.error(f"Error loading ABHA profile: {str(e)}")
             return None
-            
-    def update_profile(self, updated_data):
+
+    def shape_profile(self, profile, include_photo=True, fields=None):
+        """Build the response view of a stored profile without touching the cached record"""
+        abha_profile = profile.get("ABHAProfile", {})
+
+        if fields:
+            view = {"ABHAProfile": {}}
+            for field in fields:
+                if field in abha_profile:
+                    view["ABHAProfile"][field] = abha_profile[field]
+                elif field in profile and field != "ABHAProfile":
+                    view[field] = profile[field]
+            include_photo = "photo" in fields
+            photo_hash = abha_profile.get("photoHash")
+            abha_profile = view["ABHAProfile"]
+            profile = view
+        else:
+            photo_hash = abha_profile.get("photoHash")
+            abha_profile = dict(abha_profile)
+            profile = {**profile, "ABHAProfile": abha_profile}
+
+        if include_photo and photo_hash and "photo" not in abha_profile:
+            abha_profile["photo"] = self.photo_store.get_base64(photo_hash)
+        elif not include_photo:
+            abha_profile.pop("photo", None)
+        return profile
+
+    def _build_response_bodies(self, profile):
+        """
+        Pre-serialize the photo-less /abha-profile response
+
+        The full body is built from the photo blob on its first read instead,
+        so a profile's photo is stored once, in the blob store.
+        """
+        return {
+            "summary": serialize_profile_response(self.shape_profile(profile, False, None))
+        }
+
+    def get_profile_body(self, abha_number=None, include_photo=True):
+        """
+        Get the pre-serialized /abha-profile response for a stored profile
+
+        Summary bodies are written on save_profile; full bodies, and bodies
+        dropped by an update, are serialized once here and kept.
+
+        Returns:
+            (etag, body, gzip body or None, version), or None if the profile doesn't exist
+        """
+        try:
+            if abha_number is None:
+                abha_number = self.store.latest_abha_number()
+                if abha_number is None:
+                    return None
+
+            variant = "full" if include_photo else "summary"
+            entry = self.store.get_body(abha_number, variant)
+            if entry is not None:
+                return entry
+
+            record = self.store.get(abha_number)
+            if record is None:
+                return None
+            body = serialize_profile_response(self.shape_profile(record.get("profile", {}), include_photo, None))
+            return self.store.put_body(abha_number, variant, body, record["updatedAt"], record.get("version", 1))
+        except Exception as e:
+            self.logger.error(f"Error loading ABHA profile body: {str(e)}")
+            return None
+
+    def get_photo(self, abha_number=None):
+        """
+        Get the photo blob reference of a stored profile
+
+        Returns:
+            (digest, file path, media type), or None if the profile has no stored photo
+        """
+        profile = self.get_profile(abha_number, include_photo=False)
+        photo_hash = profile.get("ABHAProfile", {}).get("photoHash") if profile else None
+        if not photo_hash or not self.photo_store.exists(photo_hash):
+            return None
+        return photo_hash, self.photo_store.path(photo_hash), self.photo_store.content_type(photo_hash)
+
+    def find_abha_numbers(self, mobile=None, phr_address=None, txn_id=None):
+        """
+        Look up ABHA numbers by mobile, PHR address or txnId
+
+        Returns:
+            Matching ABHA numbers, most recently updated first
+        """
+        try:
+            if mobile:
+                return self.store.find("mobile", mobile)
+            if phr_address:
+                return self.store.find("phr_address", phr_address)
+            if txn_id:
+                return self.store.find("txn_id", txn_id)
+            return []
+        except Exception as e:
+            self.logger.error(f"Error looking up ABHA profile: {str(e)}")
+            return []
+
+    def update_profile(self, updated_data, abha_number=None, expected_version=None):
         """
         Update specific fields in the profile
-        
+
+        The update is appended to the profile's patch log; the in-memory view
+        is merged immediately and the log is compacted in the background.
+
         Args:
             updated_data: Dictionary containing fields to update
+            abha_number: ABHA number of the profile, defaults to updated_data's ABHANumber
+                or the most recently updated profile
+            expected_version: Reject the update unless the profile is still at this version
+
+        Returns:
+            The new profile version, or False if the update failed
+
+        Raises:
+            ProfileVersionConflictError: if expected_version is outdated
         """
         try:
-            current_data = self.get_profile()
-            
-            if not current_data:
+            if abha_number is None:
+                abha_number = updated_data.get("ABHAProfile", {}).get("ABHANumber") or self.store.latest_abha_number()
+
+            version = None
+            if abha_number:
+                version = self.store.append_patch(
+                    abha_number,
+                    externalize_photo(updated_data, self.photo_store),
+                    datetime.now().isoformat(),
+                    expected_version=expected_version
+                )
+            if version is None:
                 self.logger.warning("Cannot update profile as no existing profile found")
                 return False
-                
-            # Update only provided fields
-            if "ABHAProfile" in current_data and "ABHAProfile" in updated_data:
-                current_data["ABHAProfile"].update(updated_data["ABHAProfile"])
-            
-            # Add any new fields that don't exist
-            for key, value in updated_data.items():
-                if key != "ABHAProfile" and key not in current_data:
-                    current_data[key] = value
-            
-            # Save the updated profile
-            with open(self.profile_file, 'r') as f:
-                full_data = json.load(f)
-                
-            full_data["profile"] = current_data
-            full_data["updatedAt"] = datetime.now().isoformat()
-            
-            with open(self.profile_file, 'w') as f:
-                json.dump(full_data, f, indent=2)
-                
-            self.logger.info("ABHA profile updated successfully")
-            return True
+
+            _index_profile(abha_number, self.store.get(abha_number)["profile"])
+
+            self.logger.info(f"ABHA profile updated successfully for {abha_number} (version {version})")
+            return version
+        except ProfileVersionConflictError:
+            raise
         except Exception as e:
             self.logger.error(f"Error updating ABHA profile: {str(e)}")
-            return False
\ No newline at end of file
+            return False
+
+    def search_profiles(self, name=None, mobile=None, phr_address=None, district_code=None, state_code=None,
+                        offset=0, limit=20):
+        """
+        Search stored profiles through the in-memory search index
+
+        Returns:
+            (total number of matches, page of profile summaries)
+
+        Raises:
+            SearchIndexBuildingError: if the index is not built yet; a build is started
+        """
+        index = get_search_index()
+        if index is None:
+            start_search_index_build()
+            raise SearchIndexBuildingError()
+        return index.search(
+            name=name,
+            mobile=mobile,
+            phr_address=phr_address,
+            district_code=district_code,
+            state_code=state_code,
+            offset=offset,
+            limit=limit
+        )
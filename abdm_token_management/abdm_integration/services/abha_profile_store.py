@@ -0,0 +1,607 @@
+# services/abha_profile_store.py
+import gzip
+import json
+import sqlite3
+import hashlib
+import threading
+from collections import OrderedDict
+from config.logging_config import setup_logger
+from utils.exceptions import ProfileVersionConflictError
+
+# Configure logging
+logger = setup_logger('abha_profile_store')
+
+# Secondary indexes that can be used to look up an ABHA number
+LOOKUP_FIELDS = ("mobile", "phr_address", "txn_id")
+
+# Pre-serialized response body variants kept per profile
+BODY_VARIANTS = ("full", "summary")
+
+# Variants also written to the database; full bodies inline the photo the blob
+# store already holds, so they are only kept in the read cache
+PERSISTED_BODY_VARIANTS = ("summary",)
+
+def apply_profile_patch(profile, patch):
+    """
+    Merge a field-level update into a profile, returning a new profile dict
+
+    ABHAProfile fields are overwritten; other top-level fields are only added
+    if they don't exist yet.
+    """
+    merged = dict(profile)
+    if "ABHAProfile" in merged and "ABHAProfile" in patch:
+        abha_profile = {**merged["ABHAProfile"], **patch["ABHAProfile"]}
+        if "photoHash" in patch["ABHAProfile"]:
+            abha_profile.pop("photo", None)
+        merged["ABHAProfile"] = abha_profile
+
+    for key, value in patch.items():
+        if key != "ABHAProfile" and key not in merged:
+            merged[key] = value
+    return merged
+
+class ABHAProfileStore:
+    """
+    SQLite-backed store of ABHA profile records keyed by ABHA number, with
+    secondary indexes on mobile, PHR address and txnId and an LRU read cache
+
+    Records have the same envelope as the old abha_profile.json:
+    {"profile": ..., "savedAt": ..., "updatedAt": ...}
+
+    Next to each record the store can keep pre-serialized response bodies
+    (optionally gzip-compressed) per variant, so reads can be served as bytes.
+    Only PERSISTED_BODY_VARIANTS are written to the database; the others live
+    in the read cache alone.
+
+    Field updates are appended to a per-profile patch log with a version
+    number instead of rewriting the document; a background worker folds
+    the log back into the document.
+
+    Several worker processes may share the database. Cached entries remember
+    the data_version they were last checked at; once another process has
+    committed, a hit is checked against the profile's updated_at before it is
+    served.
+    """
+
+    def __init__(self, db_path, cache_size=1024, compress_bodies=True):
+        """Open (and create if needed) the profile database"""
+        self.logger = logger
+        self.db_path = db_path
+        self.cache_size = cache_size
+        self.compress_bodies = compress_bodies
+        self.cache = OrderedDict()  # ABHA number -> [record, data_version checked at], least recently used first
+        self.body_cache = OrderedDict()  # (ABHA number, variant) -> [(etag, body, gzip body, version), updated_at, data_version]
+        self.lock = threading.Lock()
+        self.compaction_wakeup = threading.Event()
+        self.compaction_thread = None
+        self.compact_threshold = 20
+
+        self.conn = sqlite3.connect(db_path, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self._create_schema()
+
+    def _create_schema(self):
+        with self.conn:
+            self.conn.execute("""
+                CREATE TABLE IF NOT EXISTS profiles (
+                    abha_number TEXT PRIMARY KEY,
+                    mobile TEXT,
+                    txn_id TEXT,
+                    saved_at TEXT NOT NULL,
+                    updated_at TEXT NOT NULL,
+                    document TEXT NOT NULL,
+                    version INTEGER NOT NULL DEFAULT 1
+                )
+            """)
+            columns = [row[1] for row in self.conn.execute("PRAGMA table_info(profiles)")]
+            if "version" not in columns:
+                self.conn.execute("ALTER TABLE profiles ADD COLUMN version INTEGER NOT NULL DEFAULT 1")
+            self.conn.execute("CREATE INDEX IF NOT EXISTS idx_profiles_mobile ON profiles(mobile)")
+            self.conn.execute("CREATE INDEX IF NOT EXISTS idx_profiles_txn_id ON profiles(txn_id)")
+            self.conn.execute("CREATE INDEX IF NOT EXISTS idx_profiles_updated_at ON profiles(updated_at)")
+            self.conn.execute("""
+                CREATE TABLE IF NOT EXISTS profile_phr_addresses (
+                    phr_address TEXT PRIMARY KEY,
+                    abha_number TEXT NOT NULL
+                )
+            """)
+            self.conn.execute(
+                "CREATE INDEX IF NOT EXISTS idx_phr_addresses_abha_number ON profile_phr_addresses(abha_number)"
+            )
+            self.conn.execute("""
+                CREATE TABLE IF NOT EXISTS profile_bodies (
+                    abha_number TEXT NOT NULL,
+                    variant TEXT NOT NULL,
+                    etag TEXT NOT NULL,
+                    body BLOB NOT NULL,
+                    body_gzip BLOB,
+                    version INTEGER NOT NULL DEFAULT 1,
+                    PRIMARY KEY (abha_number, variant)
+                )
+            """)
+            columns = [row[1] for row in self.conn.execute("PRAGMA table_info(profile_bodies)")]
+            if "version" not in columns:
+                self.conn.execute("ALTER TABLE profile_bodies ADD COLUMN version INTEGER NOT NULL DEFAULT 1")
+                # The version of bodies written before the column existed is unknown; they are rebuilt on read
+                self.conn.execute("DELETE FROM profile_bodies")
+            # Photo-bearing bodies written by earlier versions duplicate the photo blobs
+            self.conn.execute(
+                f"DELETE FROM profile_bodies WHERE variant NOT IN ({','.join('?' * len(PERSISTED_BODY_VARIANTS))})",
+                PERSISTED_BODY_VARIANTS
+            )
+            self.conn.execute("""
+                CREATE TABLE IF NOT EXISTS profile_patches (
+                    abha_number TEXT NOT NULL,
+                    version INTEGER NOT NULL,
+                    updated_at TEXT NOT NULL,
+                    patch TEXT NOT NULL,
+                    PRIMARY KEY (abha_number, version)
+                )
+            """)
+
+    def _lru_put(self, cache, key, value):
+        cache[key] = value
+        cache.move_to_end(key)
+        while len(cache) > self.cache_size:
+            cache.popitem(last=False)
+
+    def _data_version(self):
+        """Counter that changes whenever another connection - e.g. another worker - commits (caller holds the lock)"""
+        return self.conn.execute("PRAGMA data_version").fetchone()[0]
+
+    def _is_current(self, abha_number, cached, updated_at):
+        """
+        Whether a cached entry built from the profile at updated_at is still current (caller holds the lock)
+
+        The profile row is only consulted when another connection has committed
+        since the entry was last checked.
+        """
+        data_version = self._data_version()
+        if cached[-1] == data_version:
+            return True
+        row = self.conn.execute("SELECT updated_at FROM profiles WHERE abha_number = ?", (abha_number,)).fetchone()
+        if row is None or row[0] != updated_at:
+            return False
+        cached[-1] = data_version
+        return True
+
+    def _cache_put(self, abha_number, record):
+        self._lru_put(self.cache, abha_number, [record, self._data_version()])
+
+    def _body_cache_put(self, abha_number, variant, entry, updated_at):
+        self._lru_put(self.body_cache, (abha_number, variant), [entry, updated_at, self._data_version()])
+
+    def _encode_body(self, body, version):
+        """Build the (etag, body, gzip body, version) entry for a serialized response body"""
+        etag = hashlib.blake2b(body, digest_size=16).hexdigest()
+        body_gzip = gzip.compress(body, compresslevel=6) if self.compress_bodies else None
+        return etag, body, body_gzip, version
+
+    def _drop_bodies(self, abha_number):
+        """Drop the stored response bodies of a profile (caller holds the lock and transaction)"""
+        self.conn.execute("DELETE FROM profile_bodies WHERE abha_number = ?", (abha_number,))
+        for variant in BODY_VARIANTS:
+            self.body_cache.pop((abha_number, variant), None)
+
+    def _write_bodies(self, abha_number, bodies, updated_at, version):
+        """Replace the stored response bodies of a profile (caller holds the lock and transaction)"""
+        self._drop_bodies(abha_number)
+
+        for variant, body in (bodies or {}).items():
+            entry = self._encode_body(body, version)
+            if variant in PERSISTED_BODY_VARIANTS:
+                self.conn.execute(
+                    "INSERT INTO profile_bodies (abha_number, variant, etag, body, body_gzip, version) "
+                    "VALUES (?, ?, ?, ?, ?, ?)",
+                    (abha_number, variant) + entry
+                )
+            self._body_cache_put(abha_number, variant, entry, updated_at)
+
+    def put(self, abha_number, record, bodies=None, expected_version=None):
+        """
+        Insert or replace the record for an ABHA number and refresh its indexes
+
+        The version is assigned here, one past the current version including
+        patches, in the same transaction that writes the record, and a
+        re-saved profile keeps its original savedAt.
+
+        Args:
+            abha_number: ABHA number of the profile
+            record: The profile record envelope; its version and savedAt are filled in
+            bodies: Optional {variant: serialized response bytes} stored with the record;
+                bodies of the previous version are always dropped
+            expected_version: If given, the record is rejected unless the profile is still at this version
+
+        Returns:
+            The new version
+
+        Raises:
+            ProfileVersionConflictError: if the profile has moved past expected_version
+
+        Any pending patches are discarded - the record replaces the whole profile.
+        """
+        profile = record["profile"]
+        abha_profile = profile.get("ABHAProfile", {})
+        phr_addresses = abha_profile.get("phrAddress") or []
+
+        with self.lock:
+            with self.conn:
+                # Take the write lock before reading the version, so no other process can commit in between
+                self.conn.execute("BEGIN IMMEDIATE")
+                current_version = self._current_version(abha_number)
+                if expected_version is not None and expected_version != current_version:
+                    raise ProfileVersionConflictError(
+                        f"ABHA profile {abha_number} is at version {current_version}, not {expected_version}",
+                        {"abha_number": abha_number, "current_version": current_version}
+                    )
+                saved_at = self.conn.execute(
+                    "SELECT saved_at FROM profiles WHERE abha_number = ?", (abha_number,)
+                ).fetchone()
+                record = {
+                    **record,
+                    "savedAt": saved_at[0] if saved_at else record["savedAt"],
+                    "version": (current_version or 0) + 1
+                }
+                self.conn.execute(
+                    "INSERT OR REPLACE INTO profiles "
+                    "(abha_number, mobile, txn_id, saved_at, updated_at, document, version) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    (
+                        abha_number,
+                        abha_profile.get("mobile"),
+                        profile.get("txnId"),
+                        record["savedAt"],
+                        record["updatedAt"],
+                        json.dumps(record, separators=(",", ":")),
+                        record.get("version", 1)
+                    )
+                )
+                self.conn.execute("DELETE FROM profile_patches WHERE abha_number = ?", (abha_number,))
+                self._write_phr_addresses(abha_number, phr_addresses)
+                self._write_bodies(abha_number, bodies, record["updatedAt"], record["version"])
+            self._cache_put(abha_number, record)
+        return record["version"]
+
+    def _write_phr_addresses(self, abha_number, phr_addresses):
+        """Replace the PHR address index entries of a profile (caller holds the lock and transaction)"""
+        self.conn.execute("DELETE FROM profile_phr_addresses WHERE abha_number = ?", (abha_number,))
+        self.conn.executemany(
+            "INSERT OR REPLACE INTO profile_phr_addresses (phr_address, abha_number) VALUES (?, ?)",
+            [(phr_address, abha_number) for phr_address in phr_addresses]
+        )
+
+    def _current_version(self, abha_number):
+        """Get the latest version of a profile including its patches, or None (caller holds the lock)"""
+        row = self.conn.execute(
+            "SELECT MAX(p.version, COALESCE((SELECT MAX(version) FROM profile_patches "
+            "WHERE abha_number = p.abha_number), 0)) FROM profiles p WHERE p.abha_number = ?",
+            (abha_number,)
+        ).fetchone()
+        return row[0] if row else None
+
+    def append_patch(self, abha_number, patch, updated_at, expected_version=None):
+        """
+        Append a field-level update to the profile's patch log
+
+        Args:
+            abha_number: ABHA number of the profile
+            patch: The fields to update (see apply_profile_patch)
+            updated_at: Timestamp of the update
+            expected_version: If given, the update is rejected unless the profile is still at this version
+
+        Returns:
+            The new version, or None if the profile doesn't exist
+
+        Raises:
+            ProfileVersionConflictError: if the profile has moved past expected_version
+        """
+        abha_profile_patch = patch.get("ABHAProfile", {})
+
+        with self.lock:
+            try:
+                with self.conn:
+                    # Take the write lock before reading the version, so no other process can commit in between
+                    self.conn.execute("BEGIN IMMEDIATE")
+                    current_version = self._current_version(abha_number)
+                    if current_version is None:
+                        return None
+                    if expected_version is not None and expected_version != current_version:
+                        raise ProfileVersionConflictError(
+                            f"ABHA profile {abha_number} is at version {current_version}, not {expected_version}",
+                            {"abha_number": abha_number, "current_version": current_version}
+                        )
+
+                    version = current_version + 1
+                    self.conn.execute(
+                        "INSERT INTO profile_patches (abha_number, version, updated_at, patch) VALUES (?, ?, ?, ?)",
+                        (abha_number, version, updated_at, json.dumps(patch, separators=(",", ":")))
+                    )
+                    # Keep the indexed columns in step with the merged view
+                    self.conn.execute(
+                        "UPDATE profiles SET updated_at = ?, mobile = COALESCE(?, mobile) WHERE abha_number = ?",
+                        (updated_at, abha_profile_patch.get("mobile"), abha_number)
+                    )
+                    if "phrAddress" in abha_profile_patch:
+                        self._write_phr_addresses(abha_number, abha_profile_patch["phrAddress"] or [])
+                    self._drop_bodies(abha_number)
+            except sqlite3.IntegrityError:
+                # Another process appended the same version first
+                raise ProfileVersionConflictError(
+                    f"ABHA profile {abha_number} was updated concurrently",
+                    {"abha_number": abha_number}
+                )
+
+            # Advance the cached merged view instead of re-reading the log
+            cached = self.cache.get(abha_number)
+            if cached is not None and cached[0].get("version", 1) == current_version:
+                cached = cached[0]
+                self._cache_put(abha_number, {
+                    **cached,
+                    "profile": apply_profile_patch(cached["profile"], patch),
+                    "updatedAt": updated_at,
+                    "version": version
+                })
+            else:
+                self.cache.pop(abha_number, None)
+
+            pending = self.conn.execute(
+                "SELECT COUNT(*) FROM profile_patches WHERE abha_number = ?", (abha_number,)
+            ).fetchone()[0]
+
+        if pending >= self.compact_threshold:
+            self.compaction_wakeup.set()
+        return version
+
+    def _load(self, abha_number):
+        """Load a record and replay its patch log (caller holds the lock)"""
+        row = self.conn.execute(
+            "SELECT document, version FROM profiles WHERE abha_number = ?", (abha_number,)
+        ).fetchone()
+        if row is None:
+            return None, 0
+
+        record = json.loads(row[0])
+        record["version"] = row[1]
+        patches = self.conn.execute(
+            "SELECT version, updated_at, patch FROM profile_patches WHERE abha_number = ? ORDER BY version",
+            (abha_number,)
+        ).fetchall()
+        for version, updated_at, patch in patches:
+            record["profile"] = apply_profile_patch(record["profile"], json.loads(patch))
+            record["updatedAt"] = updated_at
+            record["version"] = version
+        return record, len(patches)
+
+    def compact(self, abha_number):
+        """
+        Fold the patch log of a profile into its document
+
+        Returns:
+            The number of patches folded
+        """
+        with self.lock:
+            with self.conn:
+                # Hold the write lock while folding, so no patch is appended past the one read here
+                self.conn.execute("BEGIN IMMEDIATE")
+                record, folded = self._load(abha_number)
+                if not folded:
+                    return 0
+                self.conn.execute(
+                    "UPDATE profiles SET document = ?, version = ? WHERE abha_number = ?",
+                    (json.dumps(record, separators=(",", ":")), record["version"], abha_number)
+                )
+                self.conn.execute(
+                    "DELETE FROM profile_patches WHERE abha_number = ? AND version <= ?",
+                    (abha_number, record["version"])
+                )
+            self._cache_put(abha_number, record)
+        return folded
+
+    def compact_all(self):
+        """Compact every profile with pending patches, returning the number of patches folded"""
+        with self.lock:
+            abha_numbers = [row[0] for row in self.conn.execute("SELECT DISTINCT abha_number FROM profile_patches")]
+        return sum(self.compact(abha_number) for abha_number in abha_numbers)
+
+    def start_compaction_worker(self, interval_seconds, threshold):
+        """
+        Start a background thread that compacts patch logs every interval_seconds,
+        or sooner once a profile has threshold pending patches
+        """
+        if self.compaction_thread is not None:
+            return
+        self.compact_threshold = threshold
+
+        def run_compaction():
+            while True:
+                self.compaction_wakeup.wait(interval_seconds)
+                self.compaction_wakeup.clear()
+                try:
+                    folded = self.compact_all()
+                    if folded:
+                        self.logger.info(f"Compacted {folded} ABHA profile patches")
+                except Exception as e:
+                    self.logger.error(f"ABHA profile compaction failed: {str(e)}")
+
+        self.compaction_thread = threading.Thread(target=run_compaction, daemon=True)
+        self.compaction_thread.start()
+        self.logger.info("ABHA profile compaction worker started")
+
+    def put_body(self, abha_number, variant, body, updated_at, version):
+        """
+        Store one pre-serialized response body for an existing record
+
+        The body is only stored if the record is still at updated_at, so a body
+        built from a record that has since been replaced is never cached.
+        Variants outside PERSISTED_BODY_VARIANTS only go to the read cache.
+
+        Args:
+            version: Version of the record the body was built from, served with it
+        """
+        entry = self._encode_body(body, version)
+        with self.lock:
+            with self.conn:
+                if variant in PERSISTED_BODY_VARIANTS:
+                    stored = self.conn.execute(
+                        "INSERT OR REPLACE INTO profile_bodies (abha_number, variant, etag, body, body_gzip, version) "
+                        "SELECT ?, ?, ?, ?, ?, ? WHERE EXISTS "
+                        "(SELECT 1 FROM profiles WHERE abha_number = ? AND updated_at = ?)",
+                        (abha_number, variant) + entry + (abha_number, updated_at)
+                    ).rowcount
+                else:
+                    stored = self.conn.execute(
+                        "SELECT 1 FROM profiles WHERE abha_number = ? AND updated_at = ?", (abha_number, updated_at)
+                    ).fetchone() is not None
+            if stored:
+                self._body_cache_put(abha_number, variant, entry, updated_at)
+        return entry
+
+    def get_body(self, abha_number, variant):
+        """
+        Get a pre-serialized response body
+
+        Returns:
+            (etag, body, gzip body or None, version), or None if no body is stored
+        """
+        key = (abha_number, variant)
+        with self.lock:
+            cached = self.body_cache.get(key)
+            if cached is not None:
+                if self._is_current(abha_number, cached, cached[1]):
+                    self.body_cache.move_to_end(key)
+                    return cached[0]
+                del self.body_cache[key]
+            if variant not in PERSISTED_BODY_VARIANTS:
+                return None
+
+            # Stored bodies are dropped in the transaction that changes the profile, so they are current
+            row = self.conn.execute(
+                "SELECT b.etag, b.body, b.body_gzip, b.version, p.updated_at FROM profile_bodies b "
+                "JOIN profiles p ON p.abha_number = b.abha_number WHERE b.abha_number = ? AND b.variant = ?", key
+            ).fetchone()
+            if row is None:
+                return None
+
+            entry = (row[0], bytes(row[1]), bytes(row[2]) if row[2] is not None else None, row[3])
+            self._body_cache_put(abha_number, variant, entry, row[4])
+            return entry
+
+    def get(self, abha_number):
+        """
+        Get the record for an ABHA number, or None
+
+        The returned record is the merged view of the document and its patch
+        log; it is shared with the cache and must not be mutated.
+        """
+        with self.lock:
+            cached = self.cache.get(abha_number)
+            if cached is not None:
+                if self._is_current(abha_number, cached, cached[0]["updatedAt"]):
+                    self.cache.move_to_end(abha_number)
+                    return cached[0]
+                # Another worker changed the profile
+                del self.cache[abha_number]
+
+            record, _ = self._load(abha_number)
+            if record is None:
+                return None
+
+            self._cache_put(abha_number, record)
+            return record
+
+    def cached_keys(self):
+        """ABHA numbers and (ABHA number, variant) keys in the read caches, least recently used first"""
+        with self.lock:
+            return list(self.cache), list(self.body_cache)
+
+    def iter_records(self, updated_since=None, batch_size=500):
+        """
+        Iterate over all (ABHA number, record) pairs in ABHA number order
+
+        Rows are read in batches by key, so the lock is only held per batch and
+        memory stays bounded regardless of the number of profiles. Records are
+        merged with their patch logs but not added to the read cache.
+
+        Args:
+            updated_since: Only yield profiles updated at or after this ISO timestamp
+            batch_size: Number of profiles read per batch
+        """
+        last_abha_number = ""
+        while True:
+            with self.lock:
+                query = "SELECT abha_number, document, version FROM profiles WHERE abha_number > ?"
+                params = [last_abha_number]
+                if updated_since:
+                    query += " AND updated_at >= ?"
+                    params.append(updated_since)
+                rows = self.conn.execute(query + " ORDER BY abha_number LIMIT ?", params + [batch_size]).fetchall()
+                if not rows:
+                    return
+
+                patches = {}
+                placeholders = ",".join("?" * len(rows))
+                for abha_number, version, updated_at, patch in self.conn.execute(
+                    "SELECT abha_number, version, updated_at, patch FROM profile_patches "
+                    f"WHERE abha_number IN ({placeholders}) ORDER BY abha_number, version",
+                    [row[0] for row in rows]
+                ):
+                    patches.setdefault(abha_number, []).append((version, updated_at, patch))
+
+            for abha_number, document, version in rows:
+                record = json.loads(document)
+                record["version"] = version
+                for patch_version, updated_at, patch in patches.get(abha_number, ()):
+                    record["profile"] = apply_profile_patch(record["profile"], json.loads(patch))
+                    record["updatedAt"] = updated_at
+                    record["version"] = patch_version
+                yield abha_number, record
+
+            last_abha_number = rows[-1][0]
+
+    def find(self, field, value):
+        """
+        Look up ABHA numbers through a secondary index
+
+        Args:
+            field: One of LOOKUP_FIELDS
+            value: The value to look up
+
+        Returns:
+            Matching ABHA numbers, most recently updated first
+        """
+        if field not in LOOKUP_FIELDS:
+            raise ValueError(f"Unsupported lookup field: {field}")
+
+        if field == "phr_address":
+            query = "SELECT abha_number FROM profile_phr_addresses WHERE phr_address = ?"
+        else:
+            query = f"SELECT abha_number FROM profiles WHERE {field} = ? ORDER BY updated_at DESC"
+
+        with self.lock:
+            return [row[0] for row in self.conn.execute(query, (value,))]
+
+    def latest_abha_number(self):
+        """Get the ABHA number of the most recently updated profile, or None"""
+        with self.lock:
+            row = self.conn.execute(
+                "SELECT abha_number FROM profiles ORDER BY updated_at DESC LIMIT 1"
+            ).fetchone()
+        return row[0] if row else None
+
+    def data_version(self):
+        """Get a counter that changes whenever another connection - e.g. another worker - commits"""
+        with self.lock:
+            return self._data_version()
+
+    def updated_since(self, updated_at):
+        """Get the ABHA numbers of profiles updated at or after an ISO timestamp"""
+        with self.lock:
+            return [row[0] for row in self.conn.execute(
+                "SELECT abha_number FROM profiles WHERE updated_at >= ?", (updated_at,)
+            )]
+
+    def count(self):
+        """Get the number of stored profiles"""
+        with self.lock:
+            return self.conn.execute("SELECT COUNT(*) FROM profiles").fetchone()[0]
\ No newline at end of file
@@ -0,0 +1,222 @@
+# services/admission_control.py
+import math
+import time
+import asyncio
+from collections import deque
+from config.settings import settings
+from config.logging_config import setup_logger
+from services.metrics import metrics_registry
+from utils.exceptions import AdmissionRejectedError
+
+# Configure logging
+logger = setup_logger('admission_control')
+
+# Path prefix -> route group, most specific first; paths not listed are never limited
+ROUTE_GROUPS = (
+    ("/verification/abha-profile", "profile"),
+    ("/verification", "verification"),
+    ("/encryption", "encryption"),
+    ("/token", "token"),
+)
+
+admission_shed = metrics_registry.counter(
+    "admission_shed_requests", "Requests rejected with 503 by route group and reason", ("group", "reason")
+)
+
+class AdaptiveConcurrencyLimiter:
+    """
+    Concurrency limit with a bounded FIFO wait queue for one route group
+
+    The limit adapts to observed latency (AIMD): when the smoothed latency of
+    completed requests rises above the target the limit shrinks
+    multiplicatively, and while requests are queueing at a healthy latency it
+    grows by one per adjustment interval, up to max_limit. A slow upstream
+    therefore sheds load early instead of piling up threadpool workers and
+    sockets waiting on it.
+
+    Only used from the event loop thread, so no locking is needed.
+    """
+
+    def __init__(self, name, max_limit, min_limit=1, queue_size=0, queue_timeout=1.0,
+                 target_latency=1.0, adjust_interval=1.0, decrease_factor=0.9, smoothing=0.2):
+        """
+        Args:
+            name: Route group name, used in logs and metrics
+            max_limit: Starting and highest concurrency limit
+            min_limit: Lowest limit the adaptation can reach
+            queue_size: Requests allowed to wait for a slot; more are shed immediately
+            queue_timeout: Seconds a request may wait for a slot before being shed
+            target_latency: Seconds; smoothed latency above this shrinks the limit
+            adjust_interval: Seconds between limit adjustments
+            decrease_factor: Limit multiplier applied when latency is above target
+            smoothing: EWMA weight of each new latency sample
+        """
+        self.logger = logger
+        self.name = name
+        self.max_limit = max(1, max_limit)
+        self.min_limit = max(1, min(min_limit, self.max_limit))
+        self.limit = float(self.max_limit)
+        self.queue_size = queue_size
+        self.queue_timeout = queue_timeout
+        self.target_latency = target_latency
+        self.adjust_interval = adjust_interval
+        self.decrease_factor = decrease_factor
+        self.smoothing = smoothing
+        self.in_flight = 0
+        self.waiters = deque()  # futures of queued requests, oldest first
+        self.latency = None  # EWMA of completed request latency in seconds
+        self.saturated = False  # whether requests queued since the last adjustment
+        self.last_adjusted = time.monotonic()
+        self.admitted = 0
+        self.shed = 0
+
+    def _retry_after(self):
+        """Seconds a shed client should wait: the time to drain the queue at the current latency"""
+        latency = self.latency if self.latency is not None else self.target_latency
+        return min(60, max(1, math.ceil((len(self.waiters) + 1) * latency / max(int(self.limit), 1))))
+
+    def _reject(self, reason):
+        self.shed += 1
+        admission_shed.labels(self.name, reason).inc()
+        retry_after = self._retry_after()
+        self.logger.warning(
+            f"Shedding {self.name} request ({reason}): {self.in_flight} in flight, "
+            f"{len(self.waiters)} queued, limit {int(self.limit)}"
+        )
+        raise AdmissionRejectedError(
+            f"Too many concurrent {self.name} requests, retry later",
+            details=reason,
+            retry_after=retry_after
+        )
+
+    async def acquire(self):
+        """
+        Wait for a slot
+
+        Raises:
+            AdmissionRejectedError: if the queue is full or the wait times out
+        """
+        if self.in_flight < int(self.limit) and not self.waiters:
+            self.in_flight += 1
+            self.admitted += 1
+            return
+
+        self.saturated = True
+        if len(self.waiters) >= self.queue_size:
+            self._reject("queue_full")
+
+        waiter = asyncio.get_running_loop().create_future()
+        self.waiters.append(waiter)
+        try:
+            await asyncio.wait((waiter,), timeout=self.queue_timeout)
+        except asyncio.CancelledError:
+            # Client went away while queued; hand back a slot granted in the meantime
+            if waiter.done() and not waiter.cancelled():
+                self.release(None)
+            else:
+                waiter.cancel()
+                self._remove_waiter(waiter)
+            raise
+
+        if not waiter.done():
+            waiter.cancel()
+            self._remove_waiter(waiter)
+            self._reject("queue_timeout")
+        self.admitted += 1
+
+    def _remove_waiter(self, waiter):
+        try:
+            self.waiters.remove(waiter)
+        except ValueError:
+            pass
+
+    def release(self, latency):
+        """
+        Free a slot and pass it to the oldest waiter
+
+        Args:
+            latency: Seconds the request took, or None to skip adaptation
+        """
+        self.in_flight -= 1
+        if latency is not None:
+            self._observe(latency)
+        while self.waiters and self.in_flight < int(self.limit):
+            waiter = self.waiters.popleft()
+            if not waiter.done():
+                self.in_flight += 1
+                waiter.set_result(None)
+
+    def _observe(self, latency):
+        if self.latency is None:
+            self.latency = latency
+        else:
+            self.latency += self.smoothing * (latency - self.latency)
+
+        now = time.monotonic()
+        if now - self.last_adjusted < self.adjust_interval:
+            return
+        self.last_adjusted = now
+        previous = int(self.limit)
+        if self.latency > self.target_latency:
+            self.limit = max(float(self.min_limit), self.limit * self.decrease_factor)
+        elif self.saturated:
+            self.limit = min(float(self.max_limit), self.limit + 1)
+        self.saturated = False
+        if int(self.limit) != previous:
+            self.logger.info(
+                f"Admission limit for {self.name} {previous} -> {int(self.limit)} "
+                f"(latency {self.latency * 1000:.0f}ms, target {self.target_latency * 1000:.0f}ms)"
+            )
+
+    def stats(self):
+        return {
+            "limit": int(self.limit),
+            "min_limit": self.min_limit,
+            "max_limit": self.max_limit,
+            "in_flight": self.in_flight,
+            "queued": len(self.waiters),
+            "queue_size": self.queue_size,
+            "latency_ms": round(self.latency * 1000, 1) if self.latency is not None else None,
+            "target_latency_ms": round(self.target_latency * 1000, 1),
+            "admitted": self.admitted,
+            "shed": self.shed
+        }
+
+class AdmissionController:
+    """Maps request paths to route groups and holds one limiter per group"""
+
+    def __init__(self, limiters, route_groups=ROUTE_GROUPS):
+        self.limiters = {limiter.name: limiter for limiter in limiters}
+        self.route_groups = route_groups
+
+    def limiter_for(self, path):
+        """The limiter for a request path, or None for unlimited paths such as /health and /headers"""
+        for prefix, group in self.route_groups:
+            if path == prefix or path.startswith(prefix + "/"):
+                return self.limiters.get(group)
+        return None
+
+    def stats(self):
+        return {name: limiter.stats() for name, limiter in self.limiters.items()}
+
+def _group_limiter(name):
+    prefix = f"ADMISSION_{name.upper()}"
+    return AdaptiveConcurrencyLimiter(
+        name,
+        max_limit=getattr(settings, f"{prefix}_LIMIT"),
+        min_limit=settings.ADMISSION_MIN_LIMIT,
+        queue_size=getattr(settings, f"{prefix}_QUEUE"),
+        queue_timeout=settings.ADMISSION_QUEUE_TIMEOUT_SECONDS,
+        target_latency=getattr(settings, f"{prefix}_TARGET_MS") / 1000,
+        adjust_interval=settings.ADMISSION_ADJUST_INTERVAL_SECONDS
+    )
+
+# Shared controller - limits apply per worker process
+admission_controller = AdmissionController([_group_limiter(group) for _, group in ROUTE_GROUPS])
+
+def _limiter_stat(key):
+    return lambda: {(name,): stats[key] for name, stats in admission_controller.stats().items()}
+
+metrics_registry.gauge("admission_limit", "Current adaptive concurrency limit by route group", ("group",), callback=_limiter_stat("limit"))
+metrics_registry.gauge("admission_in_flight", "Admitted requests in progress by route group", ("group",), callback=_limiter_stat("in_flight"))
+metrics_registry.gauge("admission_queued", "Requests waiting for a slot by route group", ("group",), callback=_limiter_stat("queued"))
@@ -0,0 +1,176 @@
+# services/cache_snapshot.py
+import os
+import gzip
+import json
+import time
+import asyncio
+import tempfile
+import threading
+from config.settings import settings
+from config.logging_config import setup_logger
+from services.user_token_service import user_token_cache
+from services.abha_profile_store import BODY_VARIANTS
+
+# Configure logging
+logger = setup_logger('cache_snapshot')
+
+SNAPSHOT_VERSION = 1
+
+class CacheSnapshotter:
+    """
+    Saves the warm state of this worker's caches and restores it after a restart
+
+    The snapshot holds the per-user X-tokens and the keys of the hottest
+    profiles and response bodies, most recently used last. Profiles are
+    reloaded from the profile database on restore rather than stored, so a
+    restored cache is never older than the database. Workers sharing a
+    snapshot file merge their state into it.
+    """
+
+    def __init__(self, path, max_age_seconds=86400):
+        """
+        Args:
+            path: Snapshot file (gzip-compressed JSON)
+            max_age_seconds: Snapshots older than this are ignored
+        """
+        self.logger = logger
+        self.path = path
+        self.max_age_seconds = max_age_seconds
+        self.lock = threading.Lock()
+
+    def collect(self):
+        """Current cache state of this worker"""
+        from services.abha_profile_service import get_profile_store
+
+        profiles, bodies = get_profile_store().cached_keys()
+        return {
+            "version": SNAPSHOT_VERSION,
+            "written_at": time.time(),
+            "user_tokens": dict(user_token_cache.tokens),
+            "profiles": profiles,
+            "profile_bodies": [list(key) for key in bodies]
+        }
+
+    def read(self):
+        """
+        Read and validate the snapshot file
+
+        Returns:
+            The snapshot with expired entries dropped, or None if it is missing, stale or invalid
+        """
+        try:
+            with gzip.open(self.path, "rt", encoding="utf-8") as f:
+                snapshot = json.load(f)
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError) as e:
+            self.logger.warning(f"Ignoring unreadable cache snapshot {self.path}: {str(e)}")
+            return None
+
+        if not isinstance(snapshot, dict) or snapshot.get("version") != SNAPSHOT_VERSION:
+            self.logger.warning(f"Ignoring cache snapshot {self.path} with unsupported version")
+            return None
+        age = time.time() - float(snapshot.get("written_at", 0))
+        if age > self.max_age_seconds:
+            self.logger.info(f"Ignoring cache snapshot written {age:.0f}s ago")
+            return None
+
+        # X-tokens that can neither be used nor refreshed are useless after the restart
+        now = time.time()
+        snapshot["user_tokens"] = {
+            abha_number: entry for abha_number, entry in (snapshot.get("user_tokens") or {}).items()
+            if isinstance(entry, dict) and entry.get("token")
+            and (entry.get("expires_at", 0) > now or (entry.get("refreshToken") and entry.get("refresh_expires_at", 0) > now))
+        }
+        snapshot["profiles"] = [key for key in snapshot.get("profiles") or [] if isinstance(key, str)]
+        snapshot["profile_bodies"] = [
+            key for key in snapshot.get("profile_bodies") or []
+            if isinstance(key, list) and len(key) == 2 and key[1] in BODY_VARIANTS
+        ]
+        return snapshot
+
+    def write(self):
+        """Merge this worker's cache state into the snapshot file, replacing it atomically"""
+        with self.lock:
+            started = time.monotonic()
+            snapshot = self.collect()
+            previous = self.read()
+            if previous is not None:
+                # Keep the other workers' entries; this worker's state is the most recent
+                user_tokens = previous["user_tokens"]
+                user_tokens.update(snapshot["user_tokens"])
+                snapshot["user_tokens"] = user_tokens
+                snapshot["profiles"] = _merge_keys(previous["profiles"], snapshot["profiles"])
+                snapshot["profile_bodies"] = [
+                    list(key) for key in _merge_keys(map(tuple, previous["profile_bodies"]), map(tuple, snapshot["profile_bodies"]))
+                ]
+
+            directory = os.path.dirname(os.path.abspath(self.path))
+            fd, temp_path = tempfile.mkstemp(prefix=".cache_snapshot.", dir=directory)
+            try:
+                # X-tokens are credentials; keep the file private to the service user
+                os.chmod(temp_path, 0o600)
+                with os.fdopen(fd, "wb") as raw, gzip.GzipFile(fileobj=raw, mode="wb", compresslevel=6) as f:
+                    f.write(json.dumps(snapshot, separators=(",", ":")).encode("utf-8"))
+                os.replace(temp_path, self.path)
+            except Exception:
+                if os.path.exists(temp_path):
+                    os.remove(temp_path)
+                raise
+
+            self.logger.info(
+                f"Cache snapshot written: {len(snapshot['user_tokens'])} X-tokens, {len(snapshot['profiles'])} profiles, "
+                f"{len(snapshot['profile_bodies'])} bodies in {time.monotonic() - started:.3f}s"
+            )
+
+    def restore(self):
+        """Restore the snapshot into this worker's caches; blocks while profiles are loaded"""
+        from services.abha_profile_service import get_profile_store, ABHAProfileManager
+
+        snapshot = self.read()
+        if snapshot is None:
+            self.logger.info("No usable cache snapshot, starting cold")
+            return False
+
+        restored_tokens = 0
+        for abha_number, entry in snapshot["user_tokens"].items():
+            current = user_token_cache.tokens.get(abha_number)
+            if current is None or current.get("expires_at", 0) < entry.get("expires_at", 0):
+                user_token_cache.tokens[abha_number] = entry
+                restored_tokens += 1
+
+        # Load least recently used first so the LRU order survives the restart; full
+        # bodies are not in the database and are rebuilt from the photo blobs
+        store = get_profile_store()
+        manager = ABHAProfileManager()
+        restored_profiles = sum(1 for abha_number in snapshot["profiles"] if store.get(abha_number) is not None)
+        restored_bodies = sum(
+            1 for abha_number, variant in snapshot["profile_bodies"]
+            if manager.get_profile_body(abha_number, include_photo=variant == "full") is not None
+        )
+
+        self.logger.info(
+            f"Cache snapshot restored: {restored_tokens} X-tokens, {restored_profiles} profiles, {restored_bodies} bodies "
+            f"(written {time.time() - snapshot['written_at']:.0f}s ago)"
+        )
+        return True
+
+    async def run_periodic(self, interval):
+        """Write the snapshot every interval seconds until cancelled"""
+        loop = asyncio.get_running_loop()
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                await loop.run_in_executor(None, self.write)
+            except Exception as e:
+                self.logger.error(f"Writing cache snapshot failed: {str(e)}")
+
+def _merge_keys(older, newer):
+    """Union of two LRU key lists, keeping the newer list's keys most recent and capping at the cache size"""
+    newer = list(newer)
+    newer_set = set(newer)
+    merged = [key for key in older if key not in newer_set] + newer
+    return merged[-settings.ABHA_PROFILE_CACHE_SIZE:]
+
+# Shared snapshotter - the file is shared by all workers
+cache_snapshotter = CacheSnapshotter(settings.CACHE_SNAPSHOT_FILE, max_age_seconds=settings.CACHE_SNAPSHOT_MAX_AGE_SECONDS)
@@ -0,0 +1,123 @@
+# services/deadline.py
+import json
+import time
+import asyncio
+import contextvars
+from starlette.concurrency import run_in_threadpool
+from config.settings import settings
+
+# Monotonic time by which the current request must be answered, or None without a deadline
+_request_deadline = contextvars.ContextVar("request_deadline", default=None)
+
+# Threadpool calls of the current request that may outlive it, see run_blocking
+_request_blocking_calls = contextvars.ContextVar("request_blocking_calls", default=None)
+
+# Header a client can send with the seconds it is willing to wait
+DEADLINE_HEADER = b"x-request-timeout"
+
+# Never hand an outbound call less than this; a shorter call could not succeed anyway
+MIN_OUTBOUND_TIMEOUT = 0.1
+
+def parse_route_timeouts(value):
+    """
+    Parse per-route timeouts from a JSON mapping of path prefix -> seconds
+
+    The longest matching prefix wins; 0 means no deadline.
+
+    Raises:
+        ValueError: if the mapping is malformed
+    """
+    if not value:
+        return ()
+    try:
+        timeouts = json.loads(value)
+    except json.JSONDecodeError as e:
+        raise ValueError(f"Invalid route timeouts: {str(e)}")
+    if not isinstance(timeouts, dict) or not all(isinstance(seconds, (int, float)) for seconds in timeouts.values()):
+        raise ValueError("Route timeouts must map path prefixes to seconds")
+    return tuple(sorted(((prefix, float(seconds)) for prefix, seconds in timeouts.items()), key=lambda item: -len(item[0])))
+
+_route_timeouts = parse_route_timeouts(settings.REQUEST_ROUTE_TIMEOUTS)
+
+def request_timeout(path, headers):
+    """
+    Seconds the request at path may take, or None for no deadline
+
+    A client deadline header can shorten the route's timeout but not extend it.
+    """
+    timeout = settings.REQUEST_TIMEOUT_SECONDS
+    for prefix, seconds in _route_timeouts:
+        if path == prefix or path.startswith(prefix.rstrip("/") + "/"):
+            timeout = seconds
+            break
+    timeout = timeout if timeout > 0 else None
+
+    for name, value in headers:
+        if name == DEADLINE_HEADER:
+            try:
+                requested = float(value.decode("latin-1"))
+            except ValueError:
+                break
+            if requested > 0:
+                timeout = min(timeout, requested) if timeout is not None else requested
+            break
+    return timeout
+
+def start_request_deadline(timeout):
+    """
+    Set the deadline of the current request
+
+    Returns:
+        A token to pass to reset_request_deadline
+    """
+    return _request_deadline.set(time.monotonic() + timeout if timeout is not None else None)
+
+def reset_request_deadline(token):
+    _request_deadline.reset(token)
+
+def remaining_budget():
+    """Seconds left until the current request's deadline, or None without one"""
+    deadline = _request_deadline.get()
+    return deadline - time.monotonic() if deadline is not None else None
+
+def outbound_timeout(default):
+    """
+    Timeout for an outbound call: the default, cut to the time the caller has left
+
+    Threadpool workers started with run_in_threadpool see the request's deadline too.
+    """
+    remaining = remaining_budget()
+    if remaining is None:
+        return default
+    return max(MIN_OUTBOUND_TIMEOUT, min(default, remaining))
+
+def track_blocking_calls():
+    """
+    Collect the run_blocking calls of the current request
+
+    Returns:
+        (set of the calls' tasks, token to pass to stop_tracking_blocking_calls)
+    """
+    calls = set()
+    return calls, _request_blocking_calls.set(calls)
+
+def stop_tracking_blocking_calls(token):
+    _request_blocking_calls.reset(token)
+
+async def run_blocking(func, *args):
+    """
+    Run a blocking call in the threadpool on behalf of the current request
+
+    A thread cannot be interrupted: when the deadline or a disconnect cancels
+    the request, the caller stops waiting at once but the call runs on until
+    its own timeout. It stays in the set from track_blocking_calls until it
+    returns, so admission control can keep the request's slot until then.
+    """
+    task = asyncio.ensure_future(run_in_threadpool(func, *args))
+    # An abandoned call's error has nobody left to report to
+    task.add_done_callback(lambda done: done.cancelled() or done.exception())
+    calls = _request_blocking_calls.get()
+    if calls is not None:
+        calls.add(task)
+        task.add_done_callback(calls.discard)
+    return await asyncio.shield(task)
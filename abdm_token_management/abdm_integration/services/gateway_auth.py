@@ -0,0 +1,174 @@
+# services/gateway_auth.py
+import json
+import time
+import base64
+import hmac
+import ipaddress
+import threading
+from cryptography.exceptions import InvalidSignature
+from cryptography.hazmat.primitives import hashes
+from cryptography.hazmat.primitives.asymmetric import padding, rsa
+from config.settings import settings
+from config.logging_config import setup_logger
+from services.metrics import metrics_registry
+from services.http_client import abdm_session
+from utils.exceptions import GatewayCallbackAuthError
+
+# Configure logging
+logger = setup_logger('gateway_auth')
+
+# JWT algorithm -> hash, for the RSA signatures the gateway uses
+ALGORITHMS = {"RS256": hashes.SHA256, "RS384": hashes.SHA384, "RS512": hashes.SHA512}
+
+# Clock difference tolerated when checking exp and nbf
+CLOCK_SKEW_SECONDS = 30
+
+gateway_callback_auth = metrics_registry.counter(
+    "gateway_callback_auth", "Gateway callbacks by authentication outcome", ("outcome",)
+)
+
+def _b64url_decode(value):
+    return base64.urlsafe_b64decode(value + "=" * (-len(value) % 4))
+
+def parse_allowed_sources(value):
+    """
+    Parse a comma-separated list of IP addresses and CIDR ranges
+
+    Raises:
+        ValueError: if an entry is not an address or range
+    """
+    return tuple(ipaddress.ip_network(entry.strip(), strict=False) for entry in value.split(",") if entry.strip())
+
+class GatewayTokenVerifier:
+    """
+    Verifies that a callback really comes from the ABDM gateway
+
+    The gateway signs the bearer token of every callback with a key published
+    at its certs endpoint (JWKS). Keys are fetched once and cached; an unknown
+    key id triggers at most one refetch per refetch_interval, so forged tokens
+    cannot turn into a stream of requests to the gateway.
+    """
+
+    def __init__(self, certs_url, refetch_interval=300.0, allowed_sources=(), secret=""):
+        """
+        Args:
+            certs_url: Gateway JWKS endpoint
+            refetch_interval: Minimum seconds between key fetches
+            allowed_sources: Networks callbacks must come from, empty to allow any
+            secret: Shared bearer token accepted instead of a gateway JWT, e.g. from an authenticating proxy
+        """
+        self.logger = logger
+        self.certs_url = certs_url
+        self.refetch_interval = refetch_interval
+        self.allowed_sources = allowed_sources
+        self.secret = secret
+        self.keys = {}  # kid -> RSA public key
+        self.fetched_at = 0.0
+        self.lock = threading.Lock()
+
+    def _fetch_keys(self):
+        response = abdm_session.get(self.certs_url, timeout=settings.ABDM_TOKEN_TIMEOUT_SECONDS)
+        response.raise_for_status()
+        keys = {}
+        for jwk in response.json().get("keys", []):
+            if jwk.get("kty") != "RSA" or not jwk.get("n") or not jwk.get("e"):
+                continue
+            numbers = rsa.RSAPublicNumbers(
+                int.from_bytes(_b64url_decode(jwk["e"]), "big"),
+                int.from_bytes(_b64url_decode(jwk["n"]), "big")
+            )
+            keys[jwk.get("kid")] = numbers.public_key()
+        self.logger.info(f"Loaded {len(keys)} gateway signing key(s) from {self.certs_url}")
+        return keys
+
+    def _key(self, kid):
+        """Signing key for kid, fetching the gateway's keys when it is unknown; blocks"""
+        with self.lock:
+            key = self.keys.get(kid)
+            if key is None and time.monotonic() - self.fetched_at >= self.refetch_interval:
+                self.fetched_at = time.monotonic()
+                try:
+                    self.keys = self._fetch_keys()
+                except Exception as e:
+                    self.logger.error(f"Fetching gateway signing keys failed: {str(e)}")
+                    raise GatewayCallbackAuthError("Gateway signing keys unavailable", status_code=503)
+                key = self.keys.get(kid)
+            # Tokens without a kid are accepted from a gateway publishing a single key
+            if key is None and kid is None and len(self.keys) == 1:
+                key = next(iter(self.keys.values()))
+            return key
+
+    def verify_token(self, token):
+        """
+        Verify a gateway JWT's signature and validity period; may block on a key fetch
+
+        Returns:
+            The token's claims
+
+        Raises:
+            GatewayCallbackAuthError: if the token is malformed, unsigned by the gateway or expired
+        """
+        try:
+            header_b64, claims_b64, signature_b64 = token.split(".")
+            header = json.loads(_b64url_decode(header_b64))
+            claims = json.loads(_b64url_decode(claims_b64))
+            signature = _b64url_decode(signature_b64)
+        except ValueError:
+            raise GatewayCallbackAuthError("Malformed gateway token")
+        if not isinstance(header, dict) or not isinstance(claims, dict):
+            raise GatewayCallbackAuthError("Malformed gateway token")
+
+        algorithm = ALGORITHMS.get(header.get("alg"))
+        if algorithm is None:
+            raise GatewayCallbackAuthError(f"Unsupported gateway token algorithm: {header.get('alg')}")
+        key = self._key(header.get("kid"))
+        if key is None:
+            raise GatewayCallbackAuthError("Gateway token signed with an unknown key")
+        try:
+            key.verify(signature, f"{header_b64}.{claims_b64}".encode("ascii"), padding.PKCS1v15(), algorithm())
+        except InvalidSignature:
+            raise GatewayCallbackAuthError("Invalid gateway token signature")
+
+        now = time.time()
+        if not isinstance(claims.get("exp"), (int, float)) or claims["exp"] + CLOCK_SKEW_SECONDS < now:
+            raise GatewayCallbackAuthError("Gateway token expired")
+        if isinstance(claims.get("nbf"), (int, float)) and claims["nbf"] - CLOCK_SKEW_SECONDS > now:
+            raise GatewayCallbackAuthError("Gateway token not valid yet")
+        return claims
+
+    def verify(self, authorization, source):
+        """
+        Authenticate a callback by its Authorization header and source address; may block
+
+        Raises:
+            GatewayCallbackAuthError: if the callback is not from the gateway
+        """
+        try:
+            if self.allowed_sources:
+                try:
+                    address = ipaddress.ip_address(source or "")
+                except ValueError:
+                    raise GatewayCallbackAuthError("Unknown callback source", status_code=403)
+                if not any(address in network for network in self.allowed_sources):
+                    raise GatewayCallbackAuthError(f"Callback source {source} is not allowed", status_code=403)
+
+            scheme, _, token = (authorization or "").partition(" ")
+            if scheme.lower() != "bearer" or not token.strip():
+                raise GatewayCallbackAuthError("Missing gateway bearer token")
+            token = token.strip()
+            if self.secret and hmac.compare_digest(token, self.secret):
+                gateway_callback_auth.labels("accepted").inc()
+                return
+            self.verify_token(token)
+            gateway_callback_auth.labels("accepted").inc()
+        except GatewayCallbackAuthError as e:
+            gateway_callback_auth.labels("rejected").inc()
+            self.logger.warning(f"Rejected gateway callback from {source}: {e.message}")
+            raise
+
+# Shared verifier - caches the gateway's signing keys
+gateway_token_verifier = GatewayTokenVerifier(
+    settings.ABDM_GATEWAY_CERTS_API,
+    allowed_sources=parse_allowed_sources(settings.GATEWAY_CALLBACK_ALLOWED_SOURCES),
+    secret=settings.GATEWAY_CALLBACK_SECRET
+)
@@ -0,0 +1,261 @@
+# services/gateway_callback_service.py
+import time
+import json
+import sqlite3
+import asyncio
+import threading
+from config.settings import settings
+from config.logging_config import setup_logger
+from services.metrics import metrics_registry
+from services.memory_profiler import register_cache
+from services.deadline import outbound_timeout
+from utils.exceptions import GatewayCallbackTimeoutError
+
+# Configure logging
+logger = setup_logger('gateway_callback_service')
+
+class GatewayCallbackMailbox:
+    """
+    SQLite table through which worker processes hand gateway callbacks to each other
+
+    The gateway posts a callback to whichever worker the load balancer picks,
+    not necessarily the one waiting for it. Callbacks without a local waiter
+    are written here and the workers with waiters collect theirs.
+    """
+
+    # Request ids looked up per query, below SQLite's variable limit
+    BATCH_SIZE = 500
+
+    def __init__(self, db_path):
+        """Open (and create if needed) the mailbox database"""
+        self.logger = logger
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(db_path, check_same_thread=False, timeout=5)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        with self.conn:
+            self.conn.execute("""
+                CREATE TABLE IF NOT EXISTS gateway_callbacks (
+                    request_id TEXT PRIMARY KEY,
+                    received_at REAL NOT NULL,
+                    payload TEXT NOT NULL
+                )
+            """)
+            self.conn.execute(
+                "CREATE INDEX IF NOT EXISTS idx_gateway_callbacks_received_at ON gateway_callbacks(received_at)"
+            )
+
+    def post(self, request_id, payload):
+        """Leave a callback for the worker waiting for request_id; blocks"""
+        with self.lock, self.conn:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO gateway_callbacks (request_id, received_at, payload) VALUES (?, ?, ?)",
+                (request_id, time.time(), json.dumps(payload, separators=(",", ":")))
+            )
+
+    def take(self, request_ids):
+        """
+        Remove and return the callbacks posted for request_ids; blocks
+
+        Returns:
+            {requestId: payload} for callbacks younger than the orphan TTL
+        """
+        request_ids = list(request_ids)
+        cutoff = time.time() - settings.GATEWAY_CALLBACK_ORPHAN_TTL_SECONDS
+        found = {}
+        with self.lock, self.conn:
+            for start in range(0, len(request_ids), self.BATCH_SIZE):
+                batch = request_ids[start:start + self.BATCH_SIZE]
+                placeholders = ",".join("?" * len(batch))
+                rows = self.conn.execute(
+                    f"SELECT request_id, received_at, payload FROM gateway_callbacks WHERE request_id IN ({placeholders})",
+                    batch
+                ).fetchall()
+                if not rows:
+                    continue
+                self.conn.execute(
+                    f"DELETE FROM gateway_callbacks WHERE request_id IN ({','.join('?' * len(rows))})",
+                    [row[0] for row in rows]
+                )
+                found.update((row[0], json.loads(row[2])) for row in rows if row[1] >= cutoff)
+        return found
+
+    def prune(self):
+        """Drop callbacks older than the orphan TTL and the oldest past GATEWAY_CALLBACK_MAX_ORPHANS; blocks"""
+        with self.lock, self.conn:
+            self.conn.execute(
+                "DELETE FROM gateway_callbacks WHERE received_at < ?",
+                (time.time() - settings.GATEWAY_CALLBACK_ORPHAN_TTL_SECONDS,)
+            )
+            self.conn.execute(
+                "DELETE FROM gateway_callbacks WHERE request_id NOT IN "
+                "(SELECT request_id FROM gateway_callbacks ORDER BY received_at DESC LIMIT ?)",
+                (settings.GATEWAY_CALLBACK_MAX_ORPHANS,)
+            )
+
+class GatewayCallbackStore:
+    """
+    Correlates asynchronous ABDM gateway v0.5 callbacks (/v0.5/.../on-*) with the
+    requests that triggered them, keyed by requestId.
+
+    Each pending request is a single asyncio future, so waiting holds no thread and
+    no task; thousands of pending gateway requests cost a dict entry each.
+
+    With several worker processes, callbacks for another worker's request go
+    through a GatewayCallbackMailbox that poll_mailbox collects from.
+    """
+
+    def __init__(self, mailbox=None):
+        """
+        Args:
+            mailbox: GatewayCallbackMailbox shared by the worker processes, None with a single worker
+        """
+        self.logger = logger
+        self.mailbox = mailbox
+        self.pending = {}  # requestId -> asyncio.Future
+        self.orphans = {}  # requestId -> (received_at, payload), in arrival order
+
+    def expect(self, request_id):
+        """
+        Register interest in the callback for request_id
+
+        Call this before sending the gateway request so that a fast callback
+        cannot be missed. Must be called from the event loop.
+
+        Returns:
+            The asyncio future that resolves with the callback payload
+        """
+        future = self.pending.get(request_id)
+        if future is None:
+            future = asyncio.get_running_loop().create_future()
+
+            # The callback may have arrived before anyone asked for it, but not too long before
+            self._prune_orphans()
+            orphan = self.orphans.pop(request_id, None)
+            if orphan is not None:
+                future.set_result(orphan[1])
+
+            self.pending[request_id] = future
+        return future
+
+    async def wait_for(self, request_id, timeout=None):
+        """
+        Wait for the callback matching request_id
+
+        Args:
+            request_id: The requestId sent to the gateway
+            timeout: Seconds to wait, defaults to GATEWAY_CALLBACK_TIMEOUT_SECONDS
+
+        Returns:
+            The callback payload posted by the gateway
+        """
+        if timeout is None:
+            # Never wait longer than the request waiting for the callback has left
+            timeout = outbound_timeout(settings.GATEWAY_CALLBACK_TIMEOUT_SECONDS)
+
+        future = self.expect(request_id)
+        try:
+            return await asyncio.wait_for(future, timeout)
+        except asyncio.TimeoutError:
+            self.logger.warning(f"Gateway callback for {request_id} not received within {timeout}s")
+            raise GatewayCallbackTimeoutError(
+                f"No gateway callback received for requestId {request_id} within {timeout} seconds",
+                {"request_id": request_id}
+            )
+        finally:
+            if self.pending.get(request_id) is future:
+                del self.pending[request_id]
+
+    def cancel(self, request_id):
+        """Stop waiting for request_id, e.g. when the gateway request itself failed"""
+        future = self.pending.pop(request_id, None)
+        if future is not None and not future.done():
+            future.cancel()
+
+    def resolve(self, request_id, payload):
+        """
+        Deliver a callback payload to whoever is waiting for request_id
+
+        Callbacks nobody is waiting for yet are kept for GATEWAY_CALLBACK_ORPHAN_TTL_SECONDS
+        so that a waiter registering late still receives them.
+
+        Returns:
+            True if a pending waiter was resolved, False if the callback was parked
+        """
+        future = self.pending.get(request_id)
+        if future is not None:
+            if future.done():
+                self.logger.info(f"Ignoring duplicate gateway callback for {request_id}")
+                return False
+            future.set_result(payload)
+            return True
+
+        self._prune_orphans()
+        if len(self.orphans) >= settings.GATEWAY_CALLBACK_MAX_ORPHANS:
+            # Drop the oldest parked callback rather than growing without bound
+            self.orphans.pop(next(iter(self.orphans)))
+        self.orphans[request_id] = (time.monotonic(), payload)
+        self.logger.info(f"Parked unmatched gateway callback for {request_id}")
+        return False
+
+    async def deliver(self, request_id, payload):
+        """
+        Deliver a callback payload to the waiter for request_id in whichever worker it is
+
+        Without a mailbox this is resolve(). With one, callbacks nobody in this
+        worker waits for are posted to the mailbox instead of parked here.
+
+        Returns:
+            True if a waiter in this worker was resolved
+        """
+        if self.mailbox is None or request_id in self.pending:
+            return self.resolve(request_id, payload)
+        await asyncio.get_running_loop().run_in_executor(None, self.mailbox.post, request_id, payload)
+        self.logger.info(f"Posted gateway callback for {request_id} to the worker mailbox")
+        return False
+
+    async def poll_mailbox(self, interval):
+        """Collect callbacks other workers received for this worker's waiters; runs until cancelled"""
+        loop = asyncio.get_running_loop()
+        last_pruned = time.monotonic()
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                waiting = [request_id for request_id, future in self.pending.items() if not future.done()]
+                if waiting:
+                    found = await loop.run_in_executor(None, self.mailbox.take, waiting)
+                    for request_id, payload in found.items():
+                        self.resolve(request_id, payload)
+                if time.monotonic() - last_pruned >= settings.GATEWAY_CALLBACK_ORPHAN_TTL_SECONDS:
+                    last_pruned = time.monotonic()
+                    await loop.run_in_executor(None, self.mailbox.prune)
+            except Exception as e:
+                self.logger.error(f"Polling the gateway callback mailbox failed: {str(e)}")
+
+    def _prune_orphans(self):
+        """Drop parked callbacks older than the orphan TTL (oldest first)"""
+        cutoff = time.monotonic() - settings.GATEWAY_CALLBACK_ORPHAN_TTL_SECONDS
+        while self.orphans:
+            request_id, (received_at, _) = next(iter(self.orphans.items()))
+            if received_at >= cutoff:
+                break
+            del self.orphans[request_id]
+
+    def stats(self):
+        """Get counts of pending waiters and parked callbacks"""
+        return {
+            "pending": len(self.pending),
+            "orphans": len(self.orphans)
+        }
+
+# Shared store - callbacks and waiters must meet in the same instance, or its mailbox with several workers
+gateway_callback_store = GatewayCallbackStore(
+    GatewayCallbackMailbox(settings.GATEWAY_CALLBACK_DB_PATH) if settings.MULTI_WORKER else None
+)
+
+metrics_registry.gauge(
+    "gateway_callback_store_entries", "Gateway callback waiters pending and early callbacks parked", ("state",),
+    callback=lambda: {(state,): count for state, count in gateway_callback_store.stats().items()}
+)
+register_cache("gateway_callbacks.pending", lambda: gateway_callback_store.pending)
+register_cache("gateway_callbacks.orphans", lambda: gateway_callback_store.orphans)
\ No newline at end of file
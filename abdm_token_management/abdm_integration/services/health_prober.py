@@ -0,0 +1,171 @@
+# services/health_prober.py
+import os
+import time
+import asyncio
+import anyio
+from config.settings import settings
+from config.logging_config import setup_logger, get_log_queue_stats
+from services.metrics import metrics_registry
+from services.token_manager import ABDMTokenManager
+from services.http_client import abdm_origins, probe_origin
+from services.public_key_service import PUBLIC_KEY_PATH
+from services.admission_control import admission_controller
+from services.warmup import readiness
+
+# Configure logging
+logger = setup_logger('health_prober')
+
+# Checks that must pass for the worker to take traffic; the rest only mark it degraded.
+# A check can waive itself by returning "required": False, e.g. the token before one was ever created
+REQUIRED_CHECKS = ("token", "public_key", "saturation")
+
+health_check_ok = metrics_registry.gauge(
+    "health_check_ok", "1 if the last background health check passed, by check", ("check",)
+)
+
+class HealthProber:
+    """
+    Checks dependencies in the background and keeps the latest result
+
+    Probes read the cached snapshot, so /readyz costs no I/O no matter how
+    often orchestrators call it. File and network checks run in the
+    threadpool; saturation is read from in-memory counters on the loop.
+    """
+
+    def __init__(self, token_manager, interval=10.0, timeout=3.0):
+        """
+        Args:
+            token_manager: Manager whose token file is checked (never refreshed here)
+            interval: Seconds between probe rounds
+            timeout: Seconds allowed per upstream probe
+        """
+        self.logger = logger
+        self.token_manager = token_manager
+        self.interval = interval
+        self.timeout = timeout
+        self.last_result = None
+        self.task = None
+
+    def check_token(self):
+        status = self.token_manager.health_check()["token_status"]
+        # A fresh deployment has no token until POST /token creates one, which needs the worker ready
+        return {"ok": status in ("valid", "expiring_soon"), "status": status, "required": status != "not_found"}
+
+    def check_public_key(self):
+        try:
+            age_days = (time.time() - os.path.getmtime(PUBLIC_KEY_PATH)) / 86400
+        except OSError:
+            return {"ok": False, "status": "missing"}
+        stale = age_days > settings.HEALTH_KEY_MAX_AGE_DAYS
+        return {"ok": True, "status": "stale" if stale else "present", "age_days": round(age_days, 1)}
+
+    def check_upstream(self):
+        origins = {}
+        for origin in abdm_origins():
+            try:
+                status_code, seconds = probe_origin(origin, self.timeout)
+                origins[origin] = {"reachable": True, "http_status": status_code, "latency_ms": round(seconds * 1000, 1)}
+            except Exception as e:
+                origins[origin] = {"reachable": False, "error": str(e)}
+        return {"ok": all(origin["reachable"] for origin in origins.values()), "origins": origins}
+
+    def check_saturation(self):
+        """Admission queues, logging queue and threadpool use; must run on the event loop"""
+        threshold = settings.HEALTH_SATURATION_THRESHOLD
+        saturated = []
+        for group, stats in admission_controller.stats().items():
+            if stats["queue_size"] and stats["queued"] >= threshold * stats["queue_size"]:
+                saturated.append(f"admission:{group}")
+        log_queue = get_log_queue_stats()
+        if log_queue["queued"] >= threshold * log_queue["capacity"]:
+            saturated.append("log_queue")
+        limiter = anyio.to_thread.current_default_thread_limiter()
+        if limiter.borrowed_tokens >= threshold * limiter.total_tokens:
+            saturated.append("threadpool")
+        return {
+            "ok": not saturated,
+            "saturated": saturated,
+            "threadpool_in_use": limiter.borrowed_tokens,
+            "log_queue": log_queue["queued"]
+        }
+
+    async def probe(self):
+        """Run one round of checks and store the result"""
+        started = time.monotonic()
+        loop = asyncio.get_running_loop()
+        blocking = {"token": self.check_token, "public_key": self.check_public_key, "upstream": self.check_upstream}
+        results = await asyncio.gather(
+            *(loop.run_in_executor(None, check) for check in blocking.values()), return_exceptions=True
+        )
+        checks = {
+            name: result if not isinstance(result, Exception) else {"ok": False, "error": str(result)}
+            for name, result in zip(blocking, results)
+        }
+        checks["saturation"] = self.check_saturation()
+
+        previous = self.last_result
+        self.last_result = {
+            "checked_at": time.time(),
+            "duration_ms": round((time.monotonic() - started) * 1000, 1),
+            "checks": checks
+        }
+        for name, check in checks.items():
+            health_check_ok.labels(name).set(1 if check["ok"] else 0)
+            if previous is not None and previous["checks"].get(name, {}).get("ok") != check["ok"]:
+                self.logger.warning(f"Health check {name} is now {'passing' if check['ok'] else 'failing'}: {check}")
+
+    async def run(self):
+        while True:
+            try:
+                await self.probe()
+            except Exception as e:
+                self.logger.error(f"Health probe failed: {str(e)}")
+            await asyncio.sleep(self.interval)
+
+    def start(self):
+        """Start probing on the running event loop"""
+        if self.task is None:
+            self.task = asyncio.create_task(self.run())
+        return self.task
+
+    def readiness_report(self):
+        """
+        Combine the latest probe result with the warm-up state; no I/O
+
+        Returns:
+            (ready, report)
+        """
+        result = self.last_result
+        report = {"warmup": readiness.snapshot()}
+        if result is None:
+            report["status"] = "starting"
+            return False, report
+
+        age = time.time() - result["checked_at"]
+        failing = [
+            name for name in REQUIRED_CHECKS
+            if not result["checks"][name]["ok"] and result["checks"][name].get("required", True)
+        ]
+        if not readiness.ready:
+            failing.append("warmup")
+        # A stalled prober must not keep reporting an old healthy result
+        if age > 3 * self.interval + self.timeout:
+            failing.append("prober_stalled")
+        degraded = [name for name, check in result["checks"].items() if not check["ok"] and name not in failing]
+
+        ready = not failing
+        report.update(
+            status="ready" if ready and not degraded else "degraded" if ready else "not_ready",
+            failing=failing,
+            degraded=degraded,
+            checked_seconds_ago=round(age, 1),
+            checks=result["checks"]
+        )
+        return ready, report
+
+# Shared prober - one per worker process
+health_prober = HealthProber(
+    ABDMTokenManager(),
+    interval=settings.HEALTH_PROBE_INTERVAL_SECONDS,
+    timeout=settings.HEALTH_PROBE_TIMEOUT_SECONDS
+)
@@ -0,0 +1,242 @@
+# services/http_client.py
+import time
+import uuid
+import socket
+import threading
+from collections import deque
+from datetime import datetime
+from http import cookiejar
+from urllib.parse import urlsplit
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+import requests
+from requests.adapters import HTTPAdapter
+from config.settings import settings
+from config.logging_config import setup_logger
+from services.metrics import metrics_registry
+
+# Configure logging
+logger = setup_logger('http_client')
+
+def _create_session():
+    """Session with a connection pool sized for concurrent ABDM calls from threadpool workers"""
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=settings.HTTP_POOL_HOSTS, pool_maxsize=settings.HTTP_POOL_SIZE)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    # The session is shared by all requests; never carry cookies from one caller to the next
+    session.cookies.set_policy(cookiejar.DefaultCookiePolicy(allowed_domains=[]))
+    return session
+
+# Shared session - reuses DNS lookups, TCP and TLS connections across ABDM calls
+abdm_session = _create_session()
+
+hedged_requests = metrics_registry.counter(
+    "abdm_hedged_requests", "Hedge-eligible GETs by operation and outcome", ("operation", "outcome")
+)
+
+class HedgingPolicy:
+    """
+    Decides when a slow idempotent GET gets a second, identical request
+
+    A GET that has not answered by the observed latency quantile of its
+    operation is hedged. Every request earns budget_ratio of a hedge token
+    and every hedge spends one, so hedges stay below that share of traffic
+    even when the upstream slows down as a whole.
+    """
+
+    def __init__(self, quantile=0.95, budget_ratio=0.05, max_tokens=10, window=200, min_samples=20, min_delay=0.05):
+        """
+        Args:
+            quantile: Latency quantile after which a request is hedged
+            budget_ratio: Hedges allowed per request, long term
+            max_tokens: Hedges that can be saved up for a burst
+            window: Recent latencies kept per operation
+            min_samples: Latencies needed before an operation is hedged
+            min_delay: Seconds to wait at least before hedging
+        """
+        self.quantile = quantile
+        self.budget_ratio = budget_ratio
+        self.max_tokens = max_tokens
+        self.window = window
+        self.min_samples = min_samples
+        self.min_delay = min_delay
+        self.latencies = {}  # operation -> deque of recent latencies in seconds
+        self.tokens = max_tokens
+        self.lock = threading.Lock()
+
+    def record(self, operation, seconds):
+        with self.lock:
+            samples = self.latencies.get(operation)
+            if samples is None:
+                samples = self.latencies[operation] = deque(maxlen=self.window)
+            samples.append(seconds)
+
+    def hedge_delay(self, operation):
+        """Seconds to wait before hedging, or None until enough latencies are known"""
+        with self.lock:
+            samples = sorted(self.latencies.get(operation, ()))
+        if len(samples) < self.min_samples:
+            return None
+        return max(self.min_delay, samples[min(len(samples) - 1, int(len(samples) * self.quantile))])
+
+    def earn(self):
+        with self.lock:
+            self.tokens = min(self.max_tokens, self.tokens + self.budget_ratio)
+
+    def has_budget(self):
+        with self.lock:
+            return self.tokens >= 1
+
+    def try_spend(self):
+        with self.lock:
+            if self.tokens < 1:
+                return False
+            self.tokens -= 1
+            return True
+
+# Shared policy and the threads that run hedged requests
+hedging_policy = HedgingPolicy(
+    quantile=settings.HEDGE_QUANTILE,
+    budget_ratio=settings.HEDGE_BUDGET_RATIO,
+    min_samples=settings.HEDGE_MIN_SAMPLES,
+    min_delay=settings.HEDGE_MIN_DELAY_MS / 1000
+)
+_hedge_executor = ThreadPoolExecutor(max_workers=settings.HTTP_POOL_SIZE, thread_name_prefix="http-hedge")
+
+def _timed_get(url, operation, kwargs):
+    started = time.monotonic()
+    response = abdm_session.get(url, **kwargs)
+    hedging_policy.record(operation, time.monotonic() - started)
+    return response
+
+def _hedge_kwargs(kwargs):
+    """Request arguments for a hedge; ABDM expects every request to carry its own REQUEST-ID and TIMESTAMP"""
+    headers = dict(kwargs.get("headers") or {})
+    if "REQUEST-ID" in headers:
+        headers["REQUEST-ID"] = str(uuid.uuid4())
+    if "TIMESTAMP" in headers:
+        headers["TIMESTAMP"] = datetime.utcnow().isoformat(timespec='milliseconds') + 'Z'
+    return {**kwargs, "headers": headers}
+
+def _close_response(future):
+    if not future.cancelled() and future.exception() is None:
+        future.result().close()
+
+def hedged_get(url, operation, **kwargs):
+    """
+    GET through the shared session, hedging slow requests; only for idempotent calls
+
+    If no response arrived by the operation's latency quantile and the hedge
+    budget allows, the request is sent again with a new REQUEST-ID and
+    TIMESTAMP and the first successful response wins. The losing request runs to completion in the background
+    and its response is discarded. Blocks like requests.get.
+
+    Args:
+        url: URL to GET
+        operation: Name whose latency history sets the hedge delay
+        kwargs: Passed to requests (headers, timeout, ...)
+    """
+    hedging_policy.earn()
+    delay = hedging_policy.hedge_delay(operation) if settings.HEDGING_ENABLED else None
+    if delay is None or not hedging_policy.has_budget():
+        # No hedge could be sent, so don't pay for the hop to the hedge threads
+        return _timed_get(url, operation, kwargs)
+
+    primary = _hedge_executor.submit(_timed_get, url, operation, kwargs)
+    done, _ = wait((primary,), timeout=delay)
+    if done:
+        return primary.result()
+    if not hedging_policy.try_spend():
+        hedged_requests.labels(operation, "budget_exhausted").inc()
+        return primary.result()
+
+    hedge_kwargs = _hedge_kwargs(kwargs)
+    logger.debug(
+        f"Hedging {operation} GET after {delay * 1000:.0f}ms (REQUEST-ID {hedge_kwargs['headers'].get('REQUEST-ID')})"
+    )
+    hedge = _hedge_executor.submit(_timed_get, url, operation, hedge_kwargs)
+    pending = {primary, hedge}
+    winner = error = None
+    while pending and winner is None:
+        done, pending = wait(pending, return_when=FIRST_COMPLETED)
+        for future in done:
+            if future.exception() is None:
+                winner = future
+                break
+            error = future.exception()
+    if winner is None:
+        hedged_requests.labels(operation, "both_failed").inc()
+        raise error
+
+    loser = hedge if winner is primary else primary
+    loser.add_done_callback(_close_response)
+    hedged_requests.labels(operation, "hedge_won" if winner is hedge else "primary_won").inc()
+    return winner.result()
+
+def abdm_origins():
+    """scheme://host[:port] of every configured ABDM endpoint"""
+    urls = (
+        settings.ABDM_SESSION_API,
+        settings.ABDM_PUBLIC_KEY_API,
+        settings.ABDM_INITIATE_OTP_API,
+        settings.ABDM_ENROLL_API,
+        settings.ABDM_ENROL_SUGGESTION_API,
+        settings.ABDM_AUTH_BY_ABDM_API,
+        settings.ABDM_EMAIL_VERIFICATION_API,
+        settings.ABDM_USER_TOKEN_REFRESH_API,
+    )
+    return sorted({f"{parts.scheme}://{parts.netloc}" for parts in map(urlsplit, urls) if parts.netloc})
+
+def _warm_origin(origin, timeout):
+    parts = urlsplit(origin)
+    socket.getaddrinfo(parts.hostname, parts.port or (443 if parts.scheme == "https" else 80), type=socket.SOCK_STREAM)
+    # Any response will do; the point is the pooled TCP + TLS connection it leaves behind
+    abdm_session.head(origin, timeout=timeout).close()
+
+def probe_origin(origin, timeout):
+    """
+    Send a HEAD request to an origin; any HTTP response means it is reachable
+
+    Returns:
+        (HTTP status, seconds taken)
+    """
+    started = time.monotonic()
+    response = abdm_session.head(origin, timeout=timeout)
+    response.close()
+    return response.status_code, time.monotonic() - started
+
+def warm_connections(origins, per_host=1, timeout=10.0):
+    """
+    Resolve DNS and open pooled TLS connections to the given origins; blocks
+
+    Connections are opened in parallel, per_host at a time per origin, so
+    the pool holds that many idle connections for the first requests.
+
+    Returns:
+        Dict of origin -> {"seconds": ..., "error": ...}
+    """
+    results = {}
+
+    def warm(origin):
+        started = time.monotonic()
+        try:
+            _warm_origin(origin, timeout)
+            return origin, None, time.monotonic() - started
+        except Exception as e:
+            return origin, str(e), time.monotonic() - started
+
+    jobs = [origin for origin in origins for _ in range(max(1, per_host))]
+    if not jobs:
+        return results
+    with ThreadPoolExecutor(max_workers=len(jobs), thread_name_prefix="http-warmup") as executor:
+        for origin, error, seconds in executor.map(warm, jobs):
+            entry = results.setdefault(origin, {"seconds": 0.0, "error": None})
+            entry["seconds"] = round(max(entry["seconds"], seconds), 3)
+            entry["error"] = entry["error"] or error
+
+    for origin, entry in results.items():
+        if entry["error"]:
+            logger.warning(f"Could not pre-warm connections to {origin}: {entry['error']}")
+        else:
+            logger.info(f"Pre-warmed {max(1, per_host)} connection(s) to {origin} in {entry['seconds']:.3f}s")
+    return results
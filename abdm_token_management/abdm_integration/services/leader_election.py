@@ -0,0 +1,106 @@
+# services/leader_election.py
+import os
+import asyncio
+from config.settings import settings
+from config.logging_config import setup_logger
+from services.metrics import metrics_registry
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+# Configure logging
+logger = setup_logger('leader_election')
+
+class LeaderElection:
+    """
+    Elects the one worker process that runs background refresh jobs
+
+    The leader holds an exclusive flock on a lock file for as long as it
+    lives. The OS drops the lock when that process exits or dies, so
+    followers polling the lock take over without any lease bookkeeping.
+    Without fcntl (Windows) every process considers itself leader, which is
+    only correct with a single worker.
+    """
+
+    def __init__(self, lock_path, retry_interval=5.0):
+        """
+        Args:
+            lock_path: File shared by all workers of this deployment
+            retry_interval: Seconds between attempts while another worker leads
+        """
+        self.logger = logger
+        self.lock_path = lock_path
+        self.retry_interval = retry_interval
+        self.lock_file = None
+        self.is_leader = False
+        self.task = None
+
+    def try_acquire(self):
+        """Take leadership if no other process holds it; returns whether this process leads"""
+        if self.is_leader:
+            return True
+        if fcntl is None:
+            self.is_leader = True
+            self.logger.warning("fcntl unavailable, running background jobs without leader election")
+            return True
+
+        lock_file = open(self.lock_path, "a+")
+        try:
+            fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            lock_file.close()
+            return False
+
+        # Record the holder for operators; the lock itself is what counts
+        lock_file.seek(0)
+        lock_file.truncate()
+        lock_file.write(f"{os.getpid()}\n")
+        lock_file.flush()
+        self.lock_file = lock_file
+        self.is_leader = True
+        self.logger.info(f"Worker {os.getpid()} elected leader for background jobs ({self.lock_path})")
+        return True
+
+    def leader_pid(self):
+        """PID written by the current leader, or None if unknown"""
+        try:
+            with open(self.lock_path) as lock_file:
+                return int(lock_file.read().strip() or 0) or None
+        except (OSError, ValueError):
+            return None
+
+    async def run(self, on_elected):
+        """Wait until this process is leader, then call on_elected once"""
+        if not self.try_acquire():
+            self.logger.info(f"Worker {os.getpid()} following leader {self.leader_pid()}, retrying every {self.retry_interval}s")
+            while not self.try_acquire():
+                await asyncio.sleep(self.retry_interval)
+        on_elected()
+
+    def start(self, on_elected):
+        """Run the election in a background task on the running event loop"""
+        if self.task is None:
+            self.task = asyncio.create_task(self.run(on_elected))
+        return self.task
+
+    def release(self):
+        """Give up leadership so another worker can take over"""
+        if self.task is not None:
+            self.task.cancel()
+            self.task = None
+        if self.lock_file is not None:
+            fcntl.flock(self.lock_file.fileno(), fcntl.LOCK_UN)
+            self.lock_file.close()
+            self.lock_file = None
+            self.logger.info(f"Worker {os.getpid()} released background job leadership")
+        self.is_leader = False
+
+# Shared election - one per worker process
+leader_election = LeaderElection(settings.LEADER_LOCK_FILE, retry_interval=settings.LEADER_RETRY_SECONDS)
+
+metrics_registry.gauge(
+    "background_jobs_leader", "1 if this worker runs the background refresh jobs",
+    callback=lambda: 1 if leader_election.is_leader else 0
+)
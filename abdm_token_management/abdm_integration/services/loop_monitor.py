@@ -0,0 +1,184 @@
+# services/loop_monitor.py
+import sys
+import time
+import asyncio
+import threading
+import traceback
+from collections import deque
+from config.settings import settings
+from config.logging_config import setup_logger
+from services.metrics import metrics_registry
+
+# Configure logging
+logger = setup_logger('loop_monitor')
+
+loop_lag = metrics_registry.histogram(
+    "event_loop_lag_seconds", "Delay between when the loop probe was due and when it ran",
+    buckets=(0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+)
+loop_stalls = metrics_registry.counter(
+    "event_loop_stalls", "Times the event loop was blocked longer than the stall threshold, by route", ("route",)
+)
+
+class EventLoopMonitor:
+    """
+    Measures event loop scheduling lag and catches the code that blocks it
+
+    A probe task sleeps for a fixed interval and records how late it wakes up.
+    A watchdog thread notices when the probe is overdue, i.e. the loop is
+    blocked right now, and captures the loop thread's stack while the
+    blocking call is still running. The request being handled is found by
+    walking the stack to the request middleware frame.
+    """
+
+    def __init__(self, interval=0.1, stall_threshold=0.1, fail_threshold=0.0, history=50):
+        """
+        Args:
+            interval: Seconds between probes
+            stall_threshold: Blocking longer than this is reported with a stack
+            fail_threshold: Test mode; requests blocking longer than this are failed (0 = off)
+            history: Number of recent stalls kept for inspection
+        """
+        self.logger = logger
+        self.interval = interval
+        self.stall_threshold = stall_threshold
+        self.fail_threshold = fail_threshold
+        self.stalls = deque(maxlen=history)
+        self.request_frame_codes = set()  # code objects whose frames hold request_id/method/path locals
+        self.loop = None
+        self.loop_thread_id = None
+        self.last_beat = None
+        self.last_lag = 0.0
+        self.current_stall = None
+        self.current_stall_beat = None
+        self.probe_task = None
+        self.watchdog_thread = None
+        self.stopping = threading.Event()
+
+    def start(self):
+        """Start monitoring the running event loop"""
+        if self.probe_task is not None:
+            return
+        self.loop = asyncio.get_running_loop()
+        self.loop_thread_id = threading.get_ident()
+        self.last_beat = time.monotonic()
+        self.stopping.clear()
+        self.probe_task = asyncio.create_task(self._probe())
+        self.watchdog_thread = threading.Thread(target=self._watchdog, name="loop-watchdog", daemon=True)
+        self.watchdog_thread.start()
+        self.logger.info(
+            f"Event loop monitor started (interval {self.interval * 1000:.0f}ms, "
+            f"stall threshold {self.stall_threshold * 1000:.0f}ms"
+            + (f", failing requests that block over {self.fail_threshold * 1000:.0f}ms)" if self.fail_threshold else ")")
+        )
+
+    async def stop(self):
+        """Stop the probe task and watchdog thread"""
+        self.stopping.set()
+        if self.probe_task is not None:
+            self.probe_task.cancel()
+            try:
+                await self.probe_task
+            except asyncio.CancelledError:
+                pass
+            self.probe_task = None
+
+    async def _probe(self):
+        while True:
+            scheduled = time.monotonic()
+            await asyncio.sleep(self.interval)
+            now = time.monotonic()
+            self.last_lag = max(0.0, now - scheduled - self.interval)
+            loop_lag.observe(self.last_lag)
+            self.last_beat = now
+
+    @property
+    def detect_threshold(self):
+        return min(self.stall_threshold, self.fail_threshold or self.stall_threshold)
+
+    def _watchdog(self):
+        poll = max(0.005, self.detect_threshold / 4)
+        while not self.stopping.wait(poll):
+            last_beat = self.last_beat
+            stall = self.current_stall
+            if stall is not None and self.current_stall_beat != last_beat:
+                # The probe ran again, so the loop is free; its lag is the full stall length
+                stall["blocked_ms"] = round(max(stall["blocked_ms"], self.last_lag * 1000), 1)
+                self.current_stall = None
+                self._finish(stall)
+                stall = None
+
+            blocked_for = time.monotonic() - last_beat - self.interval
+            if blocked_for >= self.detect_threshold:
+                if stall is None:
+                    self.current_stall_beat = last_beat
+                    self.current_stall = self._capture(blocked_for)
+                else:
+                    stall["blocked_ms"] = round(blocked_for * 1000, 1)
+
+    def _capture(self, blocked_for):
+        """Snapshot the loop thread's stack and the request it is handling"""
+        frame = sys._current_frames().get(self.loop_thread_id)
+        stall = {
+            "started_at": time.time() - blocked_for,
+            "blocked_ms": round(blocked_for * 1000, 1),
+            "request_id": None,
+            "route": None,
+            "stack": "".join(traceback.format_stack(frame, limit=40)) if frame is not None else ""
+        }
+        while frame is not None:
+            if frame.f_code in self.request_frame_codes:
+                frame_locals = frame.f_locals
+                stall["request_id"] = frame_locals.get("request_id")
+                route = frame_locals.get("scope", {}).get("route")
+                path = route.path if route is not None else frame_locals.get("path")
+                stall["route"] = f"{frame_locals.get('method')} {path}"
+                break
+            frame = frame.f_back
+        return stall
+
+    def _finish(self, stall):
+        self.stalls.append(stall)
+        if stall["blocked_ms"] < self.stall_threshold * 1000:
+            return
+        loop_stalls.labels(stall["route"] or "background").inc()
+        self.logger.warning(
+            f"Event loop blocked for {stall['blocked_ms']:.0f}ms in {stall['route'] or 'background task'}"
+            f" (request_id {stall['request_id']}):\n{stall['stack']}"
+        )
+
+    def blocking_violation(self, request_id):
+        """
+        Test mode check: the stall caused by a request if it exceeded the fail threshold
+
+        Returns:
+            The stall record, or None
+        """
+        if not self.fail_threshold:
+            return None
+        threshold_ms = self.fail_threshold * 1000
+        stall = self.current_stall
+        if stall is not None and stall["request_id"] == request_id and stall["blocked_ms"] >= threshold_ms:
+            return stall
+        for stall in reversed(self.stalls):
+            if stall["request_id"] == request_id and stall["blocked_ms"] >= threshold_ms:
+                return stall
+        return None
+
+    def stats(self):
+        """Get the monitor configuration and recent stalls, newest first"""
+        return {
+            "running": self.probe_task is not None,
+            "interval_ms": self.interval * 1000,
+            "stall_threshold_ms": self.stall_threshold * 1000,
+            "fail_threshold_ms": self.fail_threshold * 1000,
+            "blocked_now_ms": self.current_stall["blocked_ms"] if self.current_stall else 0,
+            "recent_stalls": list(reversed(self.stalls))
+        }
+
+# Shared monitor - one per event loop / process
+event_loop_monitor = EventLoopMonitor(
+    interval=settings.LOOP_MONITOR_INTERVAL_SECONDS,
+    stall_threshold=settings.LOOP_STALL_THRESHOLD_MS / 1000,
+    fail_threshold=settings.LOOP_BLOCK_FAIL_MS / 1000
+)
\ No newline at end of file
@@ -0,0 +1,299 @@
+# services/memory_profiler.py
+import gc
+import sys
+import time
+import threading
+import tracemalloc
+from contextlib import nullcontext
+from collections import OrderedDict
+from config.settings import settings
+from config.logging_config import setup_logger
+
+# Configure logging
+logger = setup_logger('memory_profiler')
+
+# Cache name -> (callable returning the cache object(s) to measure or None if not created yet,
+# callable returning the lock the cache is mutated under or None)
+_cache_providers = OrderedDict()
+
+# Measure at most this many entries per cache and extrapolate the rest
+SIZE_SAMPLE_ENTRIES = 200
+
+def register_cache(name, provider, lock=None):
+    """
+    Register a cache for footprint reporting
+
+    Args:
+        name: Report name, e.g. "profile_store.records"
+        provider: Callable returning the dict/list/set holding the cache, or None
+        lock: Optional callable returning the lock the cache's owner mutates it under;
+            it is held while the cache's entries are copied
+    """
+    _cache_providers[name] = (provider, lock)
+
+def deep_sizeof(obj, seen=None):
+    """Approximate bytes held by an object and everything it contains, counting shared objects once"""
+    if seen is None:
+        seen = set()
+    size = 0
+    stack = [obj]
+    while stack:
+        current = stack.pop()
+        if id(current) in seen:
+            continue
+        seen.add(id(current))
+        size += sys.getsizeof(current)
+        if isinstance(current, dict):
+            stack.extend(current.keys())
+            stack.extend(current.values())
+        elif isinstance(current, (list, tuple, set, frozenset)):
+            stack.extend(current)
+        elif hasattr(current, "__dict__") and not isinstance(current, type):
+            stack.append(vars(current))
+    return size
+
+def snapshot_entries(container):
+    """
+    (key, value) pairs of a cache, copied in a single C-level call
+
+    The copy never holds the GIL back to Python code, so a mutation on
+    another thread cannot break it with "changed size during iteration".
+    """
+    if isinstance(container, dict):
+        return list(container.items())
+    return [(None, value) for value in list(container)]
+
+def cache_footprint(container, entries=None):
+    """
+    Entry count and approximate byte size of a cache
+
+    Large caches are measured on a sample of entries and extrapolated.
+
+    Args:
+        container: The cache
+        entries: Its entries if already copied (see snapshot_entries)
+    """
+    if entries is None:
+        entries = snapshot_entries(container)
+    sample = entries[:SIZE_SAMPLE_ENTRIES]
+    seen = set()
+    sampled_bytes = sum(deep_sizeof(key, seen) + deep_sizeof(value, seen) for key, value in sample)
+    estimated = sampled_bytes * len(entries) / len(sample) if sample else 0
+    return {
+        "entries": len(entries),
+        "bytes": int(sys.getsizeof(container) + estimated),
+        "estimated": len(entries) > len(sample)
+    }
+
+def cache_report():
+    """
+    Footprint of every registered cache that exists in this process
+
+    Runs off the event loop while the caches keep changing: entries are
+    copied under the owner's lock where there is one, and a cache that still
+    cannot be measured reports its error without failing the whole report.
+    """
+    report = {}
+    for name, (provider, lock_provider) in list(_cache_providers.items()):
+        try:
+            lock = lock_provider() if lock_provider is not None else None
+            with lock if lock is not None else nullcontext():
+                container = provider()
+                entries = snapshot_entries(container) if container is not None else None
+            if container is not None:
+                report[name] = cache_footprint(container, entries)
+        except Exception as e:
+            report[name] = {"error": str(e)}
+    return report
+
+def manager_instances():
+    """Count live instances of the service manager classes (modules create their own copies)"""
+    from services.token_manager import ABDMTokenManager
+    from services.public_key_service import ABDMPublicKeyManager
+    from services.abha_profile_service import ABHAProfileManager
+    classes = (ABDMTokenManager, ABDMPublicKeyManager, ABHAProfileManager)
+    counts = {cls.__name__: 0 for cls in classes}
+    for obj in gc.get_objects():
+        if isinstance(obj, classes):
+            counts[type(obj).__name__] += 1
+    return counts
+
+def process_rss_bytes():
+    """Resident set size of this process, from /proc where available"""
+    try:
+        with open("/proc/self/status") as status:
+            for line in status:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    try:
+        import resource
+        # ru_maxrss is the peak, in KB on Linux and bytes on macOS
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak if sys.platform == "darwin" else peak * 1024
+    except (ImportError, OSError):
+        return None
+
+def _format_stat(stat):
+    # "file:line" per frame; reading source lines would itself allocate (linecache)
+    sites = [f"{frame.filename}:{frame.lineno}" for frame in stat.traceback]
+    entry = {
+        "site": sites[0] if len(sites) == 1 else sites,
+        "bytes": stat.size,
+        "count": stat.count
+    }
+    if hasattr(stat, "size_diff"):
+        entry["bytes_diff"] = stat.size_diff
+        entry["count_diff"] = stat.count_diff
+    return entry
+
+class MemoryProfiler:
+    """Controls tracemalloc and keeps the last few snapshots for diffing"""
+
+    # Allocations made by the profiler machinery itself
+    SNAPSHOT_FILTERS = (
+        tracemalloc.Filter(False, tracemalloc.__file__),
+        tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+        tracemalloc.Filter(False, "<frozen importlib._bootstrap_external>"),
+        tracemalloc.Filter(False, "<unknown>")
+    )
+
+    def __init__(self, max_snapshots=4):
+        self.logger = logger
+        self.max_snapshots = max_snapshots
+        self.snapshots = OrderedDict()  # snapshot id -> (taken_at, snapshot)
+        self.next_id = 1
+        self.lock = threading.Lock()
+        self.trend_thread = None
+        self.trend_stop = threading.Event()
+
+    def start_tracing(self, frames=1):
+        """Start tracemalloc; allocations made before this are not traced"""
+        if tracemalloc.is_tracing():
+            return False
+        tracemalloc.start(frames)
+        self.logger.warning(f"tracemalloc started with {frames} frame(s) per allocation")
+        return True
+
+    def stop_tracing(self):
+        """Stop tracemalloc and drop stored snapshots"""
+        with self.lock:
+            self.snapshots.clear()
+        if not tracemalloc.is_tracing():
+            return False
+        tracemalloc.stop()
+        self.logger.warning("tracemalloc stopped")
+        return True
+
+    def take_snapshot(self, top=20, group_by="lineno"):
+        """
+        Take and store a tracemalloc snapshot, evicting the oldest past max_snapshots
+
+        Returns:
+            Snapshot id, traced totals and the top allocation sites
+
+        Raises:
+            RuntimeError: if tracemalloc is not tracing
+        """
+        if not tracemalloc.is_tracing():
+            raise RuntimeError("tracemalloc is not running; start it first")
+        snapshot = tracemalloc.take_snapshot().filter_traces(self.SNAPSHOT_FILTERS)
+        with self.lock:
+            snapshot_id = self.next_id
+            self.next_id += 1
+            self.snapshots[snapshot_id] = (time.time(), snapshot)
+            while len(self.snapshots) > self.max_snapshots:
+                self.snapshots.popitem(last=False)
+
+        current, peak = tracemalloc.get_traced_memory()
+        return {
+            "id": snapshot_id,
+            "traced_bytes": current,
+            "traced_peak_bytes": peak,
+            "top": [_format_stat(stat) for stat in snapshot.statistics(group_by)[:top]]
+        }
+
+    def diff(self, old_id, new_id, top=20, group_by="lineno"):
+        """
+        Compare two stored snapshots
+
+        Returns:
+            Allocation sites with the largest growth between the two
+
+        Raises:
+            KeyError: if a snapshot id is unknown
+        """
+        with self.lock:
+            old_taken_at, old = self.snapshots[old_id]
+            new_taken_at, new = self.snapshots[new_id]
+        stats = new.compare_to(old, group_by)
+        return {
+            "from": old_id,
+            "to": new_id,
+            "seconds": round(new_taken_at - old_taken_at, 1),
+            "bytes_diff": sum(stat.size_diff for stat in stats),
+            "top": [_format_stat(stat) for stat in stats[:top]]
+        }
+
+    def list_snapshots(self):
+        with self.lock:
+            return [{"id": snapshot_id, "taken_at": taken_at} for snapshot_id, (taken_at, _) in self.snapshots.items()]
+
+    def report(self):
+        """Process memory, tracemalloc totals, cache footprints and manager instance counts"""
+        traced = tracemalloc.get_traced_memory() if tracemalloc.is_tracing() else None
+        return {
+            "rss_bytes": process_rss_bytes(),
+            "tracemalloc": {
+                "tracing": tracemalloc.is_tracing(),
+                "traced_bytes": traced[0] if traced else None,
+                "traced_peak_bytes": traced[1] if traced else None,
+                "snapshots": self.list_snapshots()
+            },
+            "caches": cache_report(),
+            "manager_instances": manager_instances(),
+            "gc_objects": len(gc.get_objects())
+        }
+
+    def start_trend_logging(self, interval):
+        """Log RSS and cache growth every interval seconds in a background thread"""
+        if self.trend_thread is not None or interval <= 0:
+            return
+
+        def log_trend():
+            started_at = time.monotonic()
+            first = previous = None
+            while not self.trend_stop.wait(interval):
+                try:
+                    rss = process_rss_bytes() or 0
+                    caches = {name: footprint.get("bytes", 0) for name, footprint in cache_report().items()}
+                    if first is None:
+                        first = previous = (rss, caches)
+                    hours = max((time.monotonic() - started_at) / 3600, 1e-9)
+                    growing = {
+                        name: size - previous[1].get(name, 0)
+                        for name, size in caches.items() if size != previous[1].get(name, 0)
+                    }
+                    self.logger.info(
+                        f"Memory: RSS {rss / 1048576:.1f} MiB ({(rss - previous[0]) / 1048576:+.1f} MiB since last, "
+                        f"{(rss - first[0]) / 1048576 / hours:+.1f} MiB/h overall); "
+                        f"caches {sum(caches.values()) / 1048576:.1f} MiB"
+                        + (f"; changed: {', '.join(f'{name} {delta:+d}B' for name, delta in growing.items())}" if growing else "")
+                    )
+                    previous = (rss, caches)
+                except Exception as e:
+                    self.logger.error(f"Memory trend logging failed: {str(e)}")
+
+        self.trend_stop.clear()
+        self.trend_thread = threading.Thread(target=log_trend, name="memory-trend", daemon=True)
+        self.trend_thread.start()
+        self.logger.info(f"Memory trend logging every {interval}s")
+
+    def stop_trend_logging(self):
+        """Stop the trend logging thread"""
+        self.trend_stop.set()
+        self.trend_thread = None
+
+# Shared profiler - tracemalloc is process-wide
+memory_profiler = MemoryProfiler(max_snapshots=settings.MEMORY_MAX_SNAPSHOTS)
\ No newline at end of file
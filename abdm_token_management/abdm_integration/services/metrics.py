@@ -0,0 +1,243 @@
+# services/metrics.py
+import math
+import bisect
+import threading
+from config.logging_config import setup_logger
+
+# Configure logging
+logger = setup_logger('metrics')
+
+# Default latency buckets in seconds; ABDM calls range from milliseconds to 30s timeouts
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 20.0, 30.0, 60.0)
+
+def _format_value(value):
+    if value == math.inf:
+        return "+Inf"
+    if value == -math.inf:
+        return "-Inf"
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+def _escape_label(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+def _format_labels(names, values, extra=None):
+    pairs = [f'{name}="{_escape_label(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+class _CounterChild:
+    __slots__ = ("value", "lock")
+
+    def __init__(self):
+        self.value = 0.0
+        self.lock = threading.Lock()
+
+    def inc(self, amount=1.0):
+        with self.lock:
+            self.value += amount
+
+class _GaugeChild:
+    __slots__ = ("value", "lock")
+
+    def __init__(self):
+        self.value = 0.0
+        self.lock = threading.Lock()
+
+    def set(self, value):
+        self.value = value
+
+    def inc(self, amount=1.0):
+        with self.lock:
+            self.value += amount
+
+    def dec(self, amount=1.0):
+        with self.lock:
+            self.value -= amount
+
+class _HistogramChild:
+    __slots__ = ("bounds", "counts", "sum", "lock")
+
+    def __init__(self, bounds):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)  # last slot is +Inf
+        self.sum = 0.0
+        self.lock = threading.Lock()
+
+    def observe(self, value):
+        index = bisect.bisect_left(self.bounds, value)
+        with self.lock:
+            self.counts[index] += 1
+            self.sum += value
+
+class Metric:
+    """
+    A named metric family with fixed label names
+
+    labels(...) returns the child for one set of label values; children are
+    created once and reused, so hot paths can bind them up front and record
+    with a single uncontended lock and no allocation.
+    """
+
+    type_name = "untyped"
+    child_class = None
+
+    def __init__(self, name, documentation, label_names=()):
+        self.name = name
+        self.documentation = documentation
+        self.label_names = tuple(label_names)
+        self.children = {}
+        self.lock = threading.Lock()
+        if not self.label_names:
+            self.children[()] = self._new_child()
+
+    def _new_child(self):
+        return self.child_class()
+
+    def labels(self, *values):
+        """Get the child for the given label values, creating it on first use"""
+        child = self.children.get(values)
+        if child is None:
+            if len(values) != len(self.label_names):
+                raise ValueError(f"{self.name} expects labels {self.label_names}, got {values}")
+            with self.lock:
+                child = self.children.get(values)
+                if child is None:
+                    child = self.children[values] = self._new_child()
+        return child
+
+    def samples(self):
+        """Yield (suffix, label string, value) tuples for the exposition format"""
+        raise NotImplementedError
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.type_name}"]
+        for suffix, labels, value in self.samples():
+            lines.append(f"{self.name}{suffix}{labels} {_format_value(value)}")
+        return "\n".join(lines)
+
+class Counter(Metric):
+    """Monotonically increasing count"""
+
+    type_name = "counter"
+    child_class = _CounterChild
+
+    def inc(self, amount=1.0):
+        self.children[()].inc(amount)
+
+    def samples(self):
+        for values, child in list(self.children.items()):
+            yield "_total", _format_labels(self.label_names, values), child.value
+
+class Gauge(Metric):
+    """
+    Value that can go up and down
+
+    With a callback the gauge is computed at scrape time instead; the callback
+    returns a number, None to skip, or a dict of label value tuple -> number.
+    """
+
+    type_name = "gauge"
+    child_class = _GaugeChild
+
+    def __init__(self, name, documentation, label_names=(), callback=None):
+        super().__init__(name, documentation, label_names)
+        self.callback = callback
+
+    def set(self, value):
+        self.children[()].set(value)
+
+    def inc(self, amount=1.0):
+        self.children[()].inc(amount)
+
+    def dec(self, amount=1.0):
+        self.children[()].dec(amount)
+
+    @property
+    def value(self):
+        return self.children[()].value
+
+    def samples(self):
+        if self.callback is None:
+            for values, child in list(self.children.items()):
+                yield "", _format_labels(self.label_names, values), child.value
+            return
+
+        try:
+            result = self.callback()
+        except Exception as e:
+            logger.warning(f"Metric callback for {self.name} failed: {str(e)}")
+            return
+        if result is None:
+            return
+        if isinstance(result, dict):
+            for values, value in result.items():
+                if value is not None:
+                    yield "", _format_labels(self.label_names, values), value
+        else:
+            yield "", "", result
+
+class Histogram(Metric):
+    """Distribution of observations over fixed, preallocated buckets"""
+
+    type_name = "histogram"
+    child_class = _HistogramChild
+
+    def __init__(self, name, documentation, label_names=(), buckets=LATENCY_BUCKETS):
+        self.bounds = tuple(sorted(buckets))
+        super().__init__(name, documentation, label_names)
+
+    def _new_child(self):
+        return _HistogramChild(self.bounds)
+
+    def observe(self, value):
+        self.children[()].observe(value)
+
+    def samples(self):
+        for values, child in list(self.children.items()):
+            with child.lock:
+                counts = list(child.counts)
+                total = child.sum
+            cumulative = 0
+            for bound, count in zip(self.bounds + (math.inf,), counts):
+                cumulative += count
+                yield "_bucket", _format_labels(self.label_names, values, f'le="{_format_value(bound)}"'), cumulative
+            yield "_sum", _format_labels(self.label_names, values), total
+            yield "_count", _format_labels(self.label_names, values), cumulative
+
+class MetricsRegistry:
+    """In-process registry of metrics, rendered in the Prometheus text format"""
+
+    def __init__(self):
+        self.metrics = {}
+        self.lock = threading.Lock()
+
+    def _register(self, metric):
+        with self.lock:
+            existing = self.metrics.get(metric.name)
+            if existing is not None:
+                if type(existing) is not type(metric) or existing.label_names != metric.label_names:
+                    raise ValueError(f"Metric {metric.name} is already registered differently")
+                return existing
+            self.metrics[metric.name] = metric
+            return metric
+
+    def counter(self, name, documentation, label_names=()):
+        return self._register(Counter(name, documentation, label_names))
+
+    def gauge(self, name, documentation, label_names=(), callback=None):
+        return self._register(Gauge(name, documentation, label_names, callback))
+
+    def histogram(self, name, documentation, label_names=(), buckets=LATENCY_BUCKETS):
+        return self._register(Histogram(name, documentation, label_names, buckets))
+
+    def render(self):
+        """Render all metrics in the Prometheus text exposition format (0.0.4)"""
+        with self.lock:
+            metrics = list(self.metrics.values())
+        return "\n".join(metric.render() for metric in metrics) + "\n"
+
+# Shared registry - every module records into the same /metrics output
+metrics_registry = MetricsRegistry()
\ No newline at end of file
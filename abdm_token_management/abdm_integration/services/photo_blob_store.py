@@ -0,0 +1,93 @@
+# services/photo_blob_store.py
+import os
+import base64
+import hashlib
+import tempfile
+from config.logging_config import setup_logger
+
+# Configure logging
+logger = setup_logger('photo_blob_store')
+
+# Leading bytes of the image formats ABDM returns
+_IMAGE_SIGNATURES = (
+    (b"\xff\xd8\xff", "image/jpeg"),
+    (b"\x89PNG\r\n\x1a\n", "image/png"),
+    (b"GIF8", "image/gif"),
+)
+
+class PhotoBlobStore:
+    """
+    Content-addressed storage for decoded ABHA profile photos
+
+    Each photo is written once as binary, named by its SHA-256 digest and
+    fanned out into two-character subdirectories.
+    """
+
+    def __init__(self, root_dir):
+        """Initialize the blob store rooted at root_dir"""
+        self.logger = logger
+        self.root_dir = root_dir
+        os.makedirs(root_dir, exist_ok=True)
+
+    def path(self, digest):
+        """Get the file path for a digest (the file may not exist)"""
+        return os.path.join(self.root_dir, digest[:2], digest)
+
+    def exists(self, digest):
+        return os.path.exists(self.path(digest))
+
+    def put(self, data):
+        """
+        Store photo bytes
+
+        Returns:
+            The SHA-256 hex digest identifying the photo
+        """
+        digest = hashlib.sha256(data).hexdigest()
+        path = self.path(digest)
+        if os.path.exists(path):
+            return digest
+
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # Write to a temp file first so readers never see a partial blob
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path))
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+        except Exception:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+        self.logger.info(f"Stored photo blob {digest} ({len(data)} bytes)")
+        return digest
+
+    def put_base64(self, encoded):
+        """Decode and store a base64 photo, returning its digest"""
+        return self.put(base64.b64decode(encoded))
+
+    def get(self, digest):
+        """Get photo bytes, or None if the blob is missing"""
+        try:
+            with open(self.path(digest), 'rb') as f:
+                return f.read()
+        except FileNotFoundError:
+            return None
+
+    def get_base64(self, digest):
+        """Get the photo as base64 text, or None if the blob is missing"""
+        data = self.get(digest)
+        return base64.b64encode(data).decode('ascii') if data is not None else None
+
+    def content_type(self, digest):
+        """Guess the image media type from the blob's leading bytes"""
+        try:
+            with open(self.path(digest), 'rb') as f:
+                head = f.read(8)
+        except FileNotFoundError:
+            return None
+        for signature, media_type in _IMAGE_SIGNATURES:
+            if head.startswith(signature):
+                return media_type
+        return "application/octet-stream"
\ No newline at end of file
@@ -0,0 +1,73 @@
+# services/profile_export.py
+import json
+import zlib
+from datetime import datetime
+
+# Flush NDJSON output in chunks of roughly this many bytes
+EXPORT_CHUNK_BYTES = 64 * 1024
+
+# Top-level profile fields never exported; tokens holds the beneficiary's X-token and refresh token
+EXPORT_EXCLUDED_FIELDS = ("tokens",)
+
+def normalize_updated_since(value):
+    """
+    Parse an updated_since value into the naive local ISO format profiles are stored with
+
+    Raises:
+        ValueError: if the value is not an ISO 8601 date or datetime
+    """
+    if not value:
+        return None
+    parsed = datetime.fromisoformat(value.strip().replace("Z", "+00:00"))
+    if parsed.tzinfo is not None:
+        parsed = parsed.astimezone().replace(tzinfo=None)
+    return parsed.isoformat()
+
+def iter_profile_ndjson(profile_manager, updated_since=None, include_photo=False):
+    """
+    Stream stored profiles as NDJSON, one profile per line
+
+    Profiles are read from storage in batches and written out in chunks of
+    about EXPORT_CHUNK_BYTES, so memory use doesn't depend on the number of
+    profiles exported. EXPORT_EXCLUDED_FIELDS are left out of every profile.
+
+    Args:
+        profile_manager: The ABHAProfileManager to export from
+        updated_since: Only export profiles updated at or after this ISO timestamp
+        include_photo: Inline the base64 photo of each profile
+
+    Yields:
+        Chunks of UTF-8 encoded NDJSON
+    """
+    chunk = []
+    chunk_size = 0
+    for abha_number, record in profile_manager.store.iter_records(updated_since=normalize_updated_since(updated_since)):
+        profile = {key: value for key, value in record.get("profile", {}).items() if key not in EXPORT_EXCLUDED_FIELDS}
+        line = json.dumps(
+            {
+                "ABHANumber": abha_number,
+                "savedAt": record.get("savedAt"),
+                "updatedAt": record.get("updatedAt"),
+                "version": record.get("version", 1),
+                "profile": profile_manager.shape_profile(profile, include_photo=include_photo)
+            },
+            ensure_ascii=False,
+            separators=(",", ":")
+        ).encode("utf-8") + b"\n"
+        chunk.append(line)
+        chunk_size += len(line)
+        if chunk_size >= EXPORT_CHUNK_BYTES:
+            yield b"".join(chunk)
+            chunk = []
+            chunk_size = 0
+    if chunk:
+        yield b"".join(chunk)
+
+def gzip_chunks(chunks, level=6):
+    """Gzip a stream of byte chunks on the fly"""
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 31)  # wbits 31 = gzip container
+    for chunk in chunks:
+        compressed = compressor.compress(chunk)
+        if compressed:
+            yield compressed
+    yield compressor.flush()
\ No newline at end of file
@@ -0,0 +1,228 @@
+# services/profile_search_index.py
+import re
+import time
+import heapq
+import bisect
+import threading
+from config.logging_config import setup_logger
+
+# Configure logging
+logger = setup_logger('profile_search_index')
+
+# Fields searched by term prefix and by exact value
+PREFIX_FIELDS = ("name", "mobile", "phr_address")
+EXACT_FIELDS = ("district_code", "state_code")
+
+# Shortest prefix accepted per field; shorter ones match a large share of all profiles
+MIN_PREFIX_LENGTHS = {"name": 2, "mobile": 4, "phr_address": 3}
+
+_TOKEN_PATTERN = re.compile(r"[a-z0-9]+")
+
+def _name_terms(text):
+    return _TOKEN_PATTERN.findall(text.lower()) if text else []
+
+def check_prefix_lengths(name=None, mobile=None, phr_address=None):
+    """
+    Reject search prefixes shorter than MIN_PREFIX_LENGTHS
+
+    Raises:
+        ValueError: naming the field and its minimum length
+    """
+    prefixes = [("name", term) for term in _name_terms(name)]
+    if mobile:
+        prefixes.append(("mobile", mobile.strip()))
+    if phr_address:
+        prefixes.append(("phr_address", phr_address.strip()))
+    for field, prefix in prefixes:
+        if len(prefix) < MIN_PREFIX_LENGTHS[field]:
+            raise ValueError(f"{field} prefixes must be at least {MIN_PREFIX_LENGTHS[field]} characters")
+
+def profile_terms(profile):
+    """Extract the searchable terms of a profile per field"""
+    abha_profile = profile.get("ABHAProfile", {})
+    names = " ".join(abha_profile.get(key) or "" for key in ("firstName", "middleName", "lastName"))
+    return {
+        "name": set(_name_terms(names)),
+        "mobile": {abha_profile["mobile"]} if abha_profile.get("mobile") else set(),
+        "phr_address": {address.lower() for address in abha_profile.get("phrAddress") or []},
+        "district_code": {str(abha_profile["districtCode"])} if abha_profile.get("districtCode") else set(),
+        "state_code": {str(abha_profile["stateCode"])} if abha_profile.get("stateCode") else set()
+    }
+
+def profile_summary(abha_number, profile):
+    """The compact view of a profile returned by search"""
+    abha_profile = profile.get("ABHAProfile", {})
+    return {
+        "ABHANumber": abha_number,
+        "name": " ".join(abha_profile.get(key) for key in ("firstName", "middleName", "lastName") if abha_profile.get(key)),
+        "gender": abha_profile.get("gender"),
+        "dob": abha_profile.get("dob"),
+        "mobile": abha_profile.get("mobile"),
+        "phrAddress": abha_profile.get("phrAddress") or [],
+        "districtName": abha_profile.get("districtName"),
+        "stateName": abha_profile.get("stateName")
+    }
+
+class ProfileSearchIndex:
+    """
+    In-memory inverted indexes over stored ABHA profiles
+
+    Every field maps term -> set of ABHA numbers. Prefix fields also keep a
+    sorted term list so a prefix query is a bisect plus a short scan.
+    Search results are served from in-memory summaries without touching storage.
+    """
+
+    def __init__(self):
+        """Initialize an empty index"""
+        self.logger = logger
+        self.lock = threading.RLock()
+        self.postings = {field: {} for field in PREFIX_FIELDS + EXACT_FIELDS}
+        self.sorted_terms = {field: [] for field in PREFIX_FIELDS}
+        self.documents = {}  # ABHA number -> (terms per field, summary)
+
+    def build(self, records):
+        """
+        Build the index from (ABHA number, record) pairs, replacing its contents
+
+        Sorted term lists are built once at the end rather than per insert.
+        """
+        started = time.monotonic()
+        postings = {field: {} for field in PREFIX_FIELDS + EXACT_FIELDS}
+        documents = {}
+
+        for abha_number, record in records:
+            profile = record.get("profile", {})
+            terms = profile_terms(profile)
+            documents[abha_number] = (terms, profile_summary(abha_number, profile))
+            for field, field_terms in terms.items():
+                for term in field_terms:
+                    postings[field].setdefault(term, set()).add(abha_number)
+
+        with self.lock:
+            self.postings = postings
+            self.sorted_terms = {field: sorted(postings[field]) for field in PREFIX_FIELDS}
+            self.documents = documents
+
+        self.logger.info(f"Profile search index built: {len(documents)} profiles in {time.monotonic() - started:.2f}s")
+
+    def _add_term(self, field, term, abha_number):
+        abha_numbers = self.postings[field].get(term)
+        if abha_numbers is None:
+            abha_numbers = self.postings[field][term] = set()
+            if field in self.sorted_terms:
+                bisect.insort(self.sorted_terms[field], term)
+        abha_numbers.add(abha_number)
+
+    def _remove_term(self, field, term, abha_number):
+        abha_numbers = self.postings[field].get(term)
+        if abha_numbers is None:
+            return
+        abha_numbers.discard(abha_number)
+        if not abha_numbers:
+            del self.postings[field][term]
+            if field in self.sorted_terms:
+                terms = self.sorted_terms[field]
+                position = bisect.bisect_left(terms, term)
+                if position < len(terms) and terms[position] == term:
+                    del terms[position]
+
+    def index(self, abha_number, profile):
+        """Add or re-index a single profile, touching only the terms that changed"""
+        terms = profile_terms(profile)
+        with self.lock:
+            previous = self.documents.get(abha_number)
+            previous_terms = previous[0] if previous else {field: set() for field in terms}
+            for field, field_terms in terms.items():
+                for term in previous_terms[field] - field_terms:
+                    self._remove_term(field, term, abha_number)
+                for term in field_terms - previous_terms[field]:
+                    self._add_term(field, term, abha_number)
+            self.documents[abha_number] = (terms, profile_summary(abha_number, profile))
+
+    def remove(self, abha_number):
+        """Remove a profile from the index"""
+        with self.lock:
+            previous = self.documents.pop(abha_number, None)
+            if previous:
+                for field, field_terms in previous[0].items():
+                    for term in field_terms:
+                        self._remove_term(field, term, abha_number)
+
+    def _prefix_postings(self, field, prefix):
+        """Postings of every term starting with prefix, without merging them"""
+        terms = self.sorted_terms[field]
+        postings = []
+        position = bisect.bisect_left(terms, prefix)
+        while position < len(terms) and terms[position].startswith(prefix):
+            postings.append(self.postings[field][terms[position]])
+            position += 1
+        return postings
+
+    def search(self, name=None, mobile=None, phr_address=None, district_code=None, state_code=None,
+               offset=0, limit=20):
+        """
+        Search profiles; all given criteria must match
+
+        Args:
+            name: Name prefixes, e.g. "jay wank" matches "Jayesh Vilas Wankhede"
+            mobile: Mobile number or its leading digits
+            phr_address: PHR address or its prefix
+            district_code: Exact district code
+            state_code: Exact state code
+            offset: Number of results to skip
+            limit: Maximum number of results to return
+
+        Returns:
+            (total number of matches, page of profile summaries ordered by ABHA number)
+
+        Raises:
+            ValueError: if a prefix is shorter than MIN_PREFIX_LENGTHS allows
+
+        Blocks for as long as the smallest criterion has candidates; call it off the event loop.
+        """
+        check_prefix_lengths(name, mobile, phr_address)
+        with self.lock:
+            # Each criterion is a list of posting sets, any of which a match must be in
+            criteria = [self._prefix_postings("name", term) for term in _name_terms(name)]
+            if mobile:
+                criteria.append(self._prefix_postings("mobile", mobile.strip()))
+            if phr_address:
+                criteria.append(self._prefix_postings("phr_address", phr_address.strip().lower()))
+            if district_code:
+                criteria.append([self.postings["district_code"].get(str(district_code), set())])
+            if state_code:
+                criteria.append([self.postings["state_code"].get(str(state_code), set())])
+
+            if not criteria:
+                return 0, []
+
+            # Walk the candidates of the narrowest criterion and probe the others
+            sizes = [sum(map(len, postings)) for postings in criteria]
+            order = sorted(range(len(criteria)), key=sizes.__getitem__)
+            narrowest = criteria[order[0]]
+            candidates = sizes[order[0]]
+            others = []
+            for position in order[1:]:
+                postings = criteria[position]
+                # Probing every posting set per candidate can cost more than merging them once
+                if len(postings) > 1 and candidates * len(postings) > sizes[position]:
+                    postings = [set().union(*postings)]
+                others.append(postings)
+            matches = {
+                abha_number
+                for postings in narrowest
+                for abha_number in postings
+                if all(any(abha_number in members for members in criterion) for criterion in others)
+            }
+
+            # Only the requested page is ordered
+            page = heapq.nsmallest(offset + limit, matches)[offset:]
+            return len(matches), [self.documents[abha_number][1] for abha_number in page]
+
+    def stats(self):
+        """Get the number of indexed profiles and terms per field"""
+        with self.lock:
+            return {
+                "profiles": len(self.documents),
+                "terms": {field: len(postings) for field, postings in self.postings.items()}
+            }
\ No newline at end of file
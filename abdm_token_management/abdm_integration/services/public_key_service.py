@@ -3,9 +3,9 @@ import os
 import json
 import time
 import base64
-import requests
 import schedule
 import threading
+import weakref
 from datetime import datetime, timedelta
 from cryptography.hazmat.primitives.asymmetric import padding
 from cryptography.hazmat.primitives import hashes
@@ -13,11 +13,34 @@ from cryptography.hazmat.primitives.serialization import load_pem_public_key
 from cryptography.hazmat.backends import default_backend
 from config.settings import settings
 from config.logging_config import setup_logger
+from services.metrics import metrics_registry
+from services.http_client import abdm_session
+from services.request_timing import request_phase
+from services.memory_profiler import register_cache
 from utils.exceptions import PublicKeyError
 
 # Configure logging
 logger = setup_logger('public_key_service')
 
+PUBLIC_KEY_PATH = os.path.join(os.path.dirname(os.path.dirname(__file__)), "abdm_public_key.pem")
+
+encryption_duration = metrics_registry.histogram(
+    "abdm_encryption_duration_seconds", "RSA encryption latency with the ABDM public key, by outcome", ("outcome",),
+    buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 1.0)
+)
+public_key_fetches = metrics_registry.counter(
+    "abdm_public_key_fetches", "ABDM public key fetches by outcome", ("outcome",)
+)
+
+def _public_key_age():
+    return time.time() - os.path.getmtime(PUBLIC_KEY_PATH) if os.path.exists(PUBLIC_KEY_PATH) else None
+
+metrics_registry.gauge("abdm_public_key_age_seconds", "Seconds since the ABDM public key was saved", callback=_public_key_age)
+
+# Every manager instance holds its own copy of the key
+_instances = weakref.WeakSet()
+register_cache("public_keys", lambda: [manager.public_key for manager in list(_instances) if manager.public_key])
+
 class ABDMPublicKeyManager:
     """Manages fetching, caching, and using the ABDM public key for encryption"""
     
@@ -27,9 +50,12 @@ class ABDMPublicKeyManager:
         self.public_key = None
         self.last_fetched = None
         self.key_expires_at = None
-        self.key_path = os.path.join(os.path.dirname(os.path.dirname(__file__)), "abdm_public_key.pem")
+        self.key_path = PUBLIC_KEY_PATH
         self.is_refreshing = False
         self.refresh_lock = threading.Lock()
+        self.parsed_key = None  # (PEM, loaded key) so the PEM is only parsed when it changes
+        self.scheduler_stop = threading.Event()
+        _instances.add(self)
         
     def fetch_public_key(self):
         """Fetch the latest public key from ABDM API"""
@@ -50,10 +76,11 @@ class ABDMPublicKeyManager:
             headers = token_manager.get_headers()
             
             # Make API call to get public key
-            response = requests.get(
+            response = abdm_session.get(
                 settings.ABDM_PUBLIC_KEY_API,
                 headers=headers,
-                timeout=15
+                # The key is cached for everyone, not fetched for the request that happened to trigger it
+                timeout=settings.ABDM_TOKEN_TIMEOUT_SECONDS
             )
             
             if response.status_code != 200:
@@ -89,9 +116,11 @@ class ABDMPublicKeyManager:
             self.key_expires_at = datetime.now() + timedelta(days=180)
             
             self.logger.info("Public key fetched and saved successfully")
+            public_key_fetches.labels("success").inc()
             return public_key
             
         except Exception as e:
+            public_key_fetches.labels("failure").inc()
             self.logger.error(f"Error fetching public key: {str(e)}")
             raise PublicKeyError(f"Failed to fetch public key: {str(e)}", {"exception": str(e)})
         finally:
@@ -135,33 +164,44 @@ class ABDMPublicKeyManager:
         Returns:
             Base64 encoded encrypted data
         """
+        started = time.monotonic()
         try:
-            # Get current public key
-            pem_key = self.get_public_key()
+            with request_phase("key"):
+                # Get current public key
+                pem_key = self.get_public_key()
+                
+                # Load the public key, reusing the parsed key while the PEM is unchanged
+                parsed_key = self.parsed_key
+                if parsed_key is not None and parsed_key[0] == pem_key:
+                    public_key = parsed_key[1]
+                else:
+                    public_key = load_pem_public_key(
+                        pem_key.encode('utf-8'),
+                        backend=default_backend()
+                    )
+                    self.parsed_key = (pem_key, public_key)
             
             # Convert string to bytes
             data_bytes = data_str.encode('utf-8')
             
-            # Load the public key
-            public_key = load_pem_public_key(
-                pem_key.encode('utf-8'),
-                backend=default_backend()
-            )
-            
             # Encrypt using RSA with OAEP padding
-            encrypted_data = public_key.encrypt(
-                data_bytes,
-                padding.OAEP(
-                    mgf=padding.MGF1(algorithm=hashes.SHA1()),
-                    algorithm=hashes.SHA1(),
-                    label=None
+            with request_phase("encrypt"):
+                encrypted_data = public_key.encrypt(
+                    data_bytes,
+                    padding.OAEP(
+                        mgf=padding.MGF1(algorithm=hashes.SHA1()),
+                        algorithm=hashes.SHA1(),
+                        label=None
+                    )
                 )
-            )
+            
+            encryption_duration.labels("success").observe(time.monotonic() - started)
             
             # Return base64 encoded result
             return base64.b64encode(encrypted_data).decode('utf-8')
             
         except Exception as e:
+            encryption_duration.labels("failure").observe(time.monotonic() - started)
             self.logger.error(f"Error encrypting data: {str(e)}")
             raise PublicKeyError(f"Failed to encrypt data: {str(e)}", {"exception": str(e)})
             
@@ -192,8 +232,18 @@ class ABDMPublicKeyManager:
         def run_scheduler():
             while True:
                 schedule.run_pending()
-                time.sleep(3600)  # Check every hour
+                if self.scheduler_stop.wait(3600):  # Check every hour
+                    break
                 
-        scheduler_thread = threading.Thread(target=run_scheduler, daemon=True)
+        scheduler_thread = threading.Thread(target=run_scheduler, name="public-key-scheduler", daemon=True)
         scheduler_thread.start()
-        self.logger.info("Public key refresh scheduler started")
\ No newline at end of file
+        self.logger.info("Public key refresh scheduler started")
+
+    def stop_key_refresh_scheduler(self):
+        """Stop the key refresh scheduler thread"""
+        self.scheduler_stop.set()
+
+def preload_public_keys():
+    """Load the key into every manager instance; the first fetches it if it is not on disk yet"""
+    for manager in list(_instances):
+        manager.get_public_key()
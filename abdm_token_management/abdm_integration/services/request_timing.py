@@ -0,0 +1,93 @@
+# services/request_timing.py
+import time
+import contextvars
+
+# Phase name -> [total seconds, count] for the request being handled, or None outside requests
+_request_phases = contextvars.ContextVar("request_phases", default=None)
+
+# Descriptions shown next to the Server-Timing entries
+PHASE_DESCRIPTIONS = {
+    "token": "Gateway token lookup",
+    "headers": "ABDM header preparation",
+    "key": "Public key load",
+    "encrypt": "RSA encryption",
+    "upstream": "ABDM API wait",
+    "persist": "Profile persistence",
+    "app": "Total handler time"
+}
+
+def start_request_timing():
+    """
+    Start collecting phase timings for the current request
+
+    The dict is shared by reference with tasks and threadpool workers that
+    copy the context, so phases timed there are collected too.
+
+    Returns:
+        A token to pass to finish_request_timing
+    """
+    return _request_phases.set({})
+
+def finish_request_timing(token):
+    """Stop collecting phase timings and return them as name -> (seconds, count)"""
+    phases = _request_phases.get()
+    _request_phases.reset(token)
+    return {name: (entry[0], entry[1]) for name, entry in (phases or {}).items()}
+
+def snapshot_request_timing():
+    """Get the phase timings recorded so far for the current request"""
+    phases = _request_phases.get()
+    return {name: (entry[0], entry[1]) for name, entry in (phases or {}).items()}
+
+def record_phase(name, seconds):
+    """Add a duration to a phase of the current request; a no-op outside requests"""
+    phases = _request_phases.get()
+    if phases is None:
+        return
+    entry = phases.get(name)
+    if entry is None:
+        phases[name] = [seconds, 1]
+    else:
+        entry[0] += seconds
+        entry[1] += 1
+
+class _Phase:
+    __slots__ = ("name", "started")
+
+    def __init__(self, name):
+        self.name = name
+        self.started = 0.0
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, traceback):
+        record_phase(self.name, time.perf_counter() - self.started)
+        return False
+
+def request_phase(name):
+    """
+    Time a block of code as a phase of the current request
+
+    Phases may nest (e.g. token inside headers); repeated phases add up.
+
+    Example:
+        with request_phase("encrypt"):
+            encrypted = public_key.encrypt(...)
+    """
+    return _Phase(name)
+
+def format_server_timing(phases):
+    """Format phase timings as a Server-Timing header value (durations in ms)"""
+    entries = []
+    for name, (seconds, count) in phases.items():
+        description = PHASE_DESCRIPTIONS.get(name, name)
+        if count > 1:
+            description = f"{description} x{count}"
+        entries.append(f'{name};dur={seconds * 1000:.1f};desc="{description}"')
+    return ", ".join(entries)
+
+def format_phase_summary(phases):
+    """Compact phase summary for the access log, e.g. token=1.2ms,upstream=812.0ms"""
+    return ",".join(f"{name}={seconds * 1000:.1f}ms" for name, (seconds, count) in phases.items())
\ No newline at end of file
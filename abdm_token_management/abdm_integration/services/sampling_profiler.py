@@ -0,0 +1,117 @@
+# services/sampling_profiler.py
+import re
+import sys
+import time
+import threading
+from collections import Counter
+from config.logging_config import setup_logger
+
+# Configure logging
+logger = setup_logger('sampling_profiler')
+
+def _frame_label(frame):
+    code = frame.f_code
+    return f"{frame.f_globals.get('__name__', '?')}:{getattr(code, 'co_qualname', code.co_name)}"
+
+class SamplingProfiler:
+    """
+    Statistical profiler that samples the stacks of every thread
+
+    Each sample reads sys._current_frames() from a separate thread, so the
+    profiled code runs unmodified; the cost is one stack walk per thread
+    per interval. Results are collapsed stacks ("thread;outer;...;inner count"),
+    the input format of flamegraph.pl and speedscope.
+    """
+
+    def __init__(self, interval=0.005, route_pattern=None, request_frame_codes=None):
+        """
+        Args:
+            interval: Seconds between samples
+            route_pattern: Optional regex; only stacks handling a matching "METHOD /path" are kept
+            request_frame_codes: Code objects of request middleware frames, used to find the route of a stack
+        """
+        self.logger = logger
+        self.interval = interval
+        self.route_pattern = re.compile(route_pattern) if route_pattern else None
+        self.request_frame_codes = request_frame_codes or set()
+        self.samples = 0
+
+    def _route_of(self, frame):
+        """The "METHOD /path" of the request a stack is handling, or None"""
+        while frame is not None:
+            if frame.f_code in self.request_frame_codes:
+                frame_locals = frame.f_locals
+                route = frame_locals.get("scope", {}).get("route")
+                path = route.path if route is not None else frame_locals.get("path")
+                return f"{frame_locals.get('method')} {path}"
+            frame = frame.f_back
+        return None
+
+    def run(self, seconds):
+        """
+        Sample all threads for the given number of seconds; blocks the calling thread
+
+        Returns:
+            Counter of collapsed stack -> sample count
+        """
+        stacks = Counter()
+        own_thread = threading.get_ident()
+        deadline = time.monotonic() + seconds
+        next_sample = time.monotonic()
+
+        while True:
+            now = time.monotonic()
+            if now >= deadline:
+                break
+            if now < next_sample:
+                time.sleep(next_sample - now)
+            next_sample += self.interval
+
+            thread_names = {thread.ident: thread.name for thread in threading.enumerate()}
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own_thread:
+                    continue
+                if self.route_pattern is not None:
+                    route = self._route_of(frame)
+                    if route is None or not self.route_pattern.search(route):
+                        continue
+
+                labels = []
+                while frame is not None:
+                    labels.append(_frame_label(frame))
+                    frame = frame.f_back
+                labels.append(thread_names.get(thread_id, f"thread-{thread_id}"))
+                labels.reverse()
+                stacks[";".join(labels)] += 1
+            self.samples += 1
+
+        return stacks
+
+def format_collapsed(stacks):
+    """Render collapsed stacks, one "stack count" line each"""
+    return "".join(f"{stack} {count}\n" for stack, count in stacks.most_common())
+
+def summarize_stacks(stacks, top=25):
+    """
+    Summarize collapsed stacks into the hottest functions
+
+    Returns:
+        Top functions by self samples (innermost frame) and by total samples (anywhere on the stack)
+    """
+    self_samples = Counter()
+    total_samples = Counter()
+    for stack, count in stacks.items():
+        frames = stack.split(";")[1:]  # drop the thread name
+        if not frames:
+            continue
+        self_samples[frames[-1]] += count
+        for frame in set(frames):
+            total_samples[frame] += count
+    return {
+        "samples": sum(stacks.values()),
+        "top_self": [{"function": name, "samples": count} for name, count in self_samples.most_common(top)],
+        "top_total": [{"function": name, "samples": count} for name, count in total_samples.most_common(top)]
+    }
+
+# Only one profile at a time per process
+profiler_lock = threading.Lock()
\ No newline at end of file
@@ -3,14 +3,43 @@
 import os
 import json
 import time
+import tempfile
+import threading
 import requests
 import asyncio
+from contextlib import contextmanager
 from datetime import datetime
 
 from config.settings import settings
-from config.logging_config import setup_logger
+from config.logging_config import setup_logger, outbound_request_id
+from services.metrics import metrics_registry
+from services.http_client import abdm_session
+from services.request_timing import request_phase
 from utils.exceptions import TokenNotFoundError, TokenRefreshError, TokenCreationError, ABDMApiError
 
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+token_refreshes = metrics_registry.counter(
+    "abdm_token_refreshes", "Gateway token refreshes by kind (refresh/fetch) and outcome", ("kind", "outcome")
+)
+token_refresh_duration = metrics_registry.histogram(
+    "abdm_token_refresh_duration_seconds", "Gateway token refresh latency by kind", ("kind",)
+)
+token_expiry_timestamp = metrics_registry.gauge(
+    "abdm_token_expiry_timestamp_seconds", "Unix time at which the current gateway token expires"
+)
+metrics_registry.gauge(
+    "abdm_token_time_to_expiry_seconds", "Seconds until the current gateway token expires",
+    callback=lambda: token_expiry_timestamp.value - time.time() if token_expiry_timestamp.value else None
+)
+
+def _record_refresh(kind, outcome, started):
+    token_refreshes.labels(kind, outcome).inc()
+    token_refresh_duration.labels(kind).observe(time.monotonic() - started)
+
 class ABDMTokenManager:
     """Class to manage ABDM authentication tokens with automatic renewal"""
     
@@ -18,10 +47,11 @@ class ABDMTokenManager:
         """Initialize the token manager"""
         self.logger = setup_logger('token_manager')
         self.refresh_task = None
+        self.refresh_lock = threading.Lock()
         self.logger.info("ABDMTokenManager initialized")
     
-    def is_token_expired_or_expiring_soon(self, token_data):
-        """Check if token is expired or about to expire"""
+    def is_token_expired_or_expiring_soon(self, token_data, log=True):
+        """Check if token is expired or about to expire (log=False skips the expiry log line)"""
         try:
             # Get current time in seconds since epoch
             current_time = int(time.time())
@@ -30,14 +60,16 @@ class ABDMTokenManager:
             created_at = token_data.get("fetch_time", current_time)
             expires_in = token_data.get("expiresIn", 1200)  # Default 20 min if not specified
             expiry_time = created_at + expires_in
+            token_expiry_timestamp.set(expiry_time)
             
             # Check if token is expired or about to expire within buffer time
             if current_time + settings.TOKEN_REFRESH_BUFFER_SECONDS >= expiry_time:
                 time_left = max(0, expiry_time - current_time)
-                self.logger.info(f"Token expired or expiring soon. Time left: {time_left} seconds")
+                if log:
+                    self.logger.info(f"Token expired or expiring soon. Time left: {time_left} seconds")
                 return True
                 
-            self.logger.info(f"Token valid for {expiry_time - current_time} seconds")
+            self.logger.debug(f"Token valid for {expiry_time - current_time} seconds")
             return False
             
         except Exception as e:
@@ -47,8 +79,8 @@ class ABDMTokenManager:
 
     def refresh_token(self, refresh_token, client_id):
         """Refresh an access token using refresh token with proper headers"""
+        started = time.monotonic()
         try:
-            import uuid
             from datetime import datetime
             
             self.logger.info(f"Refreshing token for {client_id}")
@@ -56,7 +88,7 @@ class ABDMTokenManager:
             # Set up headers exactly as shown in Postman
             headers = {
                 'Content-Type': 'application/json',
-                'REQUEST-ID': str(uuid.uuid4()),  # Generate a new UUID for each request
+                'REQUEST-ID': outbound_request_id(),  # Inbound request ID or a new UUID
                 'TIMESTAMP': datetime.utcnow().strftime('%Y-%m-%dT%H:%M:%S.%fZ'),
                 'X-CM-ID': 'sbx',
                 'Accept': '*/*',
@@ -69,17 +101,19 @@ class ABDMTokenManager:
                 'grantType': 'refresh_token'
             }
             
-            response = requests.post(
+            response = abdm_session.post(
                 settings.ABDM_SESSION_API,
                 headers=headers,
                 json=payload,
-                timeout=15
+                # Every worker and request uses the refreshed token, so the caller's deadline does not apply
+                timeout=settings.ABDM_TOKEN_TIMEOUT_SECONDS
             )
             
             if response.status_code == 200:
                 token_data = response.json()
                 token_data["fetch_time"] = int(time.time())  # Add fetch time
                 self.logger.info(f"Token refreshed successfully for {client_id}")
+                _record_refresh("refresh", "success", started)
                 return token_data
             else:
                 error_msg = f"Failed to refresh token: {response.status_code} - {response.text}"
@@ -87,18 +121,20 @@ class ABDMTokenManager:
                 raise TokenRefreshError(error_msg, {"status_code": response.status_code})
                 
         except requests.exceptions.RequestException as e:
+            _record_refresh("refresh", "failure", started)
             error_msg = f"Network error while refreshing token: {str(e)}"
             self.logger.error(error_msg)
             raise TokenRefreshError(error_msg, {"exception": str(e)})
         except Exception as e:
+            _record_refresh("refresh", "failure", started)
             error_msg = f"Unexpected error refreshing token: {str(e)}"
             self.logger.error(error_msg)
             raise TokenRefreshError(error_msg, {"exception": str(e)})
 
     def fetch_new_token(self, client_id, client_secret):
         """Fetch a completely new token with proper headers matching ABDM API requirements"""
+        started = time.monotonic()
         try:
-            import uuid
             from datetime import datetime
             
             self.logger.info(f"Fetching new token for {client_id}")
@@ -106,7 +142,7 @@ class ABDMTokenManager:
             # Set up headers exactly as shown in Postman
             headers = {
                 'Content-Type': 'application/json',
-                'REQUEST-ID': str(uuid.uuid4()),  # Generate a new UUID for each request
+                'REQUEST-ID': outbound_request_id(),  # Inbound request ID or a new UUID
                 'TIMESTAMP': datetime.utcnow().strftime('%Y-%m-%dT%H:%M:%S.%fZ'),
                 'X-CM-ID': 'sbx',
                 'Accept': '*/*',
@@ -122,11 +158,12 @@ class ABDMTokenManager:
             
             self.logger.debug(f"Sending token request with headers: {headers}")
             
-            response = requests.post(
+            response = abdm_session.post(
                 settings.ABDM_SESSION_API,
                 headers=headers,
                 json=payload,
-                timeout=15
+                # Full timeout, as in refresh_token
+                timeout=settings.ABDM_TOKEN_TIMEOUT_SECONDS
             )
             
             if response.status_code == 200:
@@ -134,6 +171,7 @@ class ABDMTokenManager:
                 # Add fetch time to help calculate expiry
                 token_data["fetch_time"] = int(time.time())
                 self.logger.info(f"New token fetched successfully for {client_id}")
+                _record_refresh("fetch", "success", started)
                 return token_data
             else:
                 error_msg = f"Failed to fetch token: {response.status_code} - {response.text}"
@@ -141,16 +179,22 @@ class ABDMTokenManager:
                 raise TokenCreationError(error_msg, {"status_code": response.status_code})
                 
         except requests.exceptions.RequestException as e:
+            _record_refresh("fetch", "failure", started)
             error_msg = f"Network error while fetching token: {str(e)}"
             self.logger.error(error_msg)
             raise TokenCreationError(error_msg, {"exception": str(e)})
         except Exception as e:
+            _record_refresh("fetch", "failure", started)
             error_msg = f"Unexpected error fetching token: {str(e)}"
             self.logger.error(error_msg)
             raise TokenCreationError(error_msg, {"exception": str(e)})
 
     def get_valid_token(self):
         """Get a valid token, refreshing if needed"""
+        with request_phase("token"):
+            return self._load_valid_token()
+
+    def _load_valid_token(self):
         try:
             if not os.path.exists(settings.TOKEN_FILE_PATH):
                 error_msg = f"Token file not found: {settings.TOKEN_FILE_PATH}"
@@ -158,58 +202,17 @@ class ABDMTokenManager:
                 raise TokenNotFoundError(error_msg)
                 
             # Load current saved data
-            with open(settings.TOKEN_FILE_PATH, 'r') as f:
-                saved_data = json.load(f)
-                
-            token_data = saved_data["token_data"]
-            client_id = saved_data["client_id"]
-            
+            saved_data = self._read_token_file()
+
             # Check if token is about to expire
-            if self.is_token_expired_or_expiring_soon(token_data):
-                self.logger.info("Token needs refresh")
-                
-                # Try to use refresh token if available
-                if "refreshToken" in token_data and token_data["refreshToken"]:
-                    self.logger.info("Attempting to use refresh token")
-                    try:
-                        new_token_data = self.refresh_token(token_data["refreshToken"], client_id)
-                        
-                        # If refresh succeeded, update saved data
-                        if new_token_data:
-                            saved_data["token_data"] = new_token_data
-                            saved_data["refreshed_at"] = datetime.now().isoformat()
-                            
-                            with open(settings.TOKEN_FILE_PATH, 'w') as f:
-                                json.dump(saved_data, f, indent=2)
-                                
-                            self.logger.info("Token refreshed and saved")
-                            return saved_data
-                    except TokenRefreshError:
-                        self.logger.warning("Refresh token failed, trying client credentials")
-                    
-                # If we don't have a refresh token or refresh failed,
-                # we need client_secret to get a completely new token
-                if "client_secret" in saved_data:
-                    self.logger.info("Getting completely new token")
-                    client_secret = saved_data["client_secret"]
-                    
-                    new_token_data = self.fetch_new_token(client_id, client_secret)
-                    if new_token_data:
-                        # Update saved data with new token
-                        saved_data["token_data"] = new_token_data
-                        saved_data["refreshed_at"] = datetime.now().isoformat()
-                        
-                        # Save updated data
-                        with open(settings.TOKEN_FILE_PATH, 'w') as f:
-                            json.dump(saved_data, f, indent=2)
-                            
-                        self.logger.info("New token fetched and saved")
-                        return saved_data
-                else:
-                    error_msg = "Token expired and client_secret not available for renewal"
-                    self.logger.error(error_msg)
-                    raise TokenRefreshError(error_msg)
-            
+            if self.is_token_expired_or_expiring_soon(saved_data["token_data"]):
+                with self._refresh_lock():
+                    # Another thread or worker may have refreshed it while this one waited
+                    saved_data = self._read_token_file()
+                    if self.is_token_expired_or_expiring_soon(saved_data["token_data"], log=False):
+                        return self._renew_token(saved_data)
+                    self.logger.info("Token was refreshed by another worker")
+
             # Token is still valid
             return saved_data
             
@@ -221,6 +224,95 @@ class ABDMTokenManager:
             self.logger.error(error_msg)
             raise TokenRefreshError(error_msg, {"exception": str(e)})
 
+    def _renew_token(self, saved_data):
+        """Refresh or re-fetch an expiring token and save it (caller holds the refresh lock)"""
+        token_data = saved_data["token_data"]
+        client_id = saved_data["client_id"]
+
+        self.logger.info("Token needs refresh")
+        
+        # Try to use refresh token if available
+        if "refreshToken" in token_data and token_data["refreshToken"]:
+            self.logger.info("Attempting to use refresh token")
+            try:
+                new_token_data = self.refresh_token(token_data["refreshToken"], client_id)
+                
+                # If refresh succeeded, update saved data
+                if new_token_data:
+                    saved_data["token_data"] = new_token_data
+                    saved_data["refreshed_at"] = datetime.now().isoformat()
+                    
+                    self._write_token_file(saved_data)
+                    
+                    self.logger.info("Token refreshed and saved")
+                    return saved_data
+            except TokenRefreshError:
+                self.logger.warning("Refresh token failed, trying client credentials")
+            
+        # If we don't have a refresh token or refresh failed,
+        # we need client_secret to get a completely new token
+        if "client_secret" in saved_data:
+            self.logger.info("Getting completely new token")
+            client_secret = saved_data["client_secret"]
+            
+            new_token_data = self.fetch_new_token(client_id, client_secret)
+            if new_token_data:
+                # Update saved data with new token
+                saved_data["token_data"] = new_token_data
+                saved_data["refreshed_at"] = datetime.now().isoformat()
+                
+                # Save updated data
+                self._write_token_file(saved_data)
+                    
+                self.logger.info("New token fetched and saved")
+                return saved_data
+        else:
+            error_msg = "Token expired and client_secret not available for renewal"
+            self.logger.error(error_msg)
+            raise TokenRefreshError(error_msg)
+
+        return saved_data
+
+    def _read_token_file(self):
+        with open(settings.TOKEN_FILE_PATH, 'r') as f:
+            return json.load(f)
+
+    def _write_token_file(self, saved_data):
+        """Replace the token file atomically, so no worker ever reads a partly written file"""
+        directory = os.path.dirname(os.path.abspath(settings.TOKEN_FILE_PATH))
+        fd, temp_path = tempfile.mkstemp(dir=directory, prefix=".abdm_token.", suffix=".tmp")
+        try:
+            with os.fdopen(fd, 'w') as f:
+                json.dump(saved_data, f, indent=2)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(temp_path, settings.TOKEN_FILE_PATH)
+        except BaseException:
+            try:
+                os.remove(temp_path)
+            except OSError:
+                pass
+            raise
+
+    @contextmanager
+    def _refresh_lock(self):
+        """
+        Hold the token refresh lock; blocks while another thread or worker refreshes
+
+        The flock is shared by every worker process, so an expiring token is
+        refreshed once and the other workers re-read the file it was saved to.
+        """
+        with self.refresh_lock:
+            if fcntl is None:
+                yield
+                return
+            with open(settings.TOKEN_REFRESH_LOCK_FILE, "a") as lock_file:
+                fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX)
+                try:
+                    yield
+                finally:
+                    fcntl.flock(lock_file.fileno(), fcntl.LOCK_UN)
+
     def create_token(self, client_id, client_secret):
         """Create a new token, replacing any existing token"""
         try:
@@ -237,8 +329,8 @@ class ABDMTokenManager:
                 "client_secret": client_secret  # Store for automatic renewal
             }
             
-            with open(settings.TOKEN_FILE_PATH, 'w') as f:
-                json.dump(save_data, f, indent=2)
+            with self._refresh_lock():
+                self._write_token_file(save_data)
                 
             self.logger.info(f"Token saved to {settings.TOKEN_FILE_PATH}")
             
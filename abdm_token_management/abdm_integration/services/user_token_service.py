@@ -0,0 +1,179 @@
+# services/user_token_service.py
+import json
+import time
+import base64
+import asyncio
+from datetime import datetime
+from starlette.concurrency import run_in_threadpool
+from config.settings import settings
+from config.logging_config import setup_logger, outbound_request_id
+from services.metrics import metrics_registry
+from services.http_client import abdm_session
+from services.memory_profiler import register_cache
+from utils.exceptions import UserTokenError
+
+# Configure logging
+logger = setup_logger('user_token_service')
+
+def _jwt_expiry(token):
+    """Read the exp claim from a JWT without verifying it, or None if unavailable"""
+    try:
+        payload = token.split(".")[1]
+        payload += "=" * (-len(payload) % 4)
+        return int(json.loads(base64.urlsafe_b64decode(payload))["exp"])
+    except Exception:
+        return None
+
+class ABHAUserTokenCache:
+    """
+    Caches per-user X-tokens (keyed by ABHA number) from enrollment responses,
+    tracks their expiry and refreshes them with the refresh token when needed
+    """
+
+    def __init__(self):
+        """Initialize the user token cache"""
+        self.logger = logger
+        self.tokens = {}      # ABHANumber -> token entry
+        self.refreshing = {}  # ABHANumber -> asyncio.Future of the in-flight refresh
+
+    def store(self, abha_number, tokens, received_at=None):
+        """
+        Store a tokens block ({token, expiresIn, refreshToken, refreshExpiresIn})
+
+        Expiry is taken from the JWT exp claim when present, otherwise from
+        received_at + expiresIn.
+        """
+        received_at = int(received_at or time.time())
+        token = tokens.get("token") or tokens.get("accessToken")
+        if not token:
+            return False
+
+        refresh_token = tokens.get("refreshToken") or self.tokens.get(abha_number, {}).get("refreshToken")
+        self.tokens[abha_number] = {
+            "token": token,
+            "expires_at": _jwt_expiry(token) or received_at + int(tokens.get("expiresIn", 1800)),
+            "refreshToken": refresh_token,
+            "refresh_expires_at": (
+                _jwt_expiry(refresh_token) or received_at + int(tokens.get("refreshExpiresIn", 0))
+            ) if refresh_token else 0
+        }
+        return True
+
+    def store_from_enrollment(self, enrollment_data):
+        """
+        Cache the X-token from an enrollment response
+
+        Returns:
+            The ABHA number the token was stored for, or None
+        """
+        abha_number = enrollment_data.get("ABHAProfile", {}).get("ABHANumber")
+        tokens = enrollment_data.get("tokens")
+        if not abha_number or not tokens:
+            return None
+
+        if self.store(abha_number, tokens):
+            self.logger.info(f"X-token cached for {abha_number}")
+            return abha_number
+        return None
+
+    def invalidate(self, abha_number):
+        """Mark the X-token as expired (e.g. after a 401) while keeping the refresh token"""
+        entry = self.tokens.get(abha_number)
+        if entry:
+            entry["expires_at"] = 0
+
+    def _load_from_profile(self, abha_number):
+        """Prime the cache from the tokens block kept with the stored ABHA profile"""
+        from services.abha_profile_service import ABHAProfileManager
+
+        profile = ABHAProfileManager().get_profile(abha_number, include_photo=False)
+        if profile:
+            self.store_from_enrollment(profile)
+        return self.tokens.get(abha_number)
+
+    def _is_expiring(self, expires_at):
+        return time.time() + settings.USER_TOKEN_REFRESH_BUFFER_SECONDS >= expires_at
+
+    async def get_x_token(self, abha_number):
+        """
+        Get a valid X-token for the ABHA number, refreshing it if needed
+
+        Concurrent callers for the same ABHA number share a single refresh.
+
+        Raises:
+            UserTokenError: if no token is known or it cannot be refreshed
+        """
+        entry = self.tokens.get(abha_number)
+        if not entry:
+            # A cache miss reads the profile database; keep it off the event loop
+            entry = await run_in_threadpool(self._load_from_profile, abha_number)
+        if not entry:
+            raise UserTokenError(f"No X-token cached for ABHA number {abha_number}")
+
+        if not self._is_expiring(entry["expires_at"]):
+            return entry["token"]
+
+        future = self.refreshing.get(abha_number)
+        if future is None:
+            future = asyncio.ensure_future(self._refresh(abha_number, entry))
+            self.refreshing[abha_number] = future
+            future.add_done_callback(lambda _: self.refreshing.pop(abha_number, None))
+
+        # Shield so a cancelled caller doesn't abort the refresh for everyone else
+        return await asyncio.shield(future)
+
+    async def _refresh(self, abha_number, entry):
+        """Refresh the X-token off the event loop and update the cache"""
+        refresh_token = entry.get("refreshToken")
+        if not refresh_token or time.time() >= entry.get("refresh_expires_at", 0):
+            raise UserTokenError(
+                f"X-token expired for ABHA number {abha_number} and no valid refresh token is available"
+            )
+
+        loop = asyncio.get_running_loop()
+        tokens = await loop.run_in_executor(None, self.refresh_x_token, abha_number, refresh_token)
+        self.store(abha_number, tokens)
+        return self.tokens[abha_number]["token"]
+
+    def refresh_x_token(self, abha_number, refresh_token):
+        """Exchange a refresh token for a new X-token"""
+        from services.token_manager import ABDMTokenManager
+
+        try:
+            self.logger.info(f"Refreshing X-token for {abha_number}")
+
+            headers = ABDMTokenManager().get_headers()
+            headers["REQUEST-ID"] = outbound_request_id()
+            headers["TIMESTAMP"] = datetime.utcnow().isoformat(timespec='milliseconds') + 'Z'
+
+            response = abdm_session.post(
+                settings.ABDM_USER_TOKEN_REFRESH_API,
+                headers=headers,
+                json={"refreshToken": refresh_token, "grantType": "refresh_token"},
+                # Every request for this ABHA number waits on the same refresh
+                timeout=settings.ABDM_TOKEN_TIMEOUT_SECONDS
+            )
+
+            if response.status_code != 200:
+                raise UserTokenError(
+                    f"Failed to refresh X-token: {response.status_code} - {response.text[:200]}",
+                    {"status_code": response.status_code}
+                )
+
+            self.logger.info(f"X-token refreshed for {abha_number}")
+            return response.json()
+
+        except UserTokenError:
+            raise
+        except Exception as e:
+            self.logger.error(f"Error refreshing X-token for {abha_number}: {str(e)}")
+            raise UserTokenError(f"Failed to refresh X-token: {str(e)}", {"exception": str(e)})
+
+# Shared cache - populated by enrollment and read by the profile routes
+user_token_cache = ABHAUserTokenCache()
+
+metrics_registry.gauge(
+    "abha_user_token_cache_entries", "ABHA numbers with a cached X-token",
+    callback=lambda: len(user_token_cache.tokens)
+)
+register_cache("user_tokens", lambda: user_token_cache.tokens)
\ No newline at end of file
@@ -0,0 +1,88 @@
+# services/warmup.py
+import time
+import asyncio
+from collections import OrderedDict
+from config.settings import settings
+from config.logging_config import setup_logger
+from services.http_client import abdm_origins, warm_connections
+
+# Configure logging
+logger = setup_logger('warmup')
+
+class ReadinessState:
+    """
+    Startup warm-up progress of this worker
+
+    The worker reports ready once every warm-up step has finished. A failed
+    step is recorded but does not hold readiness back; a missing token, for
+    example, can only be fixed through the API itself.
+    """
+
+    def __init__(self):
+        self.started_at = time.time()
+        self.ready_at = None
+        self.steps = OrderedDict()  # step name -> {"status", "seconds", "error"}
+        self.task = None
+
+    @property
+    def ready(self):
+        return self.ready_at is not None
+
+    def snapshot(self):
+        return {
+            "ready": self.ready,
+            "started_at": self.started_at,
+            "seconds_to_ready": round(self.ready_at - self.started_at, 3) if self.ready else None,
+            "steps": {name: dict(step) for name, step in self.steps.items()}
+        }
+
+async def _run_step(name, func, *args):
+    """Run one blocking warm-up step in the threadpool and record its outcome"""
+    readiness.steps[name] = {"status": "running", "seconds": None, "error": None}
+    started = time.monotonic()
+    try:
+        await asyncio.wait_for(
+            asyncio.get_running_loop().run_in_executor(None, func, *args),
+            timeout=settings.WARMUP_TIMEOUT_SECONDS
+        )
+        readiness.steps[name].update(status="done")
+    except asyncio.TimeoutError:
+        readiness.steps[name].update(status="timeout", error=f"Still running after {settings.WARMUP_TIMEOUT_SECONDS}s")
+        logger.warning(f"Warm-up step {name} timed out; continuing in the background")
+    except Exception as e:
+        readiness.steps[name].update(status="failed", error=str(e))
+        logger.error(f"Warm-up step {name} failed: {str(e)}")
+    readiness.steps[name]["seconds"] = round(time.monotonic() - started, 3)
+
+async def warm_up(steps):
+    """
+    Run the warm-up steps concurrently, then mark the worker ready
+
+    Args:
+        steps: Dict of step name -> blocking callable
+    """
+    logger.info(f"Warming up: {', '.join(steps)}")
+    await asyncio.gather(*(_run_step(name, func) for name, func in steps.items()))
+    readiness.ready_at = time.time()
+    logger.info(f"Worker ready after {readiness.ready_at - readiness.started_at:.2f}s")
+
+def start_warm_up(token_manager, public_key_loader, search_index_loader, cache_loader=None):
+    """Start warm-up in the background so the server accepts connections immediately"""
+    steps = OrderedDict([
+        ("token", token_manager.get_valid_token),
+        ("public_key", public_key_loader),
+        ("search_index", search_index_loader),
+    ])
+    if cache_loader is not None:
+        steps["cache_snapshot"] = cache_loader
+    if settings.WARMUP_CONNECTIONS_PER_HOST > 0:
+        steps["connections"] = lambda: warm_connections(
+            abdm_origins(),
+            per_host=settings.WARMUP_CONNECTIONS_PER_HOST,
+            timeout=settings.WARMUP_TIMEOUT_SECONDS
+        )
+    readiness.task = asyncio.create_task(warm_up(steps))
+    return readiness.task
+
+# Shared readiness state - one per worker process
+readiness = ReadinessState()
@@ -0,0 +1,76 @@
+# tests/test_abha_profile_store.py - Unit tests for profile versions across store connections
+#
+# Run from the abdm_integration directory:
+#     python -m unittest discover -s tests -t .
+
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+from services.abha_profile_store import ABHAProfileStore
+from utils.exceptions import ProfileVersionConflictError
+
+ABHA_NUMBER = "91-1111-2222-3333"
+
+def record(first_name, updated_at):
+    return {
+        "savedAt": "2026-01-01T00:00:00",
+        "updatedAt": updated_at,
+        "profile": {"ABHAProfile": {"ABHANumber": ABHA_NUMBER, "firstName": first_name, "mobile": "9876500001"}}
+    }
+
+class ProfileStoreConcurrencyTest(unittest.TestCase):
+    """Two stores on one database file stand in for two worker processes"""
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        db_path = os.path.join(directory.name, "abha_profiles.db")
+        self.first = ABHAProfileStore(db_path)
+        self.second = ABHAProfileStore(db_path)
+        self.addCleanup(self.first.conn.close)
+        self.addCleanup(self.second.conn.close)
+        self.first.put(ABHA_NUMBER, record("Diya", "2026-01-01T00:00:00"))
+
+    def test_stale_patch_is_rejected_after_a_put_from_another_connection(self):
+        stale_version = self.first.get(ABHA_NUMBER)["version"]
+        self.assertEqual(self.second.put(ABHA_NUMBER, record("Riya", "2026-01-02T00:00:00"),
+                                         expected_version=stale_version), 2)
+
+        with self.assertRaises(ProfileVersionConflictError) as raised:
+            self.first.append_patch(ABHA_NUMBER, {"ABHAProfile": {"firstName": "Tara"}},
+                                    "2026-01-03T00:00:00", expected_version=stale_version)
+        self.assertEqual(raised.exception.details["current_version"], 2)
+        self.assertEqual(self.first.get(ABHA_NUMBER)["profile"]["ABHAProfile"]["firstName"], "Riya")
+
+    def test_stale_put_is_rejected_after_a_patch_from_another_connection(self):
+        self.assertEqual(self.second.append_patch(ABHA_NUMBER, {"ABHAProfile": {"firstName": "Riya"}},
+                                                  "2026-01-02T00:00:00", expected_version=1), 2)
+        with self.assertRaises(ProfileVersionConflictError):
+            self.first.put(ABHA_NUMBER, record("Tara", "2026-01-03T00:00:00"), expected_version=1)
+
+    def test_compaction_keeps_patches_from_another_connection(self):
+        self.second.append_patch(ABHA_NUMBER, {"ABHAProfile": {"firstName": "Riya"}}, "2026-01-02T00:00:00")
+        self.assertEqual(self.first.compact(ABHA_NUMBER), 1)
+        self.second.append_patch(ABHA_NUMBER, {"ABHAProfile": {"firstName": "Tara"}}, "2026-01-03T00:00:00",
+                                 expected_version=2)
+
+        current = self.first.get(ABHA_NUMBER)
+        self.assertEqual((current["version"], current["profile"]["ABHAProfile"]["firstName"]), (3, "Tara"))
+
+    def test_body_is_served_with_the_version_it_was_built_from(self):
+        self.first.put(ABHA_NUMBER, record("Riya", "2026-01-02T00:00:00"), bodies={"summary": b'{"firstName":"Riya"}'})
+        self.assertEqual(self.first.get_body(ABHA_NUMBER, "summary")[1:], (b'{"firstName":"Riya"}', mock.ANY, 2))
+
+        self.second.put(ABHA_NUMBER, record("Tara", "2026-01-03T00:00:00"), bodies={"summary": b'{"firstName":"Tara"}'})
+        etag, body, body_gzip, version = self.first.get_body(ABHA_NUMBER, "summary")
+        self.assertEqual((body, version), (b'{"firstName":"Tara"}', 3))
+
+        self.second.append_patch(ABHA_NUMBER, {"ABHAProfile": {"firstName": "Uma"}}, "2026-01-04T00:00:00")
+        self.assertIsNone(self.first.get_body(ABHA_NUMBER, "summary"))
+        self.first.put_body(ABHA_NUMBER, "summary", b'{"firstName":"Uma"}', "2026-01-04T00:00:00", 4)
+        self.assertEqual(self.second.get_body(ABHA_NUMBER, "summary")[3], 4)
+
+if __name__ == "__main__":
+    unittest.main()
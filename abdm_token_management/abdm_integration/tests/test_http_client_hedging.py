@@ -0,0 +1,133 @@
+# tests/test_http_client_hedging.py - Unit tests for hedged GETs
+#
+# Run from the abdm_integration directory:
+#     python -m unittest discover -s tests -t .
+
+import time
+import threading
+import unittest
+from unittest import mock
+
+from services import http_client
+from services.http_client import HedgingPolicy, hedged_get
+
+HEADERS = {"REQUEST-ID": "11111111-1111-1111-1111-111111111111", "TIMESTAMP": "2026-01-01T00:00:00.000Z"}
+
+def make_policy(latencies=(0.01,) * 10, tokens=10):
+    policy = HedgingPolicy(quantile=0.9, budget_ratio=0.05, max_tokens=10, window=50, min_samples=5, min_delay=0.02)
+    for seconds in latencies:
+        policy.record("Lookup", seconds)
+    policy.tokens = tokens
+    return policy
+
+class FakeSession:
+    """Answers the first GET after first_delay and later ones after hedge_delay, recording what was sent"""
+
+    def __init__(self, first_delay, hedge_delay=0.0, fail=False):
+        self.delays = [first_delay, hedge_delay]
+        self.fail = fail
+        self.calls = []
+        self.responses = []
+        self.lock = threading.Lock()
+
+    def get(self, url, headers=None, timeout=None):
+        with self.lock:
+            index = len(self.calls)
+            self.calls.append(dict(headers or {}))
+        time.sleep(self.delays[min(index, 1)])
+        if self.fail:
+            raise ConnectionError(f"request {index} failed")
+        response = mock.Mock(name=f"response{index}", status_code=200)
+        with self.lock:
+            self.responses.append(response)
+        return response
+
+class HedgingPolicyTest(unittest.TestCase):
+    def test_no_delay_until_enough_samples(self):
+        policy = make_policy(latencies=(0.1,) * 4)
+        self.assertIsNone(policy.hedge_delay("Lookup"))
+        self.assertIsNone(policy.hedge_delay("Other"))
+
+    def test_delay_is_the_latency_quantile(self):
+        policy = make_policy(latencies=[i / 100 for i in range(1, 11)])
+        self.assertAlmostEqual(policy.hedge_delay("Lookup"), 0.10)
+
+    def test_delay_has_a_floor(self):
+        policy = make_policy(latencies=(0.001,) * 10)
+        self.assertEqual(policy.hedge_delay("Lookup"), 0.02)
+
+    def test_budget_is_earned_and_spent(self):
+        policy = make_policy(tokens=1)
+        self.assertTrue(policy.try_spend())
+        self.assertFalse(policy.has_budget())
+        self.assertFalse(policy.try_spend())
+        for _ in range(20):
+            policy.earn()
+        self.assertTrue(policy.try_spend())
+
+class HedgedGetTest(unittest.TestCase):
+    def setUp(self):
+        patcher = mock.patch.object(http_client.settings, "HEDGING_ENABLED", True)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def run_get(self, session, policy):
+        with mock.patch.object(http_client, "abdm_session", session), \
+                mock.patch.object(http_client, "hedging_policy", policy):
+            return hedged_get("https://abdm.test/lookup", "Lookup", headers=dict(HEADERS), timeout=5)
+
+    def test_fast_primary_is_not_hedged(self):
+        session = FakeSession(first_delay=0.0)
+        response = self.run_get(session, make_policy())
+        self.assertIs(response, session.responses[0])
+        self.assertEqual(len(session.calls), 1)
+
+    def test_slow_primary_is_hedged_with_a_fresh_request_id(self):
+        session = FakeSession(first_delay=0.3)
+        policy = make_policy()
+        response = self.run_get(session, policy)
+
+        self.assertEqual(len(session.calls), 2)
+        self.assertIs(response, session.responses[0])  # the hedge answered first
+        primary_headers, hedge_headers = session.calls
+        self.assertEqual(primary_headers, HEADERS)
+        self.assertNotEqual(hedge_headers["REQUEST-ID"], HEADERS["REQUEST-ID"])
+        self.assertNotEqual(hedge_headers["TIMESTAMP"], HEADERS["TIMESTAMP"])
+        self.assertEqual(policy.tokens, 9)
+
+    def test_losing_response_is_closed(self):
+        session = FakeSession(first_delay=0.2)
+        winner = self.run_get(session, make_policy())
+
+        deadline = time.monotonic() + 2
+        while len(session.responses) < 2 and time.monotonic() < deadline:
+            time.sleep(0.01)
+        time.sleep(0.05)  # let the done callback run
+        loser = session.responses[1]
+        loser.close.assert_called_once_with()
+        winner.close.assert_not_called()
+
+    def test_exhausted_budget_waits_for_the_primary_without_the_hedge_threads(self):
+        session = FakeSession(first_delay=0.1)
+        with mock.patch.object(http_client, "_hedge_executor") as executor:
+            response = self.run_get(session, make_policy(tokens=0))
+        executor.submit.assert_not_called()
+        self.assertIs(response, session.responses[0])
+        self.assertEqual(len(session.calls), 1)
+
+    def test_budget_spent_by_others_while_waiting(self):
+        session = FakeSession(first_delay=0.15)
+        policy = make_policy(tokens=1)
+        with mock.patch.object(policy, "try_spend", return_value=False):
+            response = self.run_get(session, policy)
+        self.assertIs(response, session.responses[0])
+        self.assertEqual(len(session.calls), 1)
+
+    def test_error_raised_when_both_fail(self):
+        session = FakeSession(first_delay=0.1, fail=True)
+        with self.assertRaises(ConnectionError):
+            self.run_get(session, make_policy())
+        self.assertEqual(len(session.calls), 2)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,58 @@
+# tests/test_profile_export.py - Unit tests for the NDJSON profile export
+#
+# Run from the abdm_integration directory:
+#     python -m unittest discover -s tests -t .
+
+import json
+import unittest
+from unittest import mock
+
+from services.profile_export import iter_profile_ndjson
+
+RECORDS = [
+    ("91-1111-2222-3333", {
+        "savedAt": "2026-01-01T00:00:00",
+        "updatedAt": "2026-01-02T00:00:00",
+        "version": 3,
+        "profile": {
+            "ABHAProfile": {"ABHANumber": "91-1111-2222-3333", "firstName": "Diya", "photoHash": "abc"},
+            "tokens": {"token": "x-token", "refreshToken": "refresh-token", "expiresIn": 1800},
+            "txnId": "txn-1"
+        }
+    }),
+    ("91-4444-5555-6666", {
+        "savedAt": "2026-01-01T00:00:00",
+        "updatedAt": "2026-01-03T00:00:00",
+        "profile": {"ABHAProfile": {"ABHANumber": "91-4444-5555-6666", "firstName": "Rohan"}}
+    }),
+]
+
+def make_manager():
+    manager = mock.Mock()
+    manager.store.iter_records.return_value = iter(RECORDS)
+    manager.shape_profile.side_effect = lambda profile, include_photo=True: dict(profile)
+    return manager
+
+class ProfileExportTest(unittest.TestCase):
+    def export_lines(self, **kwargs):
+        body = b"".join(iter_profile_ndjson(make_manager(), **kwargs))
+        return [json.loads(line) for line in body.decode("utf-8").splitlines()]
+
+    def test_one_line_per_profile(self):
+        lines = self.export_lines()
+        self.assertEqual([line["ABHANumber"] for line in lines], [abha for abha, _ in RECORDS])
+        self.assertEqual(lines[0]["version"], 3)
+        self.assertEqual(lines[1]["version"], 1)
+
+    def test_tokens_are_never_exported(self):
+        for line in self.export_lines(include_photo=True):
+            self.assertNotIn("tokens", line["profile"])
+            self.assertNotIn("x-token", json.dumps(line))
+        self.assertEqual(self.export_lines()[0]["profile"]["txnId"], "txn-1")
+
+    def test_stored_record_is_not_modified(self):
+        self.export_lines()
+        self.assertIn("tokens", RECORDS[0][1]["profile"])
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,77 @@
+# tests/test_profile_search_index.py - Unit tests for the in-memory profile search index
+#
+# Run from the abdm_integration directory:
+#     python -m unittest discover -s tests -t .
+
+import unittest
+
+from services.profile_search_index import ProfileSearchIndex, check_prefix_lengths
+
+def record(first_name, last_name, mobile, phr_address, district_code="519"):
+    return {"profile": {"ABHAProfile": {
+        "firstName": first_name,
+        "lastName": last_name,
+        "mobile": mobile,
+        "phrAddress": [phr_address],
+        "districtCode": district_code
+    }}}
+
+PROFILES = {
+    "91-0000-0000-0005": record("Jayesh", "Wankhede", "9876500005", "jayesh@sbx"),
+    "91-0000-0000-0001": record("Jayant", "Patel", "9876500001", "jayant@sbx", district_code="572"),
+    "91-0000-0000-0003": record("Jaya", "Iyer", "9876500003", "jaya.iyer@sbx"),
+    "91-0000-0000-0002": record("Kavya", "Nair", "9123400002", "kavya@sbx"),
+    "91-0000-0000-0004": record("Janaki", "Das", "9876500004", "janaki@sbx"),
+}
+
+class ProfileSearchIndexTest(unittest.TestCase):
+    def setUp(self):
+        self.index = ProfileSearchIndex()
+        self.index.build(PROFILES.items())
+
+    def abha_numbers(self, results):
+        return [summary["ABHANumber"] for summary in results]
+
+    def test_name_prefix(self):
+        total, results = self.index.search(name="jay")
+        self.assertEqual(total, 3)
+        self.assertEqual(self.abha_numbers(results), ["91-0000-0000-0001", "91-0000-0000-0003", "91-0000-0000-0005"])
+
+    def test_every_criterion_must_match(self):
+        total, results = self.index.search(name="ja wank")
+        self.assertEqual((total, self.abha_numbers(results)), (1, ["91-0000-0000-0005"]))
+
+        total, results = self.index.search(name="jay", district_code="572")
+        self.assertEqual((total, self.abha_numbers(results)), (1, ["91-0000-0000-0001"]))
+
+        total, results = self.index.search(mobile="98765", phr_address="JAN")
+        self.assertEqual((total, self.abha_numbers(results)), (1, ["91-0000-0000-0004"]))
+
+        self.assertEqual(self.index.search(name="kavya", mobile="9876"), (0, []))
+
+    def test_pagination_is_ordered_by_abha_number(self):
+        total, first_page = self.index.search(mobile="9876", offset=0, limit=2)
+        total_again, second_page = self.index.search(mobile="9876", offset=2, limit=2)
+        self.assertEqual(total, 4)
+        self.assertEqual(total_again, 4)
+        self.assertEqual(self.abha_numbers(first_page), ["91-0000-0000-0001", "91-0000-0000-0003"])
+        self.assertEqual(self.abha_numbers(second_page), ["91-0000-0000-0004", "91-0000-0000-0005"])
+        self.assertEqual(self.index.search(mobile="9876", offset=4, limit=2), (4, []))
+
+    def test_reindexed_profile_is_found_by_its_new_terms(self):
+        self.index.index("91-0000-0000-0002", record("Kavya", "Wankhede", "9123400002", "kavya@sbx")["profile"])
+        total, results = self.index.search(name="wan")
+        self.assertEqual(self.abha_numbers(results), ["91-0000-0000-0002", "91-0000-0000-0005"])
+        self.assertEqual(self.index.search(name="nair"), (0, []))
+
+    def test_short_prefixes_are_rejected(self):
+        for criteria in ({"name": "j"}, {"name": "jay w"}, {"mobile": "987"}, {"phr_address": "ja"}):
+            with self.subTest(criteria=criteria):
+                with self.assertRaises(ValueError):
+                    check_prefix_lengths(**criteria)
+                with self.assertRaises(ValueError):
+                    self.index.search(**criteria)
+        check_prefix_lengths(name="ja wa", mobile="9876", phr_address="jay")
+
+if __name__ == "__main__":
+    unittest.main()
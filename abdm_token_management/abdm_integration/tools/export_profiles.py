@@ -0,0 +1,49 @@
+# tools/export_profiles.py - Export stored ABHA profiles as NDJSON
+#
+# Usage (from the abdm_integration directory):
+#   python -m tools.export_profiles --output profiles.ndjson
+#   python -m tools.export_profiles --updated-since 2025-06-15T00:00:00 --gzip --output delta.ndjson.gz
+import os
+import sys
+import argparse
+
+# Keep stdout free for the export itself
+os.environ.setdefault("LOG_CONSOLE_STREAM", "stderr")
+
+from services.abha_profile_service import ABHAProfileManager
+from services.profile_export import iter_profile_ndjson, gzip_chunks, normalize_updated_since
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Stream stored ABHA profiles as NDJSON")
+    parser.add_argument("--output", "-o", help="Output file (default: stdout)")
+    parser.add_argument("--updated-since", help="Only export profiles updated at or after this ISO 8601 timestamp")
+    parser.add_argument("--include-photo", action="store_true", help="Include the base64 photo of each profile")
+    parser.add_argument("--gzip", action="store_true", help="Gzip the output")
+    args = parser.parse_args(argv)
+
+    try:
+        normalize_updated_since(args.updated_since)
+    except ValueError:
+        parser.error("--updated-since must be an ISO 8601 timestamp")
+
+    chunks = iter_profile_ndjson(
+        ABHAProfileManager(),
+        updated_since=args.updated_since,
+        include_photo=args.include_photo
+    )
+    if args.gzip:
+        chunks = gzip_chunks(chunks)
+
+    output = open(args.output, "wb") if args.output else sys.stdout.buffer
+    try:
+        for chunk in chunks:
+            output.write(chunk)
+    finally:
+        if args.output:
+            output.close()
+        else:
+            output.flush()
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
\ No newline at end of file
@@ -0,0 +1,498 @@
+# tools/fake_abdm_gateway.py - Local stand-in for the ABDM gateway and ABHA APIs
+#
+# Usage (from the abdm_integration directory):
+#   python -m tools.fake_abdm_gateway --port 9100
+#   python -m tools.fake_abdm_gateway --latency lognormal:80,0.6 --error-rate 0.01 --rate-limit 200
+#   python -m tools.fake_abdm_gateway --route-latency byAadhaar=uniform:300,900 --route-error-rate sessions=0.2
+#
+# Then point the service at it (the command prints these for its own address):
+#   ABDM_GATEWAY_BASE_URL=http://127.0.0.1:9100/gateway ABDM_ABHA_BASE_URL=http://127.0.0.1:9100/abha/api/v3 python main.py
+#
+# Serves the endpoints the service calls with sandbox-shaped payloads, so its
+# own throughput can be measured without the network. The certificate is a
+# real RSA key generated at startup, and encrypted fields (loginId, otpValue)
+# are decrypted with it, so encryption is exercised end to end. Latency,
+# errors and throttling are injected per route; GET /__stats shows counts.
+import sys
+import json
+import time
+import uuid
+import zlib
+import base64
+import struct
+import random
+import argparse
+import threading
+from collections import Counter
+from urllib.parse import urlsplit, parse_qsl
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from cryptography.hazmat.primitives import hashes, serialization
+from cryptography.hazmat.primitives.asymmetric import rsa, padding
+
+GATEWAY_PREFIX = "/gateway"
+ABHA_PREFIX = "/abha/api/v3"
+
+# (method, path) -> route name, as used by the --route-* options
+ROUTES = {
+    ("POST", f"{GATEWAY_PREFIX}/v0.5/sessions"): "sessions",
+    ("GET", f"{ABHA_PREFIX}/profile/public/certificate"): "certificate",
+    ("POST", f"{ABHA_PREFIX}/enrollment/request/otp"): "request-otp",
+    ("POST", f"{ABHA_PREFIX}/enrollment/enrol/byAadhaar"): "byAadhaar",
+    ("GET", f"{ABHA_PREFIX}/enrollment/enrol/suggestion"): "suggestion",
+    ("POST", f"{ABHA_PREFIX}/enrollment/auth/byAbdm"): "byAbdm",
+    ("POST", f"{ABHA_PREFIX}/profile/account/request/emailVerificationLink"): "email-link",
+    ("POST", f"{ABHA_PREFIX}/profile/account/request/token"): "user-token",
+}
+
+OAEP = padding.OAEP(mgf=padding.MGF1(algorithm=hashes.SHA1()), algorithm=hashes.SHA1(), label=None)
+
+def _noise_png(width, height, seed=1):
+    """
+    Base64 grayscale PNG of random noise
+
+    Noise does not compress, so the PNG is about width * height bytes.
+    """
+    rng = random.Random(seed)
+    rows = b"".join(b"\x00" + bytes(rng.getrandbits(8) for _ in range(width)) for _ in range(height))
+
+    def chunk(kind, data):
+        return struct.pack(">I", len(data)) + kind + data + struct.pack(">I", zlib.crc32(kind + data))
+
+    png = (
+        b"\x89PNG\r\n\x1a\n"
+        + chunk(b"IHDR", struct.pack(">IIBBBBB", width, height, 8, 0, 0, 0, 0))
+        + chunk(b"IDAT", zlib.compress(rows, 9))
+        + chunk(b"IEND", b"")
+    )
+    return base64.b64encode(png).decode("ascii")
+
+# About 6 KB, the size of a real ABHA photo, so photo storage and response sizes are realistic
+PHOTO = _noise_png(64, 96)
+
+FIRST_NAMES = ("Aarav", "Diya", "Ishaan", "Kavya", "Rohan", "Saanvi", "Vihaan", "Ananya")
+LAST_NAMES = ("Sharma", "Patel", "Iyer", "Reddy", "Das", "Nair", "Gupta", "Singh")
+# (state code, state, district code, district)
+DISTRICTS = (
+    ("27", "MAHARASHTRA", "519", "PUNE"),
+    ("29", "KARNATAKA", "572", "BENGALURU URBAN"),
+    ("33", "TAMIL NADU", "603", "CHENNAI"),
+    ("9", "UTTAR PRADESH", "164", "LUCKNOW"),
+)
+
+class Latency:
+    """
+    Injected response delay, parsed from a spec (milliseconds):
+    none | fixed:MS | uniform:MIN,MAX | lognormal:MEDIAN,SIGMA
+    """
+
+    def __init__(self, spec):
+        kind, _, params = spec.partition(":")
+        try:
+            values = [float(value) for value in params.split(",")] if params else []
+        except ValueError:
+            raise ValueError(f"Invalid latency {spec!r}")
+        expected = {"none": 0, "fixed": 1, "uniform": 2, "lognormal": 2}
+        if kind not in expected or len(values) != expected[kind] or any(value < 0 for value in values):
+            raise ValueError(f"Invalid latency {spec!r}; use none, fixed:MS, uniform:MIN,MAX or lognormal:MEDIAN,SIGMA")
+        self.spec = spec
+        self.kind = kind
+        self.values = values
+
+    def sample(self, rng):
+        """Delay in seconds"""
+        if self.kind == "fixed":
+            return self.values[0] / 1000
+        if self.kind == "uniform":
+            return rng.uniform(*self.values) / 1000
+        if self.kind == "lognormal":
+            median, sigma = self.values
+            return median * rng.lognormvariate(0, sigma) / 1000
+        return 0.0
+
+class TokenBucket:
+    """Request rate limit; rate 0 means unlimited"""
+
+    def __init__(self, rate, burst):
+        self.rate = rate
+        self.burst = max(1.0, burst)
+        self.tokens = self.burst
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def take(self):
+        """
+        Returns:
+            0 if the request may proceed, otherwise seconds until it could
+        """
+        if self.rate <= 0:
+            return 0
+        with self.lock:
+            now = time.monotonic()
+            self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            if self.tokens >= 1:
+                self.tokens -= 1
+                return 0
+            return (1 - self.tokens) / self.rate
+
+class FaultPlan:
+    """Latency, error rate and error statuses of every route"""
+
+    def __init__(self, latency, error_rate, error_statuses, route_latency=None, route_error_rate=None):
+        self.latency = latency
+        self.error_rate = error_rate
+        self.error_statuses = error_statuses
+        self.route_latency = route_latency or {}
+        self.route_error_rate = route_error_rate or {}
+
+    def delay(self, route, rng):
+        return self.route_latency.get(route, self.latency).sample(rng)
+
+    def error_status(self, route, rng):
+        """Injected HTTP error for this request, or None"""
+        if rng.random() < self.route_error_rate.get(route, self.error_rate):
+            return rng.choice(self.error_statuses)
+        return None
+
+def _b64url(data):
+    return base64.urlsafe_b64encode(data).rstrip(b"=").decode("ascii")
+
+def _decode_jwt_claims(token):
+    """Claims of a JWT without verifying it, or None if it is not one"""
+    try:
+        payload = token.split(".")[1]
+        return json.loads(base64.urlsafe_b64decode(payload + "=" * (-len(payload) % 4)))
+    except (IndexError, ValueError):
+        return None
+
+class FakeABDM:
+    """Responses of the fake endpoints; shared by all handler threads"""
+
+    def __init__(self, faults, limiter, token_ttl=1200, x_token_ttl=1800, decrypt=True, seed=None):
+        self.faults = faults
+        self.limiter = limiter
+        self.token_ttl = token_ttl
+        self.x_token_ttl = x_token_ttl
+        self.decrypt_fields = decrypt
+        self.rng = random.Random(seed)
+        self.private_key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+        public_der = self.private_key.public_key().public_bytes(
+            serialization.Encoding.DER, serialization.PublicFormat.SubjectPublicKeyInfo
+        )
+        # The sandbox returns the bare base64 body of the PEM
+        self.public_key_b64 = base64.b64encode(public_der).decode("ascii")
+        self.stats = Counter()  # (route, outcome) -> count
+        self.stats_lock = threading.Lock()
+
+    def count(self, route, outcome):
+        with self.stats_lock:
+            self.stats[(route, outcome)] += 1
+
+    def stats_report(self):
+        with self.stats_lock:
+            report = {}
+            for (route, outcome), count in sorted(self.stats.items()):
+                report.setdefault(route, {})[outcome] = count
+            return report
+
+    def jwt(self, subject, ttl, **claims):
+        """A JWT with real claims and a random signature; the service reads exp but never verifies"""
+        now = int(time.time())
+        header = _b64url(json.dumps({"alg": "RS512", "typ": "JWT"}).encode())
+        body = _b64url(json.dumps({"sub": subject, "iat": now, "exp": now + ttl, "jti": str(uuid.uuid4()), **claims}).encode())
+        return f"{header}.{body}.{_b64url(self.rng.randbytes(64))}"
+
+    def decrypt(self, value):
+        """
+        Decrypt a field encrypted with the served certificate
+
+        Raises:
+            ValueError: if the value is not valid for this key
+        """
+        if not self.decrypt_fields:
+            return None
+        try:
+            return self.private_key.decrypt(base64.b64decode(value, validate=True), OAEP).decode("utf-8")
+        except Exception:
+            raise ValueError("Unable to decrypt the encrypted value; was it encrypted with the current certificate?")
+
+    def abha_number(self):
+        digits = f"{self.rng.randrange(10 ** 12):012d}"
+        return f"91-{digits[:4]}-{digits[4:8]}-{digits[8:]}"
+
+    def profile(self, txn_id, mobile):
+        first, last = self.rng.choice(FIRST_NAMES), self.rng.choice(LAST_NAMES)
+        state_code, state_name, district_code, district_name = self.rng.choice(DISTRICTS)
+        address = f"{first.lower()}.{last.lower()}{self.rng.randrange(100, 10000)}@sbx"
+        return {
+            "preferredAddress": address,
+            "firstName": first,
+            "middleName": "",
+            "lastName": last,
+            "dob": f"{self.rng.randrange(1, 29):02d}-{self.rng.randrange(1, 13):02d}-{self.rng.randrange(1950, 2010)}",
+            "gender": self.rng.choice(("M", "F")),
+            "photo": PHOTO,
+            "mobile": mobile,
+            "mobileVerified": True,
+            "email": None,
+            "phrAddress": [address],
+            "address": f"{self.rng.randrange(1, 400)}, MG Road, {district_name.title()}",
+            "districtCode": district_code,
+            "stateCode": state_code,
+            "pinCode": f"{self.rng.randrange(110001, 855999)}",
+            "abhaType": "STANDARD",
+            "stateName": state_name,
+            "districtName": district_name,
+            "ABHANumber": self.abha_number(),
+            "abhaStatus": "ACTIVE",
+            "txnId": txn_id
+        }
+
+    def user_tokens(self, abha_number):
+        return {
+            "token": self.jwt(abha_number, self.x_token_ttl, typ="Transaction"),
+            "expiresIn": self.x_token_ttl,
+            "refreshToken": self.jwt(abha_number, 15 * 86400, typ="Refresh"),
+            "refreshExpiresIn": 15 * 86400
+        }
+
+    # --- Endpoint handlers: (body, query, headers) -> (status, payload) ---
+
+    def sessions(self, body, query, headers):
+        if not body.get("clientId") or body.get("grantType") not in ("client_credentials", "refresh_token"):
+            return 400, {"code": "400", "message": "clientId and a valid grantType are required"}
+        return 200, {
+            "accessToken": self.jwt(body["clientId"], self.token_ttl, clientId=body["clientId"]),
+            "expiresIn": self.token_ttl,
+            "refreshExpiresIn": 1800,
+            "refreshToken": self.jwt(body["clientId"], 1800, typ="Refresh"),
+            "tokenType": "bearer"
+        }
+
+    def certificate(self, body, query, headers):
+        return 200, {"publicKey": self.public_key_b64, "encryptionAlgorithm": "RSA/ECB/OAEPWithSHA-1AndMGF1Padding"}
+
+    def request_otp(self, body, query, headers):
+        login_id = self.decrypt(body.get("loginId", ""))
+        hint = body.get("loginHint", "aadhaar")
+        ending = login_id[-4:] if login_id else f"{self.rng.randrange(10000):04d}"
+        target = "mobile number" if hint == "mobile" else "Aadhaar registered mobile number"
+        return 200, {
+            "txnId": body.get("txnId") or str(uuid.uuid4()),
+            "message": f"OTP sent to {target} ending with ******{ending}"
+        }
+
+    def by_aadhaar(self, body, query, headers):
+        otp = body.get("authData", {}).get("otp", {})
+        self.decrypt(otp.get("otpValue", ""))
+        txn_id = otp.get("txnId") or str(uuid.uuid4())
+        profile = self.profile(txn_id, otp.get("mobile") or f"9{self.rng.randrange(10 ** 9):09d}")
+        return 200, {
+            "message": "Account created successfully",
+            "txnId": txn_id,
+            "tokens": self.user_tokens(profile["ABHANumber"]),
+            "ABHAProfile": profile,
+            "isNew": True
+        }
+
+    def suggestion(self, body, query, headers):
+        txn_id = headers.get("Transaction_Id") or query.get("txnId") or str(uuid.uuid4())
+        first, last = self.rng.choice(FIRST_NAMES).lower(), self.rng.choice(LAST_NAMES).lower()
+        return 200, {
+            "txnId": txn_id,
+            "abhaAddressList": [f"{first}.{last}", f"{first}{last}", f"{first}_{last}{self.rng.randrange(10, 100)}", f"{last}.{first}"]
+        }
+
+    def by_abdm(self, body, query, headers):
+        otp = body.get("authData", {}).get("otp", {})
+        self.decrypt(otp.get("otpValue", ""))
+        return 200, {
+            "message": "Mobile number is now successfully linked to your Account",
+            "txnId": otp.get("txnId") or str(uuid.uuid4()),
+            "authResult": "success",
+            "accounts": [{"ABHANumber": self.abha_number()}]
+        }
+
+    def email_link(self, body, query, headers):
+        self.decrypt(body.get("loginId", ""))
+        return 200, {
+            "txnId": str(uuid.uuid4()),
+            "message": "Verification link has been sent to your email address"
+        }
+
+    def user_token(self, body, query, headers):
+        claims = _decode_jwt_claims(body.get("refreshToken", ""))
+        if not claims or claims.get("exp", 0) < time.time():
+            return 401, {"code": "401", "message": "Refresh token is invalid or expired"}
+        tokens = self.user_tokens(claims.get("sub", ""))
+        return 200, {"token": tokens["token"], "expiresIn": tokens["expiresIn"]}
+
+    HANDLERS = {
+        "sessions": sessions,
+        "certificate": certificate,
+        "request-otp": request_otp,
+        "byAadhaar": by_aadhaar,
+        "suggestion": suggestion,
+        "byAbdm": by_abdm,
+        "email-link": email_link,
+        "user-token": user_token,
+    }
+
+    def authorize(self, route, headers):
+        """Gateway token (and X-token where needed) checks, like the sandbox's 401s"""
+        if route in ("sessions", "certificate"):
+            return None
+        checks = [("Authorization", "access token")]
+        if route == "email-link":
+            checks.append(("X-token", "X-token"))
+        for header, name in checks:
+            value = headers.get(header, "")
+            claims = _decode_jwt_claims(value[7:] if value.lower().startswith("bearer ") else value)
+            if claims is None:
+                return f"Missing or malformed {name}"
+            if claims.get("exp", 0) < time.time():
+                return f"The {name} has expired"
+        return None
+
+    def handle(self, route, body, query, headers):
+        """Apply throttling and faults, then answer; returns (status, payload, extra headers)"""
+        retry_after = self.limiter.take()
+        if retry_after:
+            self.count(route, "throttled")
+            return 429, {"code": "429", "message": "Too many requests"}, {"Retry-After": str(max(1, round(retry_after)))}
+
+        time.sleep(self.faults.delay(route, self.rng))
+
+        status = self.faults.error_status(route, self.rng)
+        if status is not None:
+            self.count(route, "injected_error")
+            return status, {"code": str(status), "message": "Injected error from the fake ABDM gateway"}, {}
+
+        problem = self.authorize(route, headers)
+        if problem:
+            self.count(route, "unauthorized")
+            return 401, {"code": "401", "message": problem}, {}
+
+        try:
+            status, payload = self.HANDLERS[route](self, body, query, headers)
+        except ValueError as e:
+            status, payload = 400, {"code": "400", "message": str(e)}
+        self.count(route, str(status))
+        return status, payload, {}
+
+class FakeABDMHandler(BaseHTTPRequestHandler):
+    # Keep-alive, like the real gateway; the service's pooled session relies on it
+    protocol_version = "HTTP/1.1"
+    server_version = "FakeABDM/1.0"
+    fake = None
+    verbose = False
+
+    def send_json(self, status, payload, extra_headers=None):
+        data = json.dumps(payload, separators=(",", ":")).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        for name, value in (extra_headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        if self.command != "HEAD":
+            self.wfile.write(data)
+
+    def dispatch(self):
+        parts = urlsplit(self.path)
+        length = int(self.headers.get("Content-Length") or 0)
+        raw = self.rfile.read(length) if length else b""
+
+        if parts.path == "/__stats" and self.command == "GET":
+            return self.send_json(200, self.fake.stats_report())
+        route = ROUTES.get((self.command, parts.path))
+        if route is None:
+            # Warm-up and health probes HEAD the origin; any answer will do
+            return self.send_json(404, {"code": "404", "message": f"No fake for {self.command} {parts.path}"})
+
+        try:
+            body = json.loads(raw) if raw else {}
+        except ValueError:
+            return self.send_json(400, {"code": "400", "message": "Request body is not valid JSON"})
+        query = dict(parse_qsl(parts.query))
+        status, payload, extra_headers = self.fake.handle(route, body, query, self.headers)
+        self.send_json(status, payload, extra_headers)
+
+    do_GET = do_POST = do_HEAD = dispatch
+
+    def log_message(self, format, *args):
+        if self.verbose:
+            super().log_message(format, *args)
+
+class FakeABDMServer(ThreadingHTTPServer):
+    daemon_threads = True
+    # Benchmarks open many connections at once; don't refuse them at accept time
+    request_queue_size = 1024
+
+def _parse_route_option(values, parse, option):
+    """Parse repeated NAME=VALUE options into a dict, checking route names"""
+    names = set(ROUTES.values())
+    parsed = {}
+    for value in values or []:
+        name, sep, spec = value.partition("=")
+        if not sep or name not in names:
+            raise ValueError(f"{option} expects ROUTE=VALUE with ROUTE one of {', '.join(sorted(names))}")
+        parsed[name] = parse(spec)
+    return parsed
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run a local fake of the ABDM gateway and ABHA APIs")
+    parser.add_argument("--host", default="127.0.0.1", help="Address to listen on (default: 127.0.0.1)")
+    parser.add_argument("--port", type=int, default=9100, help="Port to listen on (default: 9100)")
+    parser.add_argument("--latency", default="none", help="Response delay: none, fixed:MS, uniform:MIN,MAX or lognormal:MEDIAN,SIGMA")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Share of requests answered with an injected error")
+    parser.add_argument("--error-status", default="503", help="Comma-separated statuses for injected errors (default: 503)")
+    parser.add_argument("--route-latency", action="append", metavar="ROUTE=SPEC", help="Response delay for one route (repeatable)")
+    parser.add_argument("--route-error-rate", action="append", metavar="ROUTE=RATE", help="Error rate for one route (repeatable)")
+    parser.add_argument("--rate-limit", type=float, default=0.0, help="Requests per second before answering 429 (default: unlimited)")
+    parser.add_argument("--burst", type=float, default=None, help="Requests allowed in a burst above the rate limit (default: one second's worth)")
+    parser.add_argument("--token-ttl", type=int, default=1200, help="Seconds gateway access tokens are valid")
+    parser.add_argument("--x-token-ttl", type=int, default=1800, help="Seconds user X-tokens are valid")
+    parser.add_argument("--no-decrypt", action="store_true", help="Skip decrypting encrypted fields (saves CPU under heavy load)")
+    parser.add_argument("--seed", type=int, help="Seed for latencies, errors and generated profiles")
+    parser.add_argument("--verbose", "-v", action="store_true", help="Log every request")
+    args = parser.parse_args(argv)
+
+    try:
+        faults = FaultPlan(
+            Latency(args.latency),
+            args.error_rate,
+            [int(status) for status in args.error_status.split(",")],
+            route_latency=_parse_route_option(args.route_latency, Latency, "--route-latency"),
+            route_error_rate=_parse_route_option(args.route_error_rate, float, "--route-error-rate")
+        )
+    except ValueError as e:
+        parser.error(str(e))
+
+    limiter = TokenBucket(args.rate_limit, args.burst if args.burst is not None else args.rate_limit)
+    FakeABDMHandler.fake = FakeABDM(
+        faults, limiter,
+        token_ttl=args.token_ttl,
+        x_token_ttl=args.x_token_ttl,
+        decrypt=not args.no_decrypt,
+        seed=args.seed
+    )
+    FakeABDMHandler.verbose = args.verbose
+
+    server = FakeABDMServer((args.host, args.port), FakeABDMHandler)
+    base = f"http://{args.host}:{server.server_address[1]}"
+    print(f"Fake ABDM gateway listening on {base}", file=sys.stderr)
+    print("Point the service at it with:", file=sys.stderr)
+    print(f"  export ABDM_GATEWAY_BASE_URL={base}{GATEWAY_PREFIX}", file=sys.stderr)
+    print(f"  export ABDM_ABHA_BASE_URL={base}{ABHA_PREFIX}", file=sys.stderr)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        print(f"Requests served: {json.dumps(FakeABDMHandler.fake.stats_report())}", file=sys.stderr)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,369 @@
+# tools/log_latency_report.py - Request latency report from the application logs
+#
+# Usage (from the abdm_integration directory):
+#   python -m tools.log_latency_report                          # all files in logs/
+#   python -m tools.log_latency_report logs/abdm_20250616.log --top 20 --bucket 15
+#   python -m tools.log_latency_report --since 2025-06-16 --baseline-since 2025-06-11 --baseline-until 2025-06-12
+#
+# Reads the "Request completed: METHOD PATH - Status: N - Time: X.XXXs" lines of
+# text logs and the request completion records of JSON logs, including
+# gzip-rotated files, one line at a time.
+import os
+import re
+import sys
+import glob
+import gzip
+import json
+import math
+import heapq
+import argparse
+from datetime import datetime, timedelta
+
+TEXT_PATTERN = re.compile(
+    r"^(\d{4}-\d\d-\d\d \d\d:\d\d:\d\d)[,.]\d+ - \S+ - \w+ - "
+    r"Request completed: (\S+) (\S+) - Status: (\d+) - Time: ([\d.]+)s"
+)
+FILE_DATE_PATTERN = re.compile(r"_(\d{8})(?:\.\d+)?\.log(?:\.gz)?$")
+
+# Latency histogram buckets grow by 5%, so percentiles are within ~2.5%
+HISTOGRAM_BASE_MS = 0.1
+HISTOGRAM_GROWTH = 1.05
+_LOG_GROWTH = math.log(HISTOGRAM_GROWTH)
+
+class LatencyHistogram:
+    """Sparse log-bucketed latency histogram with weighted counts"""
+
+    def __init__(self):
+        self.buckets = {}
+        self.count = 0.0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+
+    def add(self, latency_ms, weight=1.0):
+        index = int(math.log(latency_ms / HISTOGRAM_BASE_MS) / _LOG_GROWTH) if latency_ms > HISTOGRAM_BASE_MS else 0
+        self.buckets[index] = self.buckets.get(index, 0.0) + weight
+        self.count += weight
+        self.total_ms += latency_ms * weight
+        if latency_ms > self.max_ms:
+            self.max_ms = latency_ms
+
+    def percentile(self, fraction):
+        """Latency in ms below which the given fraction of requests completed"""
+        if not self.count:
+            return 0.0
+        target = fraction * self.count
+        seen = 0.0
+        for index in sorted(self.buckets):
+            seen += self.buckets[index]
+            if seen >= target:
+                # Geometric middle of the bucket, capped at the real maximum
+                middle = HISTOGRAM_BASE_MS * HISTOGRAM_GROWTH ** (index + 0.5)
+                return min(middle, self.max_ms)
+        return self.max_ms
+
+    @property
+    def mean_ms(self):
+        return self.total_ms / self.count if self.count else 0.0
+
+class RouteStats:
+    """Counts, errors and latency distribution of one route or time bucket"""
+
+    def __init__(self):
+        self.histogram = LatencyHistogram()
+        self.client_errors = 0.0
+        self.server_errors = 0.0
+
+    def add(self, status, latency_ms, weight=1.0):
+        self.histogram.add(latency_ms, weight)
+        if status >= 500:
+            self.server_errors += weight
+        elif status >= 400:
+            self.client_errors += weight
+
+    @property
+    def count(self):
+        return self.histogram.count
+
+    def summary(self):
+        count = self.count
+        return {
+            "count": round(count),
+            "p50_ms": round(self.histogram.percentile(0.50), 1),
+            "p95_ms": round(self.histogram.percentile(0.95), 1),
+            "p99_ms": round(self.histogram.percentile(0.99), 1),
+            "max_ms": round(self.histogram.max_ms, 1),
+            "mean_ms": round(self.histogram.mean_ms, 1),
+            "error_rate": round(self.server_errors / count, 4) if count else 0.0,
+            "client_error_rate": round(self.client_errors / count, 4) if count else 0.0
+        }
+
+class LatencyReport:
+    """Aggregates request completions per route and per time bucket"""
+
+    def __init__(self, bucket_minutes=60, top=10):
+        self.bucket = timedelta(minutes=bucket_minutes)
+        self.top = top
+        self.routes = {}
+        self.buckets = {}
+        self.slowest = []  # min-heap of the slowest requests
+        self.overall = RouteStats()
+        self.first_seen = None
+        self.last_seen = None
+
+    def add(self, timestamp, method, path, status, latency_ms, weight=1.0):
+        route = f"{method} {path}"
+        stats = self.routes.get(route)
+        if stats is None:
+            stats = self.routes[route] = RouteStats()
+        stats.add(status, latency_ms, weight)
+        self.overall.add(status, latency_ms, weight)
+
+        bucket_start = datetime.min + ((timestamp - datetime.min) // self.bucket) * self.bucket
+        bucket = self.buckets.get(bucket_start)
+        if bucket is None:
+            bucket = self.buckets[bucket_start] = RouteStats()
+        bucket.add(status, latency_ms, weight)
+
+        entry = (latency_ms, timestamp.isoformat(sep=" "), route, status)
+        if len(self.slowest) < self.top:
+            heapq.heappush(self.slowest, entry)
+        elif latency_ms > self.slowest[0][0]:
+            heapq.heapreplace(self.slowest, entry)
+
+        if self.first_seen is None or timestamp < self.first_seen:
+            self.first_seen = timestamp
+        if self.last_seen is None or timestamp > self.last_seen:
+            self.last_seen = timestamp
+
+    def to_dict(self):
+        bucket_seconds = self.bucket.total_seconds()
+        return {
+            "period": {
+                "first": self.first_seen.isoformat(sep=" ") if self.first_seen else None,
+                "last": self.last_seen.isoformat(sep=" ") if self.last_seen else None
+            },
+            "overall": self.overall.summary(),
+            "routes": {
+                route: stats.summary()
+                for route, stats in sorted(self.routes.items(), key=lambda item: -item[1].count)
+            },
+            "slowest": [
+                {"latency_ms": round(latency_ms, 1), "time": time, "route": route, "status": status}
+                for latency_ms, time, route, status in sorted(self.slowest, reverse=True)
+            ],
+            "buckets": [
+                dict(start=start.isoformat(sep=" "), rps=round(stats.count / bucket_seconds, 4), **stats.summary())
+                for start, stats in sorted(self.buckets.items())
+            ]
+        }
+
+def parse_line(line):
+    """
+    Parse a request completion log line
+
+    Returns:
+        (timestamp, method, path, status, latency_ms, weight) or None
+    """
+    if "Request completed" not in line:
+        return None
+
+    if line.startswith("{"):
+        try:
+            record = json.loads(line)
+            timestamp = datetime.fromisoformat(record["ts"])
+            if timestamp.tzinfo is not None:
+                timestamp = timestamp.astimezone().replace(tzinfo=None)
+            return (
+                timestamp,
+                record["method"],
+                record["path"],
+                int(record["status"]),
+                float(record["latency_ms"]),
+                1.0 / float(record.get("sample_rate") or 1.0)  # re-weight sampled records
+            )
+        except (ValueError, KeyError, TypeError):
+            return None
+
+    match = TEXT_PATTERN.match(line)
+    if not match:
+        return None
+    timestamp, method, path, status, seconds = match.groups()
+    return datetime.fromisoformat(timestamp), method, path, int(status), float(seconds) * 1000, 1.0
+
+def expand_paths(paths):
+    """Expand directories to their abdm_*.log / abdm_*.log.gz files, oldest first"""
+    files = []
+    for path in paths:
+        if os.path.isdir(path):
+            files.extend(sorted(
+                glob.glob(os.path.join(path, "abdm_*.log")) + glob.glob(os.path.join(path, "abdm_*.log.gz"))
+            ))
+        else:
+            files.extend(sorted(glob.glob(path)) or [path])
+    return files
+
+def file_may_overlap(path, since, until):
+    """Use the date in a log file name to skip files outside the requested period"""
+    match = FILE_DATE_PATTERN.search(os.path.basename(path))
+    if not match:
+        return True
+    day = datetime.strptime(match.group(1), "%Y%m%d")
+    if since is not None and day + timedelta(days=1) <= since:
+        return False
+    if until is not None and day >= until:
+        return False
+    return True
+
+def iter_lines(path):
+    opener = gzip.open if path.endswith(".gz") else open
+    with opener(path, "rt", encoding="utf-8", errors="replace") as log_file:
+        yield from log_file
+
+def in_period(timestamp, period):
+    since, until = period
+    return (since is None or timestamp >= since) and (until is None or timestamp < until)
+
+def build_reports(files, periods, bucket_minutes=60, top=10, route_filter=None):
+    """
+    Stream the log files once, adding each request to the report of every period it falls in
+
+    Args:
+        files: Log files to read
+        periods: List of (since, until) pairs; None means unbounded
+        bucket_minutes: Width of the throughput time buckets
+        top: Number of slowest requests to keep
+        route_filter: Optional compiled regex matched against "METHOD PATH"
+
+    Returns:
+        One LatencyReport per period
+    """
+    reports = [LatencyReport(bucket_minutes, top) for _ in periods]
+    for path in files:
+        if not any(file_may_overlap(path, since, until) for since, until in periods):
+            continue
+        try:
+            for line in iter_lines(path):
+                parsed = parse_line(line)
+                if parsed is None:
+                    continue
+                timestamp, method, path_, status, latency_ms, weight = parsed
+                if route_filter is not None and not route_filter.search(f"{method} {path_}"):
+                    continue
+                for report, period in zip(reports, periods):
+                    if in_period(timestamp, period):
+                        report.add(timestamp, method, path_, status, latency_ms, weight)
+        except OSError as e:
+            sys.stderr.write(f"Skipping {path}: {e}\n")
+    return reports
+
+def diff_reports(baseline, current):
+    """Per-route comparison of two periods, largest p95 regressions first"""
+    baseline_routes = baseline.to_dict()["routes"]
+    current_routes = current.to_dict()["routes"]
+    rows = []
+    for route in set(baseline_routes) | set(current_routes):
+        before = baseline_routes.get(route)
+        after = current_routes.get(route)
+        row = {"route": route, "baseline": before, "current": after}
+        if before and after:
+            row["p95_change"] = round(after["p95_ms"] / before["p95_ms"] - 1, 4) if before["p95_ms"] else None
+            row["error_rate_change"] = round(after["error_rate"] - before["error_rate"], 4)
+        rows.append(row)
+    rows.sort(key=lambda row: -(row.get("p95_change") or 0))
+    return rows
+
+def format_table(headers, rows):
+    widths = [max(len(str(value)) for value in column) for column in zip(headers, *rows)]
+    lines = ["  ".join(str(value).rjust(width) if index else str(value).ljust(width)
+                       for index, (value, width) in enumerate(zip(row, widths)))
+             for row in [headers] + rows]
+    return "\n".join(lines)
+
+def print_report(data, out):
+    overall = data["overall"]
+    out.write(f"Period: {data['period']['first']} .. {data['period']['last']}\n")
+    out.write(f"Requests: {overall['count']}  p50 {overall['p50_ms']}ms  p95 {overall['p95_ms']}ms  "
+              f"p99 {overall['p99_ms']}ms  max {overall['max_ms']}ms  5xx {overall['error_rate']:.2%}\n\n")
+
+    out.write("Routes\n")
+    out.write(format_table(
+        ["route", "count", "p50_ms", "p95_ms", "p99_ms", "max_ms", "5xx", "4xx"],
+        [[route, s["count"], s["p50_ms"], s["p95_ms"], s["p99_ms"], s["max_ms"],
+          f"{s['error_rate']:.1%}", f"{s['client_error_rate']:.1%}"] for route, s in data["routes"].items()]
+    ) + "\n\n")
+
+    out.write("Slowest requests\n")
+    out.write(format_table(
+        ["time", "route", "status", "latency_ms"],
+        [[s["time"], s["route"], s["status"], s["latency_ms"]] for s in data["slowest"]]
+    ) + "\n\n")
+
+    out.write("Throughput\n")
+    out.write(format_table(
+        ["bucket", "count", "rps", "p95_ms", "5xx"],
+        [[b["start"], b["count"], b["rps"], b["p95_ms"], f"{b['error_rate']:.1%}"] for b in data["buckets"]]
+    ) + "\n")
+
+def print_diff(rows, out):
+    def value(stats, key):
+        return stats[key] if stats else "-"
+
+    def rate(stats):
+        return f"{stats['error_rate']:.1%}" if stats else "-"
+    out.write(format_table(
+        ["route", "count before", "count after", "p95 before", "p95 after", "p95 change", "5xx before", "5xx after"],
+        [[row["route"], value(row["baseline"], "count"), value(row["current"], "count"),
+          value(row["baseline"], "p95_ms"), value(row["current"], "p95_ms"),
+          f"{row['p95_change']:+.1%}" if row.get("p95_change") is not None else "-",
+          rate(row["baseline"]), rate(row["current"])] for row in rows]
+    ) + "\n")
+
+def parse_time(value):
+    return datetime.fromisoformat(value) if value else None
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Per-route latency, error and throughput report from request logs")
+    parser.add_argument("paths", nargs="*", help="Log files, globs or directories (default: logs/)")
+    parser.add_argument("--since", help="Only include requests at or after this local time, e.g. 2025-06-16T09:00")
+    parser.add_argument("--until", help="Only include requests before this local time")
+    parser.add_argument("--baseline-since", help="Start of a baseline period to compare against (diff mode)")
+    parser.add_argument("--baseline-until", help="End of the baseline period")
+    parser.add_argument("--route", help="Only include routes matching this regex, e.g. '^POST /verification'")
+    parser.add_argument("--bucket", type=int, default=60, help="Throughput bucket width in minutes (default: 60)")
+    parser.add_argument("--top", type=int, default=10, help="Number of slowest requests to list (default: 10)")
+    parser.add_argument("--json", action="store_true", help="Write the report as JSON")
+    args = parser.parse_args(argv)
+
+    try:
+        current_period = (parse_time(args.since), parse_time(args.until))
+        baseline_period = (parse_time(args.baseline_since), parse_time(args.baseline_until))
+    except ValueError:
+        parser.error("times must be ISO 8601, e.g. 2025-06-16 or 2025-06-16T09:30")
+    diff_mode = args.baseline_since is not None or args.baseline_until is not None
+
+    files = expand_paths(args.paths or ["logs"])
+    if not files:
+        parser.error("no log files found")
+    route_filter = re.compile(args.route) if args.route else None
+
+    periods = [baseline_period, current_period] if diff_mode else [current_period]
+    reports = build_reports(files, periods, bucket_minutes=args.bucket, top=args.top, route_filter=route_filter)
+
+    if diff_mode:
+        rows = diff_reports(*reports)
+        if args.json:
+            json.dump(rows, sys.stdout, indent=2)
+            sys.stdout.write("\n")
+        else:
+            print_diff(rows, sys.stdout)
+    else:
+        data = reports[0].to_dict()
+        if args.json:
+            json.dump(data, sys.stdout, indent=2)
+            sys.stdout.write("\n")
+        else:
+            print_report(data, sys.stdout)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
\ No newline at end of file
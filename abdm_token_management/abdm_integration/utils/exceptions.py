@@ -48,4 +48,36 @@ class PublicKeyError(Exception):
     def __init__(self, message, details=None):
         self.message = message
         self.details = details or {}
-        super().__init__(self.message)
\ No newline at end of file
+        super().__init__(self.message)
+
+class GatewayCallbackTimeoutError(ABDMBaseException):
+    """Exception raised when an ABDM gateway callback does not arrive in time"""
+    def __init__(self, message="Timed out waiting for gateway callback", details=None):
+        super().__init__(message, details)
+
+class UserTokenError(TokenError):
+    """Exception raised when no usable X-token is available for an ABHA number"""
+    def __init__(self, message="No valid X-token available", details=None):
+        super().__init__(message, details)
+
+class GatewayCallbackAuthError(ABDMBaseException):
+    """Exception raised when a gateway callback cannot be authenticated"""
+    def __init__(self, message="Gateway callback not authenticated", details=None, status_code=401):
+        self.status_code = status_code
+        super().__init__(message, details)
+
+class SearchIndexBuildingError(ABDMBaseException):
+    """Exception raised when profile search is used before the search index is built"""
+    def __init__(self, message="Profile search index is building, retry shortly", details=None):
+        super().__init__(message, details)
+
+class ProfileVersionConflictError(ABDMBaseException):
+    """Exception raised when a profile update was based on an outdated version"""
+    def __init__(self, message="ABHA profile was modified concurrently", details=None):
+        super().__init__(message, details)
+
+class AdmissionRejectedError(ABDMBaseException):
+    """Exception raised when a request is shed because its route group is saturated"""
+    def __init__(self, message="Service overloaded, retry later", details=None, retry_after=1):
+        self.retry_after = retry_after
+        super().__init__(message, details)